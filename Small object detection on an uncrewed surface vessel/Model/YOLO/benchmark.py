@@ -0,0 +1,243 @@
+import argparse
+import itertools
+import json
+import platform
+import sys
+import time
+
+import torch
+
+from yolov11s import YOLOv11s, postprocess_batched
+
+VARIANTS = ("eager", "fused", "fused_cl", "trace", "compile")
+
+
+# ------------------------------
+# Model variants
+# ------------------------------
+def build_variant(variant, x, num_classes=1):
+    model = YOLOv11s(num_classes=num_classes).eval()
+    if variant == "eager":
+        return model
+    if variant == "fused":
+        return model.eval(fused=True)
+    if variant == "fused_cl":
+        return model.eval(fused=True, channels_last=True)
+    if variant == "trace":
+        # Detect caches grids in a dict, so trace (per input shape) rather than script
+        with torch.no_grad():
+            return torch.jit.freeze(torch.jit.trace(model.eval(fused=True), x))
+    if variant == "compile":
+        return torch.compile(model.eval(fused=True))
+    raise ValueError(f"unknown variant {variant}")
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    k = (len(values) - 1) * q
+    lo, hi = int(k), min(int(k) + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+def _summary(times, batch):
+    ms = [t * 1000 for t in times]
+    mean = sum(ms) / len(ms)
+    return {
+        "p50_ms": _percentile(ms, 0.5),
+        "p95_ms": _percentile(ms, 0.95),
+        "mean_ms": mean,
+        "throughput_fps": batch * 1000 / mean,
+    }
+
+
+# ------------------------------
+# One configuration (runs in its own process)
+# ------------------------------
+def run_config(cfg, warmup, iters, queue=None):
+    import resource
+
+    result = dict(cfg, key=config_key(cfg), error=None)
+    try:
+        torch.manual_seed(0)
+        torch.set_num_threads(cfg["threads"])
+        x = torch.rand(cfg["batch"], 3, cfg["imgsz"], cfg["imgsz"])
+        model = build_variant(cfg["variant"], x)
+        rss_base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        fwd, post = [], []
+        with torch.no_grad():
+            for i in range(warmup + iters):
+                t0 = time.perf_counter()
+                pred = model(x)
+                t1 = time.perf_counter()
+                postprocess_batched(pred, cfg["conf_thres"], 0.45)
+                t2 = time.perf_counter()
+                if i >= warmup:  # warm-up excluded from the statistics
+                    fwd.append(t1 - t0)
+                    post.append(t2 - t1)
+
+        rss_peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        result["forward"] = _summary(fwd, cfg["batch"])
+        result["postprocess"] = _summary(post, cfg["batch"])
+        result["peak_rss_mb"] = rss_peak / 1024  # KiB on Linux
+        result["peak_rss_delta_mb"] = (rss_peak - rss_base) / 1024
+    except Exception as e:  # e.g. torch.compile without a working toolchain
+        result["error"] = f"{type(e).__name__}: {e}"
+
+    if queue is not None:
+        queue.put(result)
+    return result
+
+
+def config_key(cfg):
+    return f"variant={cfg['variant']},batch={cfg['batch']},imgsz={cfg['imgsz']},threads={cfg['threads']}"
+
+
+def _run_isolated(ctx, cfg, warmup, iters, timeout=None):
+    """
+    run_config in a fresh process (peak RSS is per-process and never goes down). A child that
+    dies without reporting (OOM killer, segfault) or exceeds timeout becomes an error result.
+    """
+    import queue
+
+    q = ctx.Queue()
+    p = ctx.Process(target=run_config, args=(cfg, warmup, iters, q))
+    p.start()
+    t0 = time.perf_counter()
+    result = None
+    while result is None:
+        try:
+            result = q.get(timeout=1.0)
+        except queue.Empty:
+            if not p.is_alive():
+                try:  # the result may have been queued just before exit
+                    result = q.get(timeout=1.0)
+                except queue.Empty:
+                    p.join()
+                    result = dict(cfg, key=config_key(cfg), error=f"child exited with code {p.exitcode} "
+                                                                  "without a result (killed / out of memory?)")
+            elif timeout is not None and time.perf_counter() - t0 > timeout:
+                p.kill()
+                result = dict(cfg, key=config_key(cfg), error=f"timed out after {timeout:.0f} s")
+    p.join()
+    return result
+
+
+def run_sweep(variants, batches, sizes, threads, warmup, iters, conf_thres=0.25, isolate=True, timeout=None):
+    import multiprocessing as mp
+
+    ctx = mp.get_context("spawn")
+    results = []
+    for variant, batch, imgsz, n_threads in itertools.product(variants, batches, sizes, threads):
+        cfg = {"variant": variant, "batch": batch, "imgsz": imgsz, "threads": n_threads, "conf_thres": conf_thres}
+        if isolate:
+            r = _run_isolated(ctx, cfg, warmup, iters, timeout)
+        else:
+            r = run_config(cfg, warmup, iters)
+        results.append(r)
+
+        if r["error"]:
+            print(f"{r['key']:<50} ERROR {r['error']}")
+        else:
+            print(f"{r['key']:<50} fwd p50 {r['forward']['p50_ms']:9.2f} ms  p95 {r['forward']['p95_ms']:9.2f} ms  "
+                  f"post p50 {r['postprocess']['p50_ms']:8.2f} ms  "
+                  f"{r['forward']['throughput_fps']:7.2f} img/s  rss {r['peak_rss_mb']:8.1f} MB")
+    return results
+
+
+# ------------------------------
+# Regression comparison
+# ------------------------------
+def compare(baseline, current, tolerance=0.10):
+    """
+    returns: list of (key, metric, baseline, current, change) for every metric worse than tolerance.
+    A config that errors now but did not in the baseline is metric "error", a baseline config
+    missing from the current run is metric "missing"; both have change None.
+    """
+    base = {r["key"]: r for r in baseline["results"]}
+    seen = {r["key"] for r in current["results"]}
+    regressions = [(key, "missing", "ok", None, None)
+                   for key, b in base.items() if key not in seen and not b.get("error")]
+    for r in current["results"]:
+        b = base.get(r["key"])
+        if r.get("error"):
+            if b is None or not b.get("error"):
+                regressions.append((r["key"], "error", "ok" if b else None, r["error"], None))
+            continue
+        if b is None or b.get("error"):
+            continue
+        checks = [
+            ("forward.p50_ms", b["forward"]["p50_ms"], r["forward"]["p50_ms"], 1),
+            ("forward.p95_ms", b["forward"]["p95_ms"], r["forward"]["p95_ms"], 1),
+            ("postprocess.p50_ms", b["postprocess"]["p50_ms"], r["postprocess"]["p50_ms"], 1),
+            ("forward.throughput_fps", b["forward"]["throughput_fps"], r["forward"]["throughput_fps"], -1),
+            ("peak_rss_mb", b["peak_rss_mb"], r["peak_rss_mb"], 1),
+        ]
+        for metric, old, new, sign in checks:
+            change = (new - old) / old if old else 0.0
+            if sign * change > tolerance:  # sign: +1 lower is better, -1 higher is better
+                regressions.append((r["key"], metric, old, new, change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="YOLOv11s inference benchmark")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    run = sub.add_parser("run", help="sweep configurations and write JSON")
+    run.add_argument("--variants", nargs="+", default=["eager", "fused"], choices=VARIANTS)
+    run.add_argument("--batch", nargs="+", type=int, default=[1])
+    run.add_argument("--imgsz", nargs="+", type=int, default=[640, 1024, 2048])
+    run.add_argument("--threads", nargs="+", type=int, default=[torch.get_num_threads()])
+    run.add_argument("--warmup", type=int, default=3)
+    run.add_argument("--iters", type=int, default=10)
+    run.add_argument("--conf", type=float, default=0.25)
+    run.add_argument("--no-isolate", action="store_true", help="run all configs in this process")
+    run.add_argument("--timeout", type=float, default=None, help="seconds per isolated config before it is killed")
+    run.add_argument("--out", default="benchmark_results.json")
+
+    cmp = sub.add_parser("compare", help="flag regressions against a saved baseline")
+    cmp.add_argument("baseline")
+    cmp.add_argument("current")
+    cmp.add_argument("--tolerance", type=float, default=0.10)
+
+    args = parser.parse_args(argv)
+
+    if args.cmd == "run":
+        results = run_sweep(args.variants, args.batch, args.imgsz, args.threads, args.warmup, args.iters,
+                            conf_thres=args.conf, isolate=not args.no_isolate, timeout=args.timeout)
+        report = {
+            "meta": {
+                "torch": torch.__version__,
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "processor": platform.processor(),
+                "warmup": args.warmup,
+                "iters": args.iters,
+                "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            },
+            "results": results,
+        }
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nwrote {args.out}")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    regressions = compare(baseline, current, args.tolerance)
+    if not regressions:
+        print(f"no regressions beyond {args.tolerance:.0%}")
+        return 0
+    for key, metric, old, new, change in regressions:
+        if change is None:  # errored or missing config
+            print(f"REGRESSION {key:<50} {metric:<24} {new if metric == 'error' else 'not run'}")
+        else:
+            print(f"REGRESSION {key:<50} {metric:<24} {old:10.2f} -> {new:10.2f} ({change:+.1%})")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
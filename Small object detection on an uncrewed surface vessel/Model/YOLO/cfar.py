@@ -0,0 +1,245 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+
+# ------------------------------
+# Threshold factors
+# ------------------------------
+def ca_alpha(n_train, pfa):
+    """CA-CFAR scale for exponential (square-law) noise"""
+    return n_train * (pfa ** (-1.0 / n_train) - 1.0)
+
+
+def os_alpha(n_train, k, pfa, looks=1):
+    """
+    OS-CFAR scale for an exponential cell under test, solved for alpha by bisection (k is the
+    1-based rank of the training cell used as the noise estimate).
+    looks=1: single exponential training cells, Pfa = prod_{i<k} (N - i) / (N - i + alpha).
+    looks=L: training cells are means of L cells, Gamma(L, 1/L); Pfa = E[exp(-alpha Z_(k))]
+      over the density of the k-th of N order statistics, integrated numerically.
+    """
+    if looks == 1:
+        i = np.arange(k)
+
+        def pfa_of(alpha):
+            return np.exp(np.sum(np.log(n_train - i) - np.log(n_train - i + alpha)))
+    else:
+        from scipy import special, stats
+
+        cell = stats.gamma(looks, scale=1.0 / looks)
+        log_c = special.gammaln(n_train + 1) - special.gammaln(k) - special.gammaln(n_train - k + 1)
+        z = np.linspace(cell.ppf(1e-12), cell.ppf(1 - 1e-12), 20001)  # density evaluated once
+        pdf = np.exp(log_c + (k - 1) * cell.logcdf(z) + (n_train - k) * cell.logsf(z) + cell.logpdf(z))
+
+        def pfa_of(alpha):
+            return np.trapezoid(np.exp(-alpha * z) * pdf, z)
+
+    lo, hi = 0.0, 1.0
+    while pfa_of(hi) > pfa:
+        hi *= 2
+    for _ in range(100):
+        mid = (lo + hi) / 2
+        lo, hi = (mid, hi) if pfa_of(mid) > pfa else (lo, mid)
+    return hi
+
+
+def components_to_boxes(mask, min_area=5):
+    """binary mask → [k, 4] int32 (x, y, w, h) of 8-connected blobs with area >= min_area"""
+    _, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    stats = stats[1:]
+    return np.ascontiguousarray(stats[stats[:, 4] >= min_area, :4], dtype=np.int32)
+
+
+# ------------------------------
+# Detector
+# ------------------------------
+class CFARDetector:
+    """
+    2-D CFAR over radar frames (uint8 grayscale or RGB, single frames or [B, H, W(, 3)] stacks).
+    method="ca": cell averaging; unnormalised running-sum box filters (O(1) per pixel whatever
+      the window) into reused float32 buffers.
+    method="os": ordered statistic. The noise estimate is the os_rank quantile of the training
+      cells, which holds up next to clutter edges and neighbouring targets. With os_cell > 1 the
+      training cells are os_cell x os_cell block means (far fewer cells to rank).
+    Per-thread buffers are reused across frames; detect_batch spreads frames over threads (cv2
+    and numpy release the GIL). notebook_compat=True reproduces CA-CFAR.ipynb's cfar_detect,
+    whose normalised cv2.boxFilter turns the noise estimate into (mean_outer - mean_guard) / N.
+    """
+
+    def __init__(self, train=10, guard=2, pfa=1e-2, method="ca", os_rank=0.75, os_cell=4, min_area=5,
+                 workers=None, notebook_compat=False):
+        self.train, self.guard, self.pfa = train, guard, pfa
+        self.method = method
+        self.min_area = min_area
+        self.workers = workers or os.cpu_count() or 1
+        self.notebook_compat = notebook_compat
+        self.margin = train + guard
+        self.n_train = (2 * self.margin + 1) ** 2 - (2 * guard + 1) ** 2
+
+        if method == "ca":
+            self.alpha = ca_alpha(self.n_train, pfa)
+        elif method == "os":
+            # training cells on a grid of os_cell blocks: a ring of blocks around the guard blocks
+            self.os_cell = os_cell
+            self.g_cells = -(-(2 * guard + 1) // os_cell) // 2  # guard blocks on each side of the CUT
+            self.t_cells = max(1, -(-train // os_cell))
+            span = self.g_cells + self.t_cells
+            offsets = [(dy, dx) for dy in range(-span, span + 1) for dx in range(-span, span + 1)
+                       if max(abs(dy), abs(dx)) > self.g_cells]
+            self.os_offsets = np.array(offsets)
+            self.os_k = max(1, min(len(offsets), int(round(os_rank * len(offsets)))))
+            self.alpha = os_alpha(len(offsets), self.os_k, pfa, looks=os_cell * os_cell)
+        else:
+            raise ValueError(f"unknown CFAR method {method}")
+        self._local = threading.local()
+        self._pool = None
+
+    # ------------------------------
+    # Per-thread scratch
+    # ------------------------------
+    def _scratch(self, shape):
+        s = getattr(self._local, "s", None)
+        if s is None or s["shape"] != shape:
+            s = self._local.s = {
+                "shape": shape,
+                "img": np.empty(shape, dtype=np.float32),
+                "outer": np.empty(shape, dtype=np.float32),
+                "inner": np.empty(shape, dtype=np.float32),
+                "mask": np.empty(shape, dtype=np.uint8),
+            }
+        return s
+
+    # ------------------------------
+    # Single frame
+    # ------------------------------
+    def _gray(self, frame):
+        if frame.ndim == 3:
+            return cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
+        return frame
+
+    def mask(self, frame):
+        """[H, W] (or [H, W, 3]) → [H, W] uint8 0/1 mask, borders zeroed (a per-thread buffer: copy to keep)"""
+        img = self._gray(frame)
+        h, w = img.shape
+        s = self._scratch((h, w))
+        m = self.margin
+        out = s["mask"]
+
+        if self.method == "ca":
+            np.copyto(s["img"], img)
+            norm = self.notebook_compat
+            k_out, k_in = 2 * m + 1, 2 * self.guard + 1
+            # window sums; zero padding = BORDER_CONSTANT
+            cv2.boxFilter(s["img"], -1, (k_out, k_out), dst=s["outer"], normalize=norm,
+                          borderType=cv2.BORDER_CONSTANT)
+            cv2.boxFilter(s["img"], -1, (k_in, k_in), dst=s["inner"], normalize=norm,
+                          borderType=cv2.BORDER_CONSTANT)
+            cv2.subtract(s["outer"], s["inner"], dst=s["outer"])
+            cv2.multiply(s["outer"], self.alpha / self.n_train, dst=s["outer"])  # threshold
+            cv2.compare(s["img"], s["outer"], cv2.CMP_GT, dst=out)
+            out &= 1
+        else:
+            np.greater(img, self._os_threshold(img), out=out)
+
+        out[:m] = 0
+        out[-m:] = 0
+        out[:, :m] = 0
+        out[:, -m:] = 0
+        return out
+
+    def _os_threshold(self, img):
+        c = self.os_cell
+        h, w = img.shape
+        hb, wb = -(-h // c), -(-w // c)
+        # block means (edge blocks padded with zeros, like the CA border)
+        blocks = np.zeros((hb * c, wb * c), dtype=np.float32)
+        blocks[:h, :w] = img
+        blocks = blocks.reshape(hb, c, wb, c).mean((1, 3))
+        span = self.g_cells + self.t_cells
+        padded = np.pad(blocks, span)
+        cells = np.empty((len(self.os_offsets), hb, wb), dtype=np.float32)
+        for i, (dy, dx) in enumerate(self.os_offsets):
+            cells[i] = padded[span + dy:span + dy + hb, span + dx:span + dx + wb]
+        noise = np.partition(cells, self.os_k - 1, axis=0)[self.os_k - 1]
+        noise *= self.alpha
+        return np.repeat(np.repeat(noise, c, 0), c, 1)[:h, :w]
+
+    def detect(self, frame):
+        """one frame → [k, 4] int32 (x, y, w, h) boxes"""
+        return components_to_boxes(self.mask(frame), self.min_area)
+
+    # ------------------------------
+    # Stacks of frames
+    # ------------------------------
+    def detect_batch(self, frames):
+        """[B, H, W(, 3)] array or list of frames → list of [k_i, 4] int32 box arrays, in order"""
+        if self.workers <= 1 or len(frames) == 1:
+            return [self.detect(f) for f in frames]
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(self.workers)
+        return list(self._pool.map(self.detect, frames))
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def boxes_from_json(json_path):
+    """MOANA annotations → [n, 4] (x, y, w, h)"""
+    with open(json_path) as f:
+        anns = json.load(f).get("annotations", [])
+    return np.array([[a["xmin"], a["ymin"], a["width"], a["height"]] for a in anns], dtype=np.float64).reshape(-1, 4)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from PIL import Image
+
+    from evaluation import DetectionEvaluator, xywh_to_xyxy
+
+    parser = argparse.ArgumentParser(description="Batched CA/OS-CFAR over a folder of radar frames")
+    parser.add_argument("image_dir", help="PNG frames, MOANA .json next to them for evaluation")
+    parser.add_argument("--method", default="ca", choices=("ca", "os"))
+    parser.add_argument("--train", type=int, default=10)
+    parser.add_argument("--guard", type=int, default=2)
+    parser.add_argument("--pfa", type=float, default=1e-2)
+    parser.add_argument("--batch", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--notebook-compat", action="store_true")
+    args = parser.parse_args()
+
+    files = sorted(f for f in os.listdir(args.image_dir) if f.lower().endswith(".png"))
+    detector = CFARDetector(args.train, args.guard, args.pfa, args.method, workers=args.workers,
+                            notebook_compat=args.notebook_compat)
+    ev = DetectionEvaluator()
+    t_cfar = 0.0
+    with detector:
+        for k in range(0, len(files), args.batch):
+            names = files[k:k + args.batch]
+            frames = [np.array(Image.open(os.path.join(args.image_dir, n)).convert("L")) for n in names]
+            t0 = time.perf_counter()
+            boxes = detector.detect_batch(frames)
+            t_cfar += time.perf_counter() - t0
+            for n, b in zip(names, boxes):
+                json_path = os.path.join(args.image_dir, os.path.splitext(n)[0] + ".json")
+                if os.path.exists(json_path):
+                    ev.update(xywh_to_xyxy(b), xywh_to_xyxy(boxes_from_json(json_path)))
+
+    print(f"{len(files)} frames, CFAR {len(files) / max(t_cfar, 1e-9):.1f} frames/s")
+    if ev.frames:
+        r = ev.compute()
+        print(f"Precision {r['precision']:.3f}  Recall {r['recall']:.3f}  F1 {r['f1']:.3f} @ IoU=0.5")
@@ -0,0 +1,215 @@
+import hashlib
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
+from frame_files import png_size
+
+MANIFEST_NAME = ".convert_manifest.json"
+
+
+# ------------------------------
+# Cheap file helpers
+# ------------------------------
+def _reflink(src, dst):
+    # copy-on-write clone (btrfs/xfs/apfs-style); raises OSError where unsupported
+    import fcntl
+
+    FICLONE = 0x40049409
+    with open(src, "rb") as s, open(dst, "wb") as d:
+        fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+
+
+def stage_file(src, dst, mode="link"):
+    """
+    Put src at dst without copying bytes where the filesystem allows it.
+    mode: "link" (hardlink → reflink → copy), "reflink" (reflink → copy) or "copy"
+    returns: the method actually used
+    """
+    if os.path.exists(dst):
+        return "exists"
+    if mode == "link":
+        try:
+            os.link(src, dst)
+            return "link"
+        except OSError:  # cross-device, FAT, no permission...
+            pass
+    if mode in ("link", "reflink"):
+        try:
+            _reflink(src, dst)
+            return "reflink"
+        except (OSError, ImportError):
+            if os.path.exists(dst):
+                os.remove(dst)
+    shutil.copy2(src, dst)
+    return "copy"
+
+
+def file_sha1(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+# ------------------------------
+# Per-file work (runs in the process pool)
+# ------------------------------
+def convert_one(job):
+    json_path, image_path, label_path, dst_image_path, stage_mode = job
+    img_w, img_h = png_size(image_path)
+
+    with open(json_path, "rb") as f:
+        raw = f.read()
+    data = json.loads(raw)
+
+    lines = []
+    for ann in data.get("annotations", []):
+        x = ann["xmin"]
+        y = ann["ymin"]
+        w = ann["width"]
+        h = ann["height"]
+        xc = (x + w / 2) / img_w
+        yc = (y + h / 2) / img_h
+        ww = w / img_w
+        hh = h / img_h
+        lines.append(f"0 {xc:.6f} {yc:.6f} {ww:.6f} {hh:.6f}\n")
+
+    tmp = label_path + ".tmp"
+    with open(tmp, "w") as out_f:
+        out_f.writelines(lines)
+    os.replace(tmp, label_path)  # readers never see a half-written label
+
+    if os.path.exists(dst_image_path) and not os.path.samefile(image_path, dst_image_path):
+        os.remove(dst_image_path)  # source image replaced (or staged as a copy): restage it
+    staged = stage_file(image_path, dst_image_path, stage_mode)
+    return {
+        "sha1": hashlib.sha1(raw).hexdigest(),
+        "width": img_w,
+        "height": img_h,
+        "boxes": len(lines),
+        "staged": staged,
+    }
+
+
+# ------------------------------
+# Incremental conversion
+# ------------------------------
+def load_manifest(path):
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {}
+
+
+def save_manifest(path, manifest):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, path)
+
+
+def _locate(base_name, dir_pairs):
+    """(label_path, image_path) in the first (image_dir, label_dir) pair holding both, else the first pair"""
+    for img_dir, lbl_dir in dir_pairs:
+        label_path = os.path.join(lbl_dir, base_name + ".txt")
+        image_path = os.path.join(img_dir, base_name + ".png")
+        if os.path.exists(label_path) and os.path.exists(image_path):
+            return label_path, image_path
+    img_dir, lbl_dir = dir_pairs[0]
+    return os.path.join(lbl_dir, base_name + ".txt"), os.path.join(img_dir, base_name + ".png")
+
+
+def convert_dataset(json_dir, image_dir, output_img_dir, output_lbl_dir, workers=None, stage_mode="link",
+                    manifest_path=None, prune=True, verbose=True, moved_dirs=()):
+    """
+    JSON annotations → YOLO txt labels, staging the matching PNGs next to them.
+    Only annotations whose (mtime, size) — or, failing that, content hash — changed since the
+    last run, or whose PNG's (mtime, size) changed, are reconverted. moved_dirs: other
+    (image_dir, label_dir) pairs outputs may have been moved to since (e.g. a val split); they
+    count as converted there and are updated in place. Returns the list of converted base names
+    (unchanged ones included).
+    """
+    os.makedirs(output_img_dir, exist_ok=True)
+    os.makedirs(output_lbl_dir, exist_ok=True)
+    dir_pairs = [(output_img_dir, output_lbl_dir), *moved_dirs]
+    manifest_path = manifest_path or os.path.join(output_lbl_dir, MANIFEST_NAME)
+    manifest = load_manifest(manifest_path)
+
+    jobs, stats, converted_files, seen = [], {}, [], set()
+    for filename in os.listdir(json_dir):
+        if not filename.endswith(".json"):
+            continue
+        base_name = os.path.splitext(filename)[0]
+        json_path = os.path.join(json_dir, filename)
+        image_path = os.path.join(image_dir, base_name + ".png")
+        if not os.path.exists(image_path):
+            continue
+        seen.add(base_name)
+        converted_files.append(base_name)
+
+        label_path, dst_image_path = _locate(base_name, dir_pairs)
+        st = os.stat(json_path)
+        img_st = os.stat(image_path)
+        stats[base_name] = (st.st_mtime_ns, st.st_size, img_st.st_mtime_ns, img_st.st_size)
+
+        entry = manifest.get(base_name)
+        outputs_ok = os.path.exists(label_path) and os.path.exists(dst_image_path)
+        image_ok = entry and (entry.get("image_mtime_ns"), entry.get("image_size")) == stats[base_name][2:]
+        if image_ok and outputs_ok:
+            if (entry["mtime_ns"], entry["size"]) == stats[base_name][:2]:
+                continue
+            if entry["size"] == st.st_size and entry["sha1"] == file_sha1(json_path):
+                entry["mtime_ns"] = st.st_mtime_ns  # touched but identical
+                continue
+        jobs.append((base_name, (json_path, image_path, label_path, dst_image_path, stage_mode)))
+
+    staged = {}
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(convert_one, [job for _, job in jobs], chunksize=max(1, len(jobs) // 64))
+            for (base_name, _), rec in zip(jobs, results):
+                rec["mtime_ns"], rec["size"], rec["image_mtime_ns"], rec["image_size"] = stats[base_name]
+                staged[rec["staged"]] = staged.get(rec["staged"], 0) + 1
+                manifest[base_name] = rec
+
+    removed = 0
+    if prune:  # annotations deleted since the last run
+        for base_name in [b for b in manifest if b not in seen]:
+            for img_dir, lbl_dir in dir_pairs:
+                for path in (os.path.join(lbl_dir, base_name + ".txt"), os.path.join(img_dir, base_name + ".png")):
+                    if os.path.exists(path):
+                        os.remove(path)
+            del manifest[base_name]
+            removed += 1
+
+    save_manifest(manifest_path, manifest)
+    if verbose:
+        print(f"{len(converted_files)} annotated images, {len(jobs)} converted, "
+              f"{len(converted_files) - len(jobs)} unchanged, {removed} removed, staging {staged}")
+    return converted_files
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Incremental JSON → YOLO label conversion")
+    parser.add_argument("json_dir")
+    parser.add_argument("--image-dir", default=None, help="defaults to json_dir")
+    parser.add_argument("--out", default=None, help="dataset root, defaults to json_dir")
+    parser.add_argument("--split", default="train")
+    parser.add_argument("--also-split", nargs="*", default=[],
+                        help="splits converted frames may have been moved to (e.g. val), checked in place")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--stage", default="link", choices=("link", "reflink", "copy"))
+    args = parser.parse_args()
+
+    out = args.out or args.json_dir
+    convert_dataset(
+        args.json_dir, args.image_dir or args.json_dir,
+        os.path.join(out, "images", args.split), os.path.join(out, "labels", args.split),
+        workers=args.workers, stage_mode=args.stage,
+        moved_dirs=[(os.path.join(out, "images", s), os.path.join(out, "labels", s)) for s in args.also_split],
+    )
@@ -0,0 +1,179 @@
+import json
+import os
+import sqlite3
+
+from frame_files import parse_timestamp, png_size
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS frames (
+    image_path  TEXT PRIMARY KEY,
+    ts          INTEGER NOT NULL,
+    label_path  TEXT,
+    json_path   TEXT,
+    boxes       INTEGER,
+    width       INTEGER,
+    height      INTEGER,
+    mtime_ns    INTEGER NOT NULL,
+    size        INTEGER NOT NULL,
+    label_mtime_ns INTEGER
+);
+CREATE INDEX IF NOT EXISTS frames_ts ON frames (ts);
+"""
+COLUMNS = ("ts", "image_path", "label_path", "json_path", "boxes", "width", "height")
+
+
+def _count_boxes(label_path, json_path):
+    if label_path:
+        with open(label_path) as f:
+            return sum(1 for line in f if line.strip())
+    if json_path:
+        with open(json_path) as f:
+            return len(json.load(f).get("annotations", []))
+    return None
+
+
+# ------------------------------
+# Persistent timestamp index
+# ------------------------------
+class DatasetIndex:
+    """
+    SQLite index of the radar frame dataset: timestamp → image path, label path (YOLO txt),
+    MOANA json path, box count and image size. Sorted iteration and time-range queries go
+    through the B-tree on ts (O(log n + k)); update() only re-reads files whose stat changed.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def update(self, image_dirs, label_dirs=(), prune=True):
+        """
+        Scan image_dirs (and label_dirs for <base>.txt, image dir for <base>.json) and bring the
+        index up to date. Returns (added_or_changed, removed).
+        """
+        known = {row[0]: row[1:] for row in
+                 self.conn.execute("SELECT image_path, mtime_ns, size, label_mtime_ns FROM frames")}
+        labels = {}
+        for d in label_dirs:
+            if os.path.isdir(d):
+                for e in os.scandir(d):
+                    if e.name.endswith(".txt"):
+                        labels.setdefault(os.path.splitext(e.name)[0], e)
+
+        seen, rows = set(), []
+        for d in image_dirs:
+            if not os.path.isdir(d):
+                continue
+            entries = list(os.scandir(d))
+            jsons = {e.name for e in entries if e.name.endswith(".json")}
+            for e in entries:
+                ts = parse_timestamp(e.name)
+                if ts is None:
+                    continue
+                path = e.path
+                seen.add(path)
+                base = os.path.splitext(e.name)[0]
+                st = e.stat()
+                label = labels.get(base)
+                label_mtime = label.stat().st_mtime_ns if label else None
+                if known.get(path) == (st.st_mtime_ns, st.st_size, label_mtime):
+                    continue
+
+                label_path = label.path if label else None
+                json_path = os.path.join(d, base + ".json") if base + ".json" in jsons else None
+                try:
+                    width, height = png_size(path)
+                except ValueError:
+                    width = height = None
+                rows.append((path, ts, label_path, json_path, _count_boxes(label_path, json_path),
+                             width, height, st.st_mtime_ns, st.st_size, label_mtime))
+
+        scanned = {os.path.normpath(d) for d in image_dirs}
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO frames VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            # only prune inside the directories scanned this time
+            removed = [(p,) for p in known
+                       if p not in seen and os.path.normpath(os.path.dirname(p)) in scanned] if prune else []
+            self.conn.executemany("DELETE FROM frames WHERE image_path = ?", removed)
+        return len(rows), len(removed)
+
+    # ------------------------------
+    # Queries
+    # ------------------------------
+    def _select(self, where="", args=()):
+        sql = f"SELECT {', '.join(COLUMNS)} FROM frames {where} ORDER BY ts, image_path"
+        for row in self.conn.execute(sql, args):
+            yield dict(zip(COLUMNS, row))
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM frames").fetchone()[0]
+
+    def __iter__(self):
+        return self._select()
+
+    def range(self, start=None, end=None, labelled=False, image_dir=None):
+        """frames with start <= ts < end (optionally only those in image_dir), in timestamp order"""
+        clauses, args = [], []
+        if image_dir is not None:
+            # exact, case-sensitive prefix (LIKE would treat _ and % as wildcards and fold ASCII
+            # case), and nothing below it: no separator in the rest of the path
+            prefix = os.path.join(os.path.normpath(image_dir), "")
+            clauses.append("substr(image_path, 1, ?) = ?")
+            args += [len(prefix), prefix]
+            for sep in filter(None, (os.sep, os.altsep)):
+                clauses.append("instr(substr(image_path, ?), ?) = 0")
+                args += [len(prefix) + 1, sep]
+        if start is not None:
+            clauses.append("ts >= ?")
+            args.append(start)
+        if end is not None:
+            clauses.append("ts < ?")
+            args.append(end)
+        if labelled:
+            clauses.append("label_path IS NOT NULL")
+        where = "WHERE " + " AND ".join(clauses) if clauses else ""
+        return self._select(where, args)
+
+    def get(self, ts):
+        return list(self._select("WHERE ts = ?", (ts,)))
+
+    def timestamps(self):
+        return [row[0] for row in self.conn.execute("SELECT ts FROM frames ORDER BY ts, image_path")]
+
+    def frames(self, start=None, end=None, image_dir=None):
+        """(ts, image_path, label_path) tuples, the shape kfold_split.make_time_folds takes"""
+        return [(r["ts"], r["image_path"], r["label_path"]) for r in self.range(start, end, image_dir=image_dir)]
+
+
+def open_index(base_dir, db_name="frames.sqlite", splits=("train", "val"), update=True):
+    """index over base_dir/images/<split> + base_dir/labels/<split>, refreshed on open"""
+    index = DatasetIndex(os.path.join(base_dir, db_name))
+    if update:
+        index.update([os.path.join(base_dir, "images", s) for s in splits],
+                     [os.path.join(base_dir, "labels", s) for s in splits])
+    return index
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build / query the radar frame timestamp index")
+    parser.add_argument("base_dir")
+    parser.add_argument("--start", type=int, default=None)
+    parser.add_argument("--end", type=int, default=None)
+    args = parser.parse_args()
+
+    with open_index(args.base_dir) as index:
+        print(f"{len(index)} frames indexed")
+        for row in index.range(args.start, args.end):
+            print(row["ts"], row["image_path"], row["boxes"], f"{row['width']}x{row['height']}")
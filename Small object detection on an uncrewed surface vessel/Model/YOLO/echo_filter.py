@@ -0,0 +1,177 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+
+# ------------------------------
+# RGB → "is echo" lookup table
+# ------------------------------
+def build_echo_lut(h_range=(20, 40), s_min=60, v_min=100):
+    """
+    Boolean table over all 2^24 RGB colours, indexed by (r << 16) | (g << 8) | b.
+    Built with PIL's own HSV conversion, so masks match Image.convert("HSV") exactly.
+    """
+    idx = np.arange(1 << 24, dtype=np.uint32)
+    rgb = np.empty((4096, 4096, 3), dtype=np.uint8)
+    rgb[..., 0] = (idx >> 16).reshape(4096, 4096)
+    rgb[..., 1] = ((idx >> 8) & 0xFF).reshape(4096, 4096)
+    rgb[..., 2] = (idx & 0xFF).reshape(4096, 4096)
+    hsv = np.asarray(Image.fromarray(rgb).convert("HSV")).reshape(-1, 3)
+    h, s, v = hsv[:, 0], hsv[:, 1], hsv[:, 2]
+    return ((h >= h_range[0]) & (h <= h_range[1])) & (s > s_min) & (v > v_min)
+
+
+class EchoFilter:
+    """
+    Keeps the yellow radar echo pixels (PIL HSV h 20-40, s > 60, v > 100) of an RGB frame.
+    No HSV image is ever built: one packed-index gather into a precomputed table per frame.
+    """
+
+    def __init__(self, h_range=(20, 40), s_min=60, v_min=100, lut_cache=None):
+        window = np.array([h_range[0], h_range[1], s_min, v_min])
+        self.lut = self._load_lut(lut_cache, window) if lut_cache else None
+        if self.lut is None:
+            self.lut = build_echo_lut(h_range, s_min, v_min)
+            if lut_cache:
+                # packed bits (2 MB) + the window they were built for, written atomically
+                tmp = lut_cache + ".tmp"
+                with open(tmp, "wb") as f:
+                    np.savez(f, bits=np.packbits(self.lut), window=window)
+                os.replace(tmp, lut_cache)
+        self._local = threading.local()
+
+    @staticmethod
+    def _load_lut(path, window):
+        """cached table if path holds one built for this (h_lo, h_hi, s_min, v_min) window, else None"""
+        try:
+            with np.load(path) as cache:
+                if not np.array_equal(cache["window"], window):
+                    return None
+                return np.unpackbits(cache["bits"]).astype(bool)
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):  # missing, old .npy format, corrupt
+            return None
+
+    def _scratch(self, shape):
+        # per-thread reusable index buffer
+        buf = getattr(self._local, "idx", None)
+        if buf is None or buf.shape != shape:
+            buf = self._local.idx = np.empty(shape, dtype=np.uint32)
+        return buf
+
+    def mask(self, rgb):
+        """rgb: [H, W, 3] uint8 → [H, W] bool"""
+        idx = self._scratch(rgb.shape[:2])
+        np.copyto(idx, rgb[..., 0])
+        idx <<= 8
+        idx |= rgb[..., 1]
+        idx <<= 8
+        idx |= rgb[..., 2]
+        return self.lut[idx]
+
+    def apply_(self, rgb):
+        """zero every non-echo pixel in place; returns the echo mask"""
+        m = self.mask(rgb)
+        rgb[~m] = 0
+        return m
+
+
+# ------------------------------
+# Output formats
+# ------------------------------
+def echo_rois(mask, min_area=1):
+    """connected echo regions → [[x, y, w, h, area], ...]"""
+    import cv2
+
+    n, _, stats, _ = cv2.connectedComponentsWithStats(mask.view(np.uint8), connectivity=8)
+    stats = stats[1:]
+    return stats[stats[:, 4] >= min_area].tolist()
+
+
+def save_output(rgb, mask, out_base, mode):
+    if mode == "png":
+        Image.fromarray(rgb).save(out_base + ".png")
+    elif mode == "sparse":
+        ys, xs = np.nonzero(mask)
+        np.savez_compressed(out_base + ".npz", shape=np.array(mask.shape, dtype=np.int32),
+                            yx=np.stack([ys, xs], 1).astype(np.uint16), rgb=rgb[ys, xs])
+    elif mode == "roi":
+        with open(out_base + ".json", "w") as f:
+            json.dump({"shape": list(mask.shape), "rois": echo_rois(mask)}, f)
+    else:
+        raise ValueError(f"unknown output mode {mode}")
+
+
+def load_sparse(path):
+    """inverse of the "sparse" output: back to a dense [H, W, 3] frame"""
+    d = np.load(path)
+    out = np.zeros((*d["shape"], 3), dtype=np.uint8)
+    out[d["yx"][:, 0], d["yx"][:, 1]] = d["rgb"]
+    return out
+
+
+# ------------------------------
+# Directory driver
+# ------------------------------
+def filter_directory(sensor_dir, output_dir, mode="png", workers=4, max_in_flight=None, echo_filter=None,
+                     progress=True):
+    """
+    Filter every PNG of sensor_dir into output_dir. Threads are enough: PNG decode/encode and
+    the numpy gather all release the GIL. At most max_in_flight frames are held in memory.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    echo_filter = echo_filter or EchoFilter()
+    max_in_flight = max_in_flight or 2 * workers
+    files = sorted(f for f in os.listdir(sensor_dir) if f.endswith(".png"))
+
+    def work(filename):
+        rgb = np.array(Image.open(os.path.join(sensor_dir, filename)).convert("RGB"))
+        m = echo_filter.apply_(rgb)
+        save_output(rgb, m, os.path.join(output_dir, os.path.splitext(filename)[0]), mode)
+        return int(m.sum())
+
+    bar = None
+    if progress:
+        from tqdm import tqdm
+        bar = tqdm(total=len(files))
+
+    t0 = time.perf_counter()
+    echo_pixels = 0
+    with ThreadPoolExecutor(workers) as pool:
+        pending = deque()
+        for filename in files:
+            if len(pending) >= max_in_flight:  # back-pressure
+                echo_pixels += pending.popleft().result()
+                if bar:
+                    bar.update()
+            pending.append(pool.submit(work, filename))
+        while pending:
+            echo_pixels += pending.popleft().result()
+            if bar:
+                bar.update()
+    if bar:
+        bar.close()
+
+    dt = time.perf_counter() - t0
+    print(f" {len(files)} image, {echo_pixels} echo pixels, {len(files) / max(dt, 1e-9):.1f} frames/s")
+    return files
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Extract radar echo pixels from raw X-band frames")
+    parser.add_argument("sensor_dir")
+    parser.add_argument("output_dir")
+    parser.add_argument("--mode", default="png", choices=("png", "sparse", "roi"))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--lut-cache", default=None, help="optional path to cache the colour table (rebuilt when the HSV window changes)")
+    args = parser.parse_args()
+
+    filter_directory(args.sensor_dir, args.output_dir, args.mode, args.workers,
+                     echo_filter=EchoFilter(lut_cache=args.lut_cache))
@@ -0,0 +1,139 @@
+import copy
+
+import torch
+import torch.nn as nn
+from torch.func import functional_call, stack_module_state, vmap
+
+from yolov11s import YOLOv11s, postprocess_batched, weighted_box_fusion
+
+
+# ------------------------------
+# Stacked fold models
+# ------------------------------
+class FoldEnsemble(nn.Module):
+    """
+    k same-architecture YOLOv11s (one per k-fold split) behind one forward: x [B, 3, H, W] →
+    [k, B, N, 5 + nc]. The fused parameters are stacked once ([k, ...] per tensor) and every
+    member's modules are re-pointed at their slice, so both modes share one copy of the weights.
+    mode="vmap": torch.func.vmap over the stacked parameters, the input shared (batched convs,
+      k x fewer kernel launches: the GPU path).
+    mode="loop": the members one after another (CPU, where grouped convs are slower than k
+      plain ones). "auto" picks vmap on CUDA, loop otherwise.
+    """
+
+    def __init__(self, models, mode="auto"):
+        super().__init__()
+        assert mode in ("auto", "vmap", "loop")
+        models = [m.eval(fused=True) for m in models]
+        self.n_models = len(models)
+        params, _ = stack_module_state(models)
+        self.members = nn.ModuleList(models)
+        # stacked weights are non-persistent buffers so .to()/.half() move them with the members;
+        # buffers (Detect anchors, identical across folds) and the grid cache stay unbatched
+        self.stacked = {name: "_stacked_" + name.replace(".", "__") for name in params}
+        for name, stacked in params.items():
+            self.register_buffer(self.stacked[name], stacked.detach(), persistent=False)
+        self._share()
+        device = next(models[0].parameters()).device
+        self.mode = ("vmap" if device.type == "cuda" else "loop") if mode == "auto" else mode
+
+    @classmethod
+    def from_state_dicts(cls, paths, num_classes=1, mode="auto", device="cpu"):
+        models = []
+        for path in paths:
+            model = YOLOv11s(num_classes=num_classes)
+            model.load_state_dict(torch.load(path, map_location="cpu"))
+            models.append(model.to(device))
+        return cls(models, mode)
+
+    def _share(self):
+        """point every member's parameters at its slice of the stacked buffers"""
+        for name, buf in self.stacked.items():
+            stacked = self.get_buffer(buf)
+            for i, m in enumerate(self.members):
+                m.get_parameter(name).data = stacked[i]
+
+    def _apply(self, fn, *args, **kwargs):
+        # members and stacked buffers are converted separately, re-share so there is one copy again
+        super()._apply(fn, *args, **kwargs)
+        self._share()
+        return self
+
+    def _one(self, params, x):
+        return functional_call(self.members[0], params, (x,))
+
+    @torch.no_grad()
+    def forward(self, x):
+        if self.mode == "vmap":
+            params = {name: self.get_buffer(buf) for name, buf in self.stacked.items()}
+            return vmap(self._one, in_dims=(0, None))(params, x)
+        return torch.stack([m(x) for m in self.members])
+
+    # ------------------------------
+    # Detections
+    # ------------------------------
+    @torch.no_grad()
+    def detect(self, x, conf_thres=0.25, iou_thres=0.45, wbf_iou=0.55, max_det=300):
+        """
+        x: [B, 3, H, W] → list of B [n, 6] (x1, y1, x2, y2, conf, class). One postprocess_batched
+        call decodes and NMSes all k x B predictions (image index = member * B + image), then
+        each image's k detection sets are merged by weighted_box_fusion(n_models=k), so a box
+        only some folds agree on keeps a proportionally lower confidence.
+        """
+        pred = self(x)
+        k, bs = pred.shape[:2]
+        dets, offsets = postprocess_batched(pred.flatten(0, 1), conf_thres, iou_thres, max_det=max_det)
+        offsets = offsets.tolist()
+        out = []
+        for b in range(bs):
+            d = torch.cat([dets[offsets[m * bs + b]:offsets[m * bs + b + 1]] for m in range(k)])
+            fused = weighted_box_fusion(d[:, :4], d[:, 4], d[:, 5], wbf_iou, n_models=k)
+            out.append(fused[fused[:, 4].argsort(descending=True)][:max_det])
+        return out
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="k-fold YOLOv11s ensemble vs single-model latency")
+    parser.add_argument("--weights", nargs="*", default=None, help="one YOLOv11s state_dict per fold")
+    parser.add_argument("--folds", type=int, default=5, help="random members when no weights are given")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--iters", type=int, default=5)
+    parser.add_argument("--conf", type=float, default=0.25)
+    parser.add_argument("--device", default="cuda" if torch.cuda.is_available() else "cpu")
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    if args.weights:
+        ensemble = FoldEnsemble.from_state_dicts(args.weights, device=args.device)
+    else:
+        ensemble = FoldEnsemble([YOLOv11s(num_classes=1).to(args.device) for _ in range(args.folds)])
+    x = torch.rand(1, 3, args.imgsz, args.imgsz, device=args.device)
+
+    def timed(fn):
+        fn()  # warm-up
+        if args.device == "cuda":
+            torch.cuda.synchronize()
+        t0 = time.perf_counter()
+        for _ in range(args.iters):
+            fn()
+        if args.device == "cuda":
+            torch.cuda.synchronize()
+        return (time.perf_counter() - t0) / args.iters * 1000
+
+    single = copy.deepcopy(ensemble.members[0])
+    with torch.no_grad():
+        ref = torch.stack([m(x) for m in ensemble.members])
+        ensemble.mode = "vmap"
+        err = (ensemble(x) - ref).abs().max().item()
+    print(f"{ensemble.n_models} members on {args.device}, vmap vs per-member max abs err {err:.2e}")
+
+    with torch.no_grad():
+        t_single = timed(lambda: postprocess_batched(single(x), args.conf))
+    print(f"{'single model':>14}: {t_single:8.1f} ms")
+    for mode in ("loop", "vmap"):
+        ensemble.mode = mode
+        t = timed(lambda: ensemble.detect(x, args.conf))
+        print(f"{mode + ' ensemble':>14}: {t:8.1f} ms ({t / t_single:4.2f}x single)")
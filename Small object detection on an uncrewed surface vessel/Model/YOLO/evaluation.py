@@ -0,0 +1,280 @@
+import os
+import time
+
+import numpy as np
+
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)  # COCO 0.50:0.05:0.95
+
+
+# ------------------------------
+# Box helpers
+# ------------------------------
+def _np(x, width=4):
+    if hasattr(x, "detach"):  # torch tensors from postprocess / the trackers
+        x = x.detach().cpu().numpy()
+    return np.asarray(x, dtype=np.float64).reshape(-1, width)
+
+
+def xywh_to_xyxy(boxes):
+    """top-left (x, y, w, h) — MOANA json / CFAR / tracker boxes — → (x1, y1, x2, y2)"""
+    b = _np(boxes)
+    return np.concatenate([b[:, :2], b[:, :2] + b[:, 2:]], 1)
+
+
+def cxcywh_to_xyxy(boxes):
+    """YOLO label (xc, yc, w, h) → (x1, y1, x2, y2)"""
+    b = _np(boxes)
+    return np.concatenate([b[:, :2] - b[:, 2:] / 2, b[:, :2] + b[:, 2:] / 2], 1)
+
+
+def box_iou(a, b):
+    """a: [n, 4], b: [m, 4] xyxy → [n, m] IoU, one broadcast, no Python loop"""
+    a, b = _np(a), _np(b)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    wh = np.minimum(a[:, None, 2:], b[None, :, 2:]) - np.maximum(a[:, None, :2], b[None, :, :2])
+    inter = wh.clip(0).prod(2)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+# ------------------------------
+# Matching
+# ------------------------------
+def match_detections(iou, iou_thresholds=IOU_THRESHOLDS, same_class=None):
+    """
+    iou: [n_pred, n_gt]; same_class: optional [n_pred, n_gt] bool
+    returns: [n_pred, T] bool, prediction is a true positive at each IoU threshold.
+    One-to-one per threshold: candidate pairs sorted by IoU, each prediction and each ground
+    truth used once (the same rule ultralytics uses for metrics/mAP50-95(B)).
+    """
+    tp = np.zeros((iou.shape[0], len(iou_thresholds)), dtype=bool)
+    if iou.size == 0:
+        return tp
+    if same_class is not None:
+        iou = np.where(same_class, iou, 0.0)
+    for t, thr in enumerate(iou_thresholds):
+        p, g = np.nonzero(iou >= thr)
+        if not len(p):
+            continue
+        order = np.argsort(-iou[p, g], kind="stable")
+        p, g = p[order], g[order]
+        _, first = np.unique(p, return_index=True)
+        p, g = p[first], g[first]
+        _, first = np.unique(g, return_index=True)
+        tp[p[first], t] = True
+    return tp
+
+
+def average_precision(recall, precision):
+    """COCO 101-point interpolated AP; recall/precision: [n, T] cumulative curves → [T]"""
+    mrec = np.concatenate([np.zeros((1, recall.shape[1])), recall, np.ones((1, recall.shape[1]))])
+    mpre = np.concatenate([np.ones((1, precision.shape[1])), precision, np.zeros((1, precision.shape[1]))])
+    mpre = np.flip(np.maximum.accumulate(np.flip(mpre, 0), 0), 0)  # precision envelope
+    points = np.linspace(0, 1, 101)
+    ap = np.empty(recall.shape[1])
+    for t in range(recall.shape[1]):
+        idx = np.searchsorted(mrec[:, t], points, side="left").clip(max=len(mrec) - 1)
+        ap[t] = mpre[idx, t].mean()
+    return ap
+
+
+# ------------------------------
+# Streaming detection evaluator
+# ------------------------------
+class DetectionEvaluator:
+    """
+    Accumulates per-frame matches, then reports P / R / F1 (IoU 0.5) and COCO-style mAP50 and
+    mAP50-95 over everything seen. Boxes are xyxy; convert CFAR / MOANA (x, y, w, h) boxes with
+    xywh_to_xyxy. Detections without scores (CFAR) all rank equally.
+    """
+
+    def __init__(self, iou_thresholds=IOU_THRESHOLDS, conf_thres=0.0):
+        self.iou_thresholds = np.asarray(iou_thresholds)
+        self.conf_thres = conf_thres
+        self.reset()
+
+    def reset(self):
+        self._tp, self._conf, self._cls, self._gt_cls = [], [], [], []
+        self.frames = 0
+
+    def update(self, pred_boxes, gt_boxes, scores=None, pred_cls=None, gt_cls=None):
+        pred_boxes, gt_boxes = _np(pred_boxes), _np(gt_boxes)
+        n, m = len(pred_boxes), len(gt_boxes)
+        scores = np.ones(n) if scores is None else _np(scores, 1)[:, 0]
+        pred_cls = np.zeros(n, dtype=np.int64) if pred_cls is None else _np(pred_cls, 1)[:, 0].astype(np.int64)
+        gt_cls = np.zeros(m, dtype=np.int64) if gt_cls is None else _np(gt_cls, 1)[:, 0].astype(np.int64)
+
+        iou = box_iou(pred_boxes, gt_boxes)
+        same = pred_cls[:, None] == gt_cls[None, :]
+        self._tp.append(match_detections(iou, self.iou_thresholds, same))
+        self._conf.append(scores)
+        self._cls.append(pred_cls)
+        self._gt_cls.append(gt_cls)
+        self.frames += 1
+
+    def update_dets(self, dets, gt_boxes, gt_cls=None):
+        """dets: [n, 6] (x1, y1, x2, y2, conf, cls) — one image of yolov11s.postprocess output"""
+        d = _np(dets, 6)
+        self.update(d[:, :4], gt_boxes, d[:, 4], d[:, 5], gt_cls)
+
+    def update_batched(self, dets, offsets, gt_boxes, gt_cls=None):
+        """postprocess_batched output (dets [N, 7], offsets [B + 1]) + per-image ground truth lists"""
+        d = _np(dets, 7)
+        offsets = _np(offsets, 1)[:, 0].astype(np.int64)
+        for i in range(len(offsets) - 1):
+            self.update_dets(d[offsets[i]:offsets[i + 1], :6], gt_boxes[i], None if gt_cls is None else gt_cls[i])
+
+    def compute(self):
+        tp = np.concatenate(self._tp) if self._tp else np.zeros((0, len(self.iou_thresholds)), dtype=bool)
+        conf = np.concatenate(self._conf) if self._conf else np.zeros(0)
+        cls = np.concatenate(self._cls) if self._cls else np.zeros(0, dtype=np.int64)
+        gt_cls = np.concatenate(self._gt_cls) if self._gt_cls else np.zeros(0, dtype=np.int64)
+
+        # point metrics at conf_thres, IoU 0.5
+        keep = conf >= self.conf_thres
+        n_tp = int(tp[keep, 0].sum())
+        n_fp = int(keep.sum()) - n_tp
+        n_fn = len(gt_cls) - n_tp
+        precision = n_tp / max(n_tp + n_fp, 1)
+        recall = n_tp / max(n_tp + n_fn, 1)
+        f1 = 2 * precision * recall / max(precision + recall, 1e-9)
+
+        # AP per class from the score-ranked curves
+        order = np.argsort(-conf, kind="stable")
+        tp, cls = tp[order], cls[order]
+        classes = np.unique(gt_cls)
+        ap = np.zeros((len(classes), len(self.iou_thresholds)))
+        for k, c in enumerate(classes):
+            sel = cls == c
+            n_gt = int((gt_cls == c).sum())
+            if not sel.any():
+                continue
+            ctp = np.cumsum(tp[sel], 0)
+            cfp = np.cumsum(~tp[sel], 0)
+            ap[k] = average_precision(ctp / n_gt, ctp / (ctp + cfp))
+
+        ap_t = ap.mean(0) if len(classes) else np.zeros(len(self.iou_thresholds))
+        return {
+            "frames": self.frames,
+            "TP": n_tp,
+            "FP": n_fp,
+            "FN": n_fn,
+            "precision": precision,
+            "recall": recall,
+            "f1": f1,
+            "mAP50": float(ap_t[0]),
+            "mAP50-95": float(ap_t.mean()),
+            "ap_per_iou": dict(zip(np.round(self.iou_thresholds, 2).tolist(), ap_t.tolist())),
+        }
+
+
+# ------------------------------
+# Streaming CLEAR-MOT accumulator
+# ------------------------------
+class MOTAccumulator:
+    """
+    MOTA / IDSW / P / R / F1 for tracker output, frame by frame. Per frame: one IoU matrix and
+    a Hungarian assignment gated at iou_threshold. Without gt_ids the ground truth index within
+    the frame stands in for the identity (as evaluate_with_mota in MOT.ipynb does).
+    """
+
+    def __init__(self, iou_threshold=0.5):
+        self.iou_threshold = iou_threshold
+        self.reset()
+
+    def reset(self):
+        self.tp = self.fp = self.fn = self.idsw = 0
+        self.frames = 0
+        self._last_id = {}
+
+    def update(self, gt_boxes, pred_boxes, pred_ids, gt_ids=None):
+        from scipy.optimize import linear_sum_assignment
+
+        gt_boxes, pred_boxes = _np(gt_boxes), _np(pred_boxes)
+        pred_ids = list(pred_ids)
+        iou = box_iou(gt_boxes, pred_boxes)
+        rows, cols = linear_sum_assignment(-iou) if iou.size else (np.zeros(0, int), np.zeros(0, int))
+        ok = iou[rows, cols] >= self.iou_threshold
+        rows, cols = rows[ok], cols[ok]
+
+        keys = rows.tolist() if gt_ids is None else [list(gt_ids)[r] for r in rows]
+        current = {g: pred_ids[c] for g, c in zip(keys, cols)}
+        self.idsw += sum(1 for g, p in current.items() if g in self._last_id and self._last_id[g] != p)
+        if gt_ids is None:
+            self._last_id = current  # frame indices only mean something frame to frame
+        else:
+            self._last_id.update(current)  # real identities: remembered across missed frames
+
+        self.tp += len(rows)
+        self.fp += len(pred_boxes) - len(rows)
+        self.fn += len(gt_boxes) - len(rows)
+        self.frames += 1
+
+    def compute(self):
+        precision = self.tp / max(self.tp + self.fp, 1)
+        recall = self.tp / max(self.tp + self.fn, 1)
+        return {
+            "TP": self.tp,
+            "FP": self.fp,
+            "FN": self.fn,
+            "IDSW": self.idsw,
+            "Precision": precision,
+            "Recall": recall,
+            "F1": 2 * precision * recall / max(precision + recall, 1e-9),
+            "MOTA": 1 - (self.fp + self.fn + self.idsw) / max(self.tp + self.fn, 1),
+        }
+
+
+# ------------------------------
+# Fold evaluation from YOLO txt files
+# ------------------------------
+def read_txt(path, width):
+    if not os.path.exists(path):
+        return np.zeros((0, width))
+    with open(path) as f:
+        values = f.read().split()
+    return np.array(values, dtype=np.float64).reshape(-1, width)
+
+
+def evaluate_dirs(gt_dir, pred_dir, conf_thres=0.0):
+    """
+    gt_dir: YOLO labels (cls xc yc w h); pred_dir: ultralytics save_txt + save_conf output
+    (cls xc yc w h conf). IoU is invariant to the normalisation, so no image sizes are needed.
+    """
+    ev = DetectionEvaluator(conf_thres=conf_thres)
+    for name in sorted(f for f in os.listdir(gt_dir) if f.endswith(".txt")):
+        gt = read_txt(os.path.join(gt_dir, name), 5)
+        pred = read_txt(os.path.join(pred_dir, name), 6)
+        ev.update(cxcywh_to_xyxy(pred[:, 1:5]), cxcywh_to_xyxy(gt[:, 1:5]), pred[:, 5], pred[:, 0], gt[:, 0])
+    return ev.compute()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="P/R/F1 + COCO mAP50 / mAP50-95 over a fold")
+    parser.add_argument("gt_dir", nargs="?", help="YOLO label txt files")
+    parser.add_argument("pred_dir", nargs="?", help="prediction txt files with a conf column")
+    parser.add_argument("--conf", type=float, default=0.0, help="threshold for the P/R/F1 point")
+    parser.add_argument("--bench", type=int, default=0, help="time N synthetic frames instead")
+    args = parser.parse_args()
+
+    if args.bench:
+        rng = np.random.default_rng(0)
+        ev = DetectionEvaluator()
+        frames = []
+        for _ in range(args.bench):
+            gt = xywh_to_xyxy(np.c_[rng.uniform(0, 600, (8, 2)), rng.uniform(5, 40, (8, 2))])
+            pred = np.concatenate([gt + rng.normal(0, 2, gt.shape), xywh_to_xyxy(
+                np.c_[rng.uniform(0, 600, (20, 2)), rng.uniform(5, 40, (20, 2))])])
+            frames.append((pred, gt, rng.uniform(0, 1, len(pred))))
+        t0 = time.perf_counter()
+        for pred, gt, conf in frames:
+            ev.update(pred, gt, conf)
+        result = ev.compute()
+        dt = time.perf_counter() - t0
+        print(f"{args.bench} frames in {dt:.2f} s ({args.bench / dt:.0f} frames/s)")
+    else:
+        result = evaluate_dirs(args.gt_dir, args.pred_dir, args.conf)
+    for k, v in result.items():
+        print(f"{k:12s} {v}")
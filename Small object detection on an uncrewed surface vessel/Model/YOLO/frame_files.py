@@ -0,0 +1,27 @@
+import os
+import struct
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+# ------------------------------
+# Radar frame file helpers (stdlib only: imported by the dataset tools, not just the detector)
+# ------------------------------
+def parse_timestamp(filename):
+    """name_<ts>.png → ts (int), None if the name does not follow the convention"""
+    name = os.path.basename(filename)
+    if not name.endswith(".png") or "_" not in name:
+        return None
+    try:
+        return int(name.split("_")[1].split(".")[0])
+    except ValueError:
+        return None
+
+
+def png_size(path):
+    """(width, height) from the IHDR chunk, without decoding any pixels"""
+    with open(path, "rb") as f:
+        head = f.read(24)
+    if len(head) < 24 or head[:8] != PNG_SIGNATURE or head[12:16] != b"IHDR":
+        raise ValueError(f"{path}: not a PNG")
+    return struct.unpack(">II", head[16:24])
@@ -1,3 +1,6 @@
+# The grids below are also defined in sweep.py, which runs them directly instead of through
+# .bat files: concurrent slots, resumable state, ASHA early stopping on mAP50-95(B).
+#   python sweep.py autotune --slots 2
 import itertools
 
 lr0_list = [0.001, 0.003, 0.005]
@@ -79,42 +82,21 @@ print("5 folds")
 
 import os
 import pandas as pd
+from results_store import ResultsStore
 
 base_path = r"C:\Users\PC1\AppData\Roaming\JetBrains\PyCharm2024.3\light-edit\autotune"
-bat_path = r"C:\Users\PC1\AppData\Roaming\JetBrains\PyCharm2024.3\light-edit\run_hyperparam_trials.bat"
 
-all_results = []
-for folder in os.listdir(base_path):
-    exp_path = os.path.join(base_path, folder)
-    csv_path = os.path.join(exp_path, 'results.csv')
-    if os.path.isfile(csv_path):
-        df = pd.read_csv(csv_path)
-        if 'metrics/mAP50-95(B)' in df.columns:
-            best_row = df.loc[df['metrics/mAP50-95(B)'].idxmax()]
-            all_results.append({
-                'experiment': folder,
-                'mAP50(B)': best_row['metrics/mAP50(B)'],
-                'mAP50-95(B)': best_row['metrics/mAP50-95(B)'],
-                'epoch': best_row['epoch']
-            })
-
-df_all = pd.DataFrame(all_results)
-top10 = df_all.sort_values(by='mAP50-95(B)', ascending=False).head(50)
+# cached per-trial best rows; the config comes back as typed columns (args.yaml), no .bat grepping
+store = ResultsStore(os.path.join(base_path, ".results_cache.pkl"))
+store.scan([base_path])
+top10 = store.top(50)
 
 print("Top 10 Experiments:")
-print(top10)
+print(top10[["experiment", "best_epoch", "mAP50", "mAP50-95",
+             "lr0", "momentum", "weight_decay", "hsv_h", "scale", "batch"]])
 
-with open(bat_path, 'r') as f:
-    lines = f.readlines()
-
-print("\nMatched commands from .bat:")
-
-for exp_name in top10['experiment']:
-    match = [line.strip() for line in lines if f'name={exp_name}' in line]
-    if match:
-        print(f"{exp_name}: {match[0]}")
-    else:
-        print(f"{exp_name}: ⚠ Not found in .bat")
+print("\nMean / std per config:")
+print(store.by_config(["lr0", "momentum", "weight_decay", "hsv_h", "scale"]).head(10))
 
 
 import os
@@ -145,35 +127,16 @@ plt.show()
 
 import os
 import pandas as pd
-from glob import glob
 import matplotlib.pyplot as plt
+from results_store import ResultsStore
 
 base_path = r"C:\Users\PC1\AppData\Roaming\JetBrains\PyCharm2024.3\light-edit\kfold_hyper_adam"
-all_folders = [f for f in os.listdir(base_path) if os.path.isdir(os.path.join(base_path, f))]
 
-results = []
-
-for folder in all_folders:
-    result_csv = os.path.join(base_path, folder, "results.csv")
-    if os.path.exists(result_csv):
-        df = pd.read_csv(result_csv)
-        if 'metrics/mAP50-95(B)' in df.columns:
-            best_row = df.loc[df['metrics/mAP50-95(B)'].idxmax()]
-            results.append({
-                "experiment": folder,
-                "epoch": int(best_row["epoch"]),
-                "mAP50": best_row["metrics/mAP50(B)"],
-                "mAP50-95": best_row["metrics/mAP50-95(B)"],
-                "precision": best_row["metrics/precision(B)"],
-                "recall": best_row["metrics/recall(B)"],
-                "val_loss": best_row["val/box_loss"] + best_row["val/cls_loss"] + best_row["val/dfl_loss"]
-            })
-
-df_all = pd.DataFrame(results)
-df_all = df_all.sort_values(by="mAP50-95", ascending=False)
+store = ResultsStore(os.path.join(base_path, ".results_cache.pkl"))
+df_all = store.scan([base_path])
 
 print("Top 10 Experiments by mAP50-95(B):")
-print(df_all.head(10)[["experiment", "epoch", "mAP50", "mAP50-95", "precision", "recall", "val_loss"]])
+print(store.top(10)[["experiment", "best_epoch", "mAP50", "mAP50-95", "precision", "recall", "val_loss"]])
 
 import os
 import pandas as pd
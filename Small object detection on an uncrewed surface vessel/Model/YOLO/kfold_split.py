@@ -0,0 +1,99 @@
+import os
+
+from sklearn.model_selection import TimeSeriesSplit
+
+from dataset_index import open_index
+
+
+def _write_if_changed(path, text):
+    # unchanged files keep their mtime, so reruns only touch folds that actually moved
+    if os.path.exists(path):
+        with open(path) as f:
+            if f.read() == text:
+                return False
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(text)
+    os.replace(tmp, path)
+    return True
+
+
+def _sync_links(link_dir, targets):
+    """make link_dir contain exactly {name: target} as symlinks, touching only the difference"""
+    os.makedirs(link_dir, exist_ok=True)
+    existing = set(os.listdir(link_dir))
+    changed = 0
+    for name in existing - set(targets):
+        os.remove(os.path.join(link_dir, name))
+        changed += 1
+    for name, target in targets.items():
+        path = os.path.join(link_dir, name)
+        if name in existing:
+            if os.path.islink(path) and os.readlink(path) == target:
+                continue
+            os.remove(path)
+        os.symlink(target, path)
+        changed += 1
+    return changed
+
+
+# ------------------------------
+# Fold generation
+# ------------------------------
+def make_time_folds(frames, kfold_dir, yaml_dir, n_splits=5, mode="list", nc=1, names=("ship",)):
+    """
+    TimeSeriesSplit folds over the timestamp-sorted frames without copying any image.
+    mode="list": fold_k/{train,val}.txt image lists (labels are found via images/ → labels/)
+    mode="symlink": fold_k/images|labels/{train,val}/ trees of symlinks to the originals
+    Reruns rewrite only lists/links that changed, so appending new timestamps is cheap.
+    """
+    os.makedirs(kfold_dir, exist_ok=True)
+    os.makedirs(yaml_dir, exist_ok=True)
+    folds = list(TimeSeriesSplit(n_splits=n_splits).split(frames))
+
+    changed = 0
+    for fold_idx, (train_idx, val_idx) in enumerate(folds):
+        fold_dir = os.path.join(kfold_dir, f"fold_{fold_idx}")
+        os.makedirs(fold_dir, exist_ok=True)
+        paths = {}
+        for subset, idxs in [("train", train_idx), ("val", val_idx)]:
+            if mode == "list":
+                list_path = os.path.join(fold_dir, f"{subset}.txt")
+                text = "".join(os.path.abspath(frames[i][1]).replace("\\", "/") + "\n" for i in idxs)
+                changed += _write_if_changed(list_path, text)
+                paths[subset] = list_path
+            elif mode == "symlink":
+                images = {os.path.basename(frames[i][1]): os.path.abspath(frames[i][1]) for i in idxs}
+                labels = {os.path.basename(frames[i][2]): os.path.abspath(frames[i][2])
+                          for i in idxs if frames[i][2]}
+                changed += _sync_links(os.path.join(fold_dir, "images", subset), images)
+                changed += _sync_links(os.path.join(fold_dir, "labels", subset), labels)
+                paths[subset] = os.path.join(fold_dir, "images", subset)
+            else:
+                raise ValueError(f"unknown mode {mode}")
+
+        yaml_text = (
+            f"train: {os.path.abspath(paths['train'])}\n"
+            f"val: {os.path.abspath(paths['val'])}\n"
+            f"nc: {nc}\n"
+            f"names: {list(names)}\n"
+        ).replace("\\", "/")
+        changed += _write_if_changed(os.path.join(yaml_dir, f"fold_{fold_idx}.yaml"), yaml_text)
+
+    print(f"{len(frames)} frames, {len(folds)} folds, {changed} files/links updated")
+    return folds
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Time-series k-fold splits as list files or symlink trees")
+    parser.add_argument("base_dir")
+    parser.add_argument("--splits", type=int, default=5)
+    parser.add_argument("--mode", default="list", choices=("list", "symlink"))
+    args = parser.parse_args()
+
+    with open_index(args.base_dir) as index:
+        frames = index.frames()
+    make_time_folds(frames, os.path.join(args.base_dir, "kfold_time_split"),
+                    os.path.join(args.base_dir, "kfold_split_yaml"), args.splits, args.mode)
@@ -0,0 +1,119 @@
+"""
+Training-step memory vs time for YOLOv11s.set_memory_lean().
+
+Modes:
+    baseline   plain training forward/backward
+    split_cat  concats fed straight into the following 1x1 conv (no extra concat buffer)
+    c3k2       split_cat + checkpoint every C3k2/SPPF block (recomputed in backward)
+    layer      split_cat + checkpoint layer1..layer4 (least memory, most recompute)
+
+Checkpointing trades roughly one extra forward pass of the checkpointed blocks per step for
+not keeping their activations, so expect the step time to grow by up to ~1/3 in "layer" mode
+while peak memory drops, which is what lets imgsz=2048 run at a larger batch on the same card.
+Peak memory is torch.cuda.max_memory_allocated on GPU, peak RSS (one process per mode) on CPU.
+--check compares every BatchNorm buffer after one step of each mode against the baseline,
+with the default momentum and with momentum=None (cumulative average over num_batches_tracked).
+"""
+import argparse
+import time
+
+import torch
+import torch.nn as nn
+
+from yolov11s import YOLOv11s
+
+MODES = {
+    "baseline": dict(checkpoint=None, split_cat=False),
+    "split_cat": dict(checkpoint=None, split_cat=True),
+    "c3k2": dict(checkpoint="c3k2", split_cat=True),
+    "layer": dict(checkpoint="layer", split_cat=True),
+}
+
+
+def run_mode(mode, imgsz, batch, steps, device, queue=None):
+    import resource
+
+    torch.manual_seed(0)
+    model = YOLOv11s(num_classes=1).to(device).train()
+    model.set_memory_lean(**MODES[mode])
+    opt = torch.optim.SGD(model.parameters(), lr=1e-3, momentum=0.9)
+    x = torch.rand(batch, 3, imgsz, imgsz, device=device)
+
+    def step():
+        opt.zero_grad(set_to_none=True)
+        loss = model(x).float().pow(2).mean()  # stand-in for the detection loss
+        loss.backward()
+        opt.step()
+
+    step()  # warm-up
+    if device == "cuda":
+        torch.cuda.synchronize()
+        torch.cuda.reset_peak_memory_stats()
+    t0 = time.perf_counter()
+    for _ in range(steps):
+        step()
+    if device == "cuda":
+        torch.cuda.synchronize()
+    step_s = (time.perf_counter() - t0) / steps
+
+    if device == "cuda":
+        peak_mb = torch.cuda.max_memory_allocated() / 2 ** 20
+    else:
+        peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+    result = (mode, step_s, peak_mb)
+    if queue is not None:
+        queue.put(result)
+    return result
+
+
+def check_bn_buffers(modes, imgsz=128, batch=2, steps=2, device="cpu"):
+    """one set of BN buffers per mode after `steps` training steps → raises if any differ from baseline"""
+    for momentum in (0.1, None):
+        ref = None
+        for mode in ["baseline"] + [m for m in modes if m != "baseline"]:
+            torch.manual_seed(0)
+            model = YOLOv11s(num_classes=1).to(device).train()
+            model.set_memory_lean(**MODES[mode])
+            for m in model.modules():
+                if isinstance(m, nn.BatchNorm2d):
+                    m.momentum = momentum
+            x = torch.rand(batch, 3, imgsz, imgsz, device=device)
+            for _ in range(steps):
+                model(x).float().pow(2).mean().backward()
+            buffers = {n: b.clone() for n, b in model.named_buffers() if "running_" in n or "num_batches" in n}
+            if ref is None:
+                ref = buffers
+                continue
+            bad = [n for n in ref if not torch.allclose(ref[n].float(), buffers[n].float(), rtol=1e-4, atol=1e-5)]
+            assert not bad, f"{mode} (momentum={momentum}): {len(bad)} BN buffers differ, e.g. {bad[:3]}"
+            print(f"{mode:>10} (momentum={momentum}): {len(buffers)} BN buffers match baseline")
+
+
+if __name__ == "__main__":
+    import multiprocessing as mp
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--imgsz", type=int, default=2048)
+    parser.add_argument("--batch", type=int, default=1)
+    parser.add_argument("--steps", type=int, default=3)
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    parser.add_argument("--device", default="cuda" if torch.cuda.is_available() else "cpu")
+    parser.add_argument("--check", action="store_true", help="compare BN buffers against baseline and exit")
+    args = parser.parse_args()
+
+    if args.check:
+        check_bn_buffers(args.modes, device=args.device)
+        raise SystemExit
+
+    print(f"imgsz {args.imgsz}, batch {args.batch}, {args.steps} steps on {args.device}")
+    ctx = mp.get_context("spawn")
+    base = None
+    for mode in args.modes:
+        q = ctx.Queue()
+        p = ctx.Process(target=run_mode, args=(mode, args.imgsz, args.batch, args.steps, args.device, q))
+        p.start()
+        mode, step_s, peak_mb = q.get()
+        p.join()
+        base = base or (step_s, peak_mb)
+        print(f"{mode:>10}: {step_s:7.2f} s/step ({step_s / base[0]:5.2f}x)   "
+              f"peak {peak_mb:9.1f} MB ({peak_mb / base[1]:5.2f}x)")
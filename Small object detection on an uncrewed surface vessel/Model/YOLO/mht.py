@@ -0,0 +1,500 @@
+import heapq
+import itertools
+import math
+from collections import defaultdict
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+from tracker import constant_velocity_model, overlapping_pairs, pair_iou, xywh_to_xyxy, xywh_to_z, z_to_xywh
+
+BIG = 1e9  # forbidden assignment (linear_sum_assignment rejects inf rows)
+
+
+# ------------------------------
+# Shared track tree
+# ------------------------------
+class TrackNode:
+    """one track at one frame; hypotheses and children point at it instead of copying it"""
+    __slots__ = ("track_id", "parent", "x", "P", "frame", "hits", "misses", "refs")
+
+    def __init__(self, track_id, parent, x, P, frame, hits, misses):
+        self.track_id = track_id
+        self.parent = parent
+        self.x = x
+        self.P = P
+        self.frame = frame
+        self.hits = hits
+        self.misses = misses
+        self.refs = 0
+
+
+class TrackTree:
+    """
+    Reference-counted node store. A node is held by every hypothesis that has it as a leaf and by
+    each of its children; when the count reaches zero its state is dropped and its parent released
+    in turn, so a dead branch goes in one sweep. live / peak count nodes for the memory budget.
+    """
+
+    def __init__(self):
+        self.live = 0
+        self.peak = 0
+
+    def new(self, track_id, parent, x, P, frame, hits, misses):
+        if parent is not None:
+            parent.refs += 1
+        self.live += 1
+        self.peak = max(self.peak, self.live)
+        return TrackNode(track_id, parent, x, P, frame, hits, misses)
+
+    def acquire(self, nodes):
+        for node in nodes:
+            node.refs += 1
+
+    def release(self, nodes):
+        stack = list(nodes)
+        while stack:
+            node = stack.pop()
+            node.refs -= 1
+            if node.refs <= 0:
+                stack.extend(self._free(node))
+
+    def discard(self, nodes):
+        """free nodes built this frame that no hypothesis picked up"""
+        for node in nodes:
+            if node.refs == 0 and node.x is not None:
+                self.release(self._free(node))
+
+    def cut(self, node):
+        """drop node's history (N-scan: everything behind it is decided)"""
+        if node.parent is not None:
+            parent, node.parent = node.parent, None
+            self.release([parent])
+
+    def _free(self, node):
+        self.live -= 1
+        node.x = node.P = None
+        parent, node.parent = node.parent, None
+        return [] if parent is None else [parent]
+
+
+# ------------------------------
+# k-best assignments
+# ------------------------------
+def _solve(C, forced, excluded):
+    """
+    C [n, m] with the rows/cols in forced removed (not masked) and the excluded pairs forbidden
+    → (cost, cols [n]) or None when infeasible
+    """
+    n, m = C.shape
+    row_in, col_in = np.ones(n, dtype=bool), np.ones(m, dtype=bool)
+    sub = C.copy()
+    if excluded:
+        er, ec = np.array(excluded).T
+        sub[er, ec] = BIG
+    cost = 0.0
+    if forced:
+        fr, fc = np.array(forced).T
+        row_in[fr] = col_in[fc] = False
+        cost = C[fr, fc].sum()
+    rows, cols = np.flatnonzero(row_in), np.flatnonzero(col_in)
+    sub = sub[rows][:, cols]
+    ri, ci = linear_sum_assignment(sub)
+    picked = sub[ri, ci]
+    if len(ri) < len(rows) or (picked >= BIG).any():
+        return None
+    out = np.empty(n, dtype=np.int64)
+    if forced:
+        out[fr] = fc
+    out[rows[ri]] = cols[ci]
+    return cost + picked.sum(), out
+
+
+def murty_k_best(problems, k, max_solves=None):
+    """
+    problems: list of (offset, C), C [n, m] costs (BIG = forbidden), every row assigned
+    returns: (up to k (cost, problem index, cols [n]) best first across all problems, solves)
+
+    Incremental Murty over all problems in one queue. A subproblem is pushed with its parent's
+    cost as lower bound and only solved once it reaches the top, so branches that cannot make the
+    k best are never solved; fixed rows/columns are cut out, so every solve is smaller than its
+    parent's. One-row problems are enumerated without a solver. After the first answer, at most
+    max_solves linear_sum_assignment calls are made.
+    """
+    heap, tie, out, solves = [], itertools.count(), [], 0
+    for p, (offset, C) in enumerate(problems):
+        if C.shape[0] <= 1:  # nothing to partition: list the options directly
+            options = [()] if C.shape[0] == 0 else [(c,) for c in np.flatnonzero(C[0] < BIG)]
+            for cols in options:
+                cost = offset + sum(C[0, c] for c in cols)
+                heapq.heappush(heap, (cost, next(tie), p, None, None, np.array(cols, dtype=np.int64)))
+        else:
+            heapq.heappush(heap, (offset + C.min(1).sum(), next(tie), p, (), (), None))
+
+    while heap and len(out) < k:
+        bound, _, p, forced, excluded, cols = heapq.heappop(heap)
+        offset, C = problems[p]
+        if cols is None:
+            if out and max_solves is not None and solves >= max_solves:
+                break
+            solves += 1
+            sol = _solve(C, forced, excluded)
+            if sol is not None:
+                heapq.heappush(heap, (offset + sol[0], next(tie), p, forced, excluded, sol[1]))
+            continue
+        out.append((bound, p, cols))
+        if forced is None:
+            continue
+        # partition around this answer: child t keeps the first t free pairs and bans the next
+        f_rows = {r for r, _ in forced}
+        free = [r for r in range(len(cols)) if r not in f_rows]
+        for t, r in enumerate(free):
+            child_forced = forced + tuple((q, int(cols[q])) for q in free[:t])
+            heapq.heappush(heap, (bound, next(tie), p, child_forced, excluded + ((r, int(cols[r])),), None))
+    return out, solves
+
+
+def k_best_sums(lists, k):
+    """independent hypothesis lists [(cost, leaves)] → the k cheapest combinations"""
+    out = lists[0]
+    for other in lists[1:]:
+        out = heapq.nsmallest(k, ((a[0] + b[0], a[1] + b[1]) for a in out for b in other), key=lambda h: h[0])
+    return out
+
+
+# ------------------------------
+# Engine
+# ------------------------------
+class MHTEngine:
+    """
+    Track-oriented MHT over a shared TrackTree. Tracks are partitioned into clusters that share
+    no gated detection; each cluster keeps its own ranked hypotheses (a global hypothesis is one
+    pick per cluster), clusters merge when a detection gates with several and split back into
+    single-track clusters once only one hypothesis is left. Per frame every distinct node is
+    predicted, gated and updated once (batched, SoATracker's Kalman model), then each touched
+    cluster expands its hypotheses with murty_k_best over [tracks, detections + misses].
+
+    Costs are negative log-likelihood ratios: 0.5 * Mahalanobis^2 - log(pd) - new_track_cost to
+    continue a track (the Gaussian normaliser folded into new_track_cost so wide young tracks
+    are not out-scored by births), -log(1 - pd) for a miss, 0 for a detection starting a track.
+    Budgets: max_hypotheses per cluster, prune_gap (log-ratio to the cluster's best), n_scan,
+    max_solves per frame, and max_nodes live tree nodes, the worst hypotheses going first.
+    """
+
+    def __init__(self, iou_threshold=0.1, max_hypotheses=10, n_scan=3, max_age=5, min_hits=2, pd=0.9,
+                 new_track_cost=5.0, prune_gap=5.0, max_solves=2000, max_nodes=100000, mahalanobis_gate=None,
+                 q=0.01, r=10.0, p0=500.0):
+        self.iou_threshold = iou_threshold
+        self.max_hypotheses = max_hypotheses
+        self.n_scan = n_scan
+        self.max_age = max_age
+        self.min_hits = min_hits
+        self.hit_offset = -math.log(pd) - new_track_cost
+        self.miss_cost = -math.log(1.0 - pd)
+        self.prune_gap = prune_gap
+        self.max_solves = max_solves
+        self.max_nodes = max_nodes
+        self.mahalanobis_gate = mahalanobis_gate
+        self.F, self.H, self.Q, self.R = constant_velocity_model(q, r)
+        self.p0 = p0
+        self.tree = TrackTree()
+        self.clusters = []  # each a best-first list of (cost, leaves)
+        self.next_id = 1
+        self.frame = 0
+        self.stats = {}
+
+    # ------------------------------
+    # Batched Kalman over distinct nodes
+    # ------------------------------
+    def _predict(self, nodes):
+        if not nodes:
+            return np.zeros((0, 7)), np.zeros((0, 7, 7))
+        x = np.stack([n.x for n in nodes])
+        P = np.stack([n.P for n in nodes])
+        shrink = x[:, 2] + x[:, 6] <= 0
+        x[shrink, 6] = 0.0
+        return x @ self.F.T, self.F @ P @ self.F.T + self.Q
+
+    def _gate(self, x, P, z):
+        """gated (node, det) pairs with their costs and updated states"""
+        tracks = xywh_to_xyxy(z_to_xywh(x[:, :4]))
+        i, j = overlapping_pairs(tracks, xywh_to_xyxy(z_to_xywh(z)))
+        ok = pair_iou(tracks[i], xywh_to_xyxy(z_to_xywh(z[j]))) >= self.iou_threshold
+        i, j = i[ok], j[ok]
+        S = P[i, :4, :4] + self.R
+        d = z[j] - x[i, :4]
+        Sinv_d = np.linalg.solve(S, d[:, :, None])[:, :, 0]
+        d2 = (d * Sinv_d).sum(1)
+        if self.mahalanobis_gate is not None:
+            ok = d2 <= self.mahalanobis_gate
+            i, j, d, d2, S = i[ok], j[ok], d[ok], d2[ok], S[ok]
+        K = np.linalg.solve(S, P[i, :4, :]).transpose(0, 2, 1)
+        xu = x[i] + (K @ d[:, :, None])[:, :, 0]
+        Pu = P[i] - K @ P[i, :4, :]
+        return i, j, 0.5 * d2 + self.hit_offset, xu, Pu
+
+    # ------------------------------
+    # One frame
+    # ------------------------------
+    def update(self, detections):
+        """
+        detections: [m, 4] (x, y, w, h)
+        returns: (boxes [k, 4] (x, y, w, h), ids [k]) of confirmed tracks the best global hypothesis
+        updated this frame
+        """
+        z = xywh_to_z(detections)
+        self.frame += 1
+        tree, frame = self.tree, self.frame
+
+        # distinct nodes across every hypothesis, each predicted and gated once
+        nodes, slot, owner = [], {}, []
+        for ci, hyps in enumerate(self.clusters):
+            for _, leaves in hyps:
+                for n in leaves:
+                    if id(n) not in slot:
+                        slot[id(n)] = len(nodes)
+                        nodes.append(n)
+                        owner.append(ci)
+        x, P = self._predict(nodes)
+        pi, pj, pcost, xu, Pu = self._gate(x, P, z) if len(nodes) and len(z) else \
+            (np.zeros(0, dtype=np.int64),) * 2 + (np.zeros(0), None, None)
+
+        # clusters joined by shared detections (union-find over clusters + detections)
+        n_clusters = len(self.clusters)
+        root = list(range(n_clusters + len(z)))
+
+        def find(a):
+            while root[a] != a:
+                root[a] = root[root[a]]
+                a = root[a]
+            return a
+
+        for a, b in zip(np.asarray(owner, dtype=np.int64)[pi].tolist(), (pj + n_clusters).tolist()):
+            ra, rb = find(a), find(b)
+            if ra != rb:
+                root[rb] = ra
+        groups = defaultdict(lambda: ([], [], []))  # root → (clusters, dets, pair indices)
+        for ci in range(n_clusters):
+            groups[find(ci)][0].append(ci)
+        for j in range(len(z)):
+            groups[find(n_clusters + j)][1].append(j)
+        for k, a in enumerate(pi.tolist()):
+            groups[find(owner[a])][2].append(k)
+
+        # children are built on demand and shared by every hypothesis that picks them
+        created, hit_cache, miss_cache, birth_cache = [], {}, {}, {}
+
+        def hit(k):
+            if k not in hit_cache:
+                parent = nodes[pi[k]]
+                hit_cache[k] = tree.new(parent.track_id, parent, xu[k].copy(), Pu[k].copy(), frame,
+                                        parent.hits + 1, 0)
+                created.append(hit_cache[k])
+            return hit_cache[k]
+
+        def miss(s):
+            if s not in miss_cache:
+                parent = nodes[s]
+                miss_cache[s] = None if parent.misses + 1 > self.max_age else \
+                    tree.new(parent.track_id, parent, x[s].copy(), P[s].copy(), frame, parent.hits, parent.misses + 1)
+                if miss_cache[s] is not None:
+                    created.append(miss_cache[s])
+            return miss_cache[s]
+
+        def birth(j):
+            if j not in birth_cache:
+                x0 = np.zeros(7)
+                x0[:4] = z[j]
+                P0 = np.eye(7) * self.p0
+                P0[4:, 4:] *= 20.0
+                birth_cache[j] = tree.new(None, None, x0, P0, frame, 1, 0)  # id once it survives the frame
+                created.append(birth_cache[j])
+            return birth_cache[j]
+
+        new_clusters, solves, largest = [], 0, 0
+        for cis, dets, pairs in groups.values():
+            if not cis:  # a detection nothing gated with: a new track on its own
+                new_clusters.append([(0.0, (birth(dets[0]),))])
+                continue
+            if len(pairs) == 1 and len(dets) == 1 and len(self.clusters[cis[0]]) == 1 \
+                    and len(self.clusters[cis[0]][0][1]) == 1 \
+                    and self.miss_cost - pcost[pairs[0]] > self.prune_gap:  # an isolated, unambiguous hit
+                new_clusters.append([(0.0, (hit(pairs[0]),))])
+                continue
+            hyps = k_best_sums([self.clusters[ci] for ci in cis], self.max_hypotheses)
+            if not dets:  # every track in the cluster missed
+                out = [(c + self.miss_cost * len(leaves),
+                        tuple(n for n in (miss(slot[id(l)]) for l in leaves) if n is not None)) for c, leaves in hyps]
+                new_clusters.append(out)
+                continue
+
+            # [cluster nodes, dets] cost / pair-index tables, then one [tracks, dets + misses] matrix per hypothesis
+            col = {j: c for c, j in enumerate(dets)}
+            g_rows = {s: r for r, s in enumerate(sorted({slot[id(l)] for _, leaves in hyps for l in leaves}))}
+            G = np.full((len(g_rows), len(dets)), BIG)
+            pair_of = np.full(G.shape, -1, dtype=np.int64)
+            for k in pairs:
+                if pi[k] in g_rows:  # else only in hypotheses k_best_sums left out
+                    r, c = g_rows[pi[k]], col[pj[k]]
+                    G[r, c], pair_of[r, c] = pcost[k], k
+            problems = []
+            for cost, leaves in hyps:
+                rows = [g_rows[slot[id(l)]] for l in leaves]
+                C = np.full((len(rows), len(dets) + len(rows)), BIG)
+                C[:, :len(dets)] = G[rows]
+                C[np.arange(len(rows)), len(dets) + np.arange(len(rows))] = self.miss_cost
+                problems.append((cost, C))
+            budget = max(0, self.max_solves - solves)
+            best, used = murty_k_best(problems, self.max_hypotheses, budget)
+            solves += used
+            largest = max(largest, len(g_rows))
+
+            out = []
+            for cost, p, cols in best:
+                leaves = hyps[p][1]
+                rows = [g_rows[slot[id(l)]] for l in leaves]
+                taken = set()
+                children = []
+                for leaf, r, c in zip(leaves, rows, cols.tolist()):
+                    if c < len(dets):
+                        children.append(hit(int(pair_of[r, c])))
+                        taken.add(c)
+                    else:
+                        node = miss(slot[id(leaf)])
+                        if node is not None:
+                            children.append(node)
+                children.extend(birth(j) for c, j in enumerate(dets) if c not in taken)
+                out.append((cost, tuple(children)))
+            new_clusters.append(out)
+
+        new_clusters = [self._rank(hyps) for hyps in new_clusters]
+        for hyps in new_clusters:
+            for _, leaves in hyps:
+                tree.acquire(leaves)
+        for hyps in self.clusters:
+            for _, leaves in hyps:
+                tree.release(leaves)
+        tree.discard(created)
+        for j in sorted(birth_cache):
+            if birth_cache[j].refs:
+                birth_cache[j].track_id = self.next_id
+                self.next_id += 1
+
+        self.clusters = self._split([self._n_scan(hyps) for hyps in new_clusters if hyps])
+        self._enforce_budget()
+        self.stats = {
+            "clusters": len(self.clusters),
+            "hypotheses": sum(len(h) for h in self.clusters),
+            "largest_cluster": largest,
+            "nodes": tree.live,
+            "peak_nodes": tree.peak,
+            "solves": solves,
+        }
+        return self.best()
+
+    # ------------------------------
+    # Pruning
+    # ------------------------------
+    def _rank(self, hyps):
+        """dedupe by leaf set, sort, drop past prune_gap / max_hypotheses"""
+        seen, out = set(), []
+        for cost, leaves in sorted(hyps, key=lambda h: h[0]):
+            key = frozenset(map(id, leaves))
+            if key in seen:
+                continue
+            if out and (cost - out[0][0] > self.prune_gap or len(out) >= self.max_hypotheses):
+                break
+            seen.add(key)
+            out.append((cost, leaves))
+        return out
+
+    def _decided(self, node):
+        """the node's ancestor at frame - n_scan (or its root, if younger)"""
+        while node.parent is not None and node.frame > self.frame - self.n_scan:
+            node = node.parent
+        return node
+
+    def _n_scan(self, hyps):
+        """keep hypotheses that agree with the best one n_scan frames back, then cut history there"""
+        if self.n_scan is None:
+            return hyps
+        limit = self.frame - self.n_scan
+
+        def settled(leaves):
+            return {id(a) for a in map(self._decided, leaves) if a.frame <= limit}
+
+        allowed = settled(hyps[0][1])
+        keep = [hyps[0]]
+        for h in hyps[1:]:
+            if settled(h[1]) <= allowed:
+                keep.append(h)
+            else:
+                self.tree.release(h[1])
+        for _, leaves in keep:
+            for leaf in leaves:
+                self.tree.cut(self._decided(leaf))
+        return keep
+
+    def _split(self, clusters):
+        """settled clusters (one hypothesis) fall apart into one cluster per track; costs rebased"""
+        out = []
+        for hyps in clusters:
+            if len(hyps) == 1:
+                out.extend([(0.0, (leaf,))] for leaf in hyps[0][1])
+            else:
+                best = hyps[0][0]
+                out.append([(c - best, leaves) for c, leaves in hyps])
+        return out
+
+    def _enforce_budget(self):
+        """release the least likely non-best hypotheses until the tree fits in max_nodes"""
+        if self.tree.live <= self.max_nodes:
+            return
+        ranked = sorted(((hyps[k][0] - hyps[0][0], ci, k) for ci, hyps in enumerate(self.clusters)
+                         for k in range(1, len(hyps))), reverse=True)
+        dropped = defaultdict(set)
+        for _, ci, k in ranked:
+            if self.tree.live <= self.max_nodes:
+                break
+            self.tree.release(self.clusters[ci][k][1])
+            dropped[ci].add(k)
+        for ci, ks in dropped.items():
+            self.clusters[ci] = [h for k, h in enumerate(self.clusters[ci]) if k not in ks]
+
+    # ------------------------------
+    # Output
+    # ------------------------------
+    def best(self):
+        """confirmed, updated-this-frame tracks of the best global hypothesis"""
+        leaves = [n for hyps in self.clusters for n in hyps[0][1]
+                  if n.misses == 0 and (n.hits >= self.min_hits or self.frame <= self.min_hits)]
+        if not leaves:
+            return np.zeros((0, 4)), np.zeros(0, dtype=np.int64)
+        return z_to_xywh(np.stack([n.x[:4] for n in leaves])), np.array([n.track_id for n in leaves])
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Time the MHT engine on synthetic crossing contacts")
+    parser.add_argument("--targets", type=int, default=100)
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--hypotheses", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    pos = rng.uniform(0, 40 * np.sqrt(args.targets), (args.targets, 2))
+    vel = rng.normal(0, 2, (args.targets, 2))
+    engine = MHTEngine(max_hypotheses=args.hypotheses)
+    times = []
+    for _ in range(args.frames):
+        pos += vel
+        seen = rng.random(args.targets) < 0.9
+        dets = np.c_[pos[seen] + rng.normal(0, 0.5, (seen.sum(), 2)), np.full((seen.sum(), 2), 12.0)]
+        t0 = time.perf_counter()
+        boxes, ids = engine.update(dets)
+        times.append(time.perf_counter() - t0)
+    ms = np.array(times[5:]) * 1000
+    print(f"{args.targets} targets: {len(ids)} confirmed, {engine.next_id - 1} ids issued, stats {engine.stats}")
+    print(f"update p50 {np.percentile(ms, 50):.2f} ms, p95 {np.percentile(ms, 95):.2f} ms")
@@ -0,0 +1,222 @@
+import hashlib
+import json
+import os
+import time
+
+import torch
+import torch.nn as nn
+
+from yolov11s import Conv, YOLOv11s
+
+CACHE_DIR = os.environ.get("YOLO_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "yolov11s"))
+KINDS = ("fused", "trace")
+
+
+# ------------------------------
+# Weights
+# ------------------------------
+def load_state_dict(path):
+    """
+    state_dict whose tensors are views into an mmap of the checkpoint: pages are read when a
+    tensor is first touched, not up front. Legacy (non-zip) checkpoints fall back to a full read.
+    """
+    try:
+        return torch.load(path, map_location="cpu", mmap=True, weights_only=True)
+    except RuntimeError:
+        return torch.load(path, map_location="cpu", weights_only=True)
+
+
+def file_digest(path, cache_dir=CACHE_DIR):
+    """sha256 of a file, memoised in cache_dir/digests.json by (size, mtime_ns) so it is read once per change"""
+    st = os.stat(path)
+    index_path = os.path.join(cache_dir, "digests.json")
+    key = os.path.abspath(path)
+    try:
+        with open(index_path) as f:
+            index = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        index = {}
+    entry = index.get(key)
+    if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+        return entry["sha256"]
+
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    index[key] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": h.hexdigest()}
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = index_path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(index, f, indent=1)
+    os.replace(tmp, index_path)
+    return h.hexdigest()
+
+
+def _fused_skeleton(model):
+    """
+    BN-folded structure of a meta-device YOLOv11s without running the folding math: every
+    conv gets a bias and its BatchNorm becomes Identity (fusing meta tensors goes through
+    torch's Python decompositions, seconds of imports for nothing).
+    """
+    for m in model.modules():
+        if isinstance(m, Conv) and isinstance(m.bn, nn.BatchNorm2d):
+            c = m.conv
+            m.conv = nn.Conv2d(c.in_channels, c.out_channels, c.kernel_size, c.stride, c.padding, c.dilation,
+                               c.groups, bias=True, device="meta")
+            m.bn = nn.Identity()
+    model.fused = True
+    return model
+
+
+def build_model(state_dict, num_classes=1, fused=False):
+    """
+    YOLOv11s built on the meta device (no random init) with state_dict's tensors assigned in
+    place (no copy). fused: state_dict is already BN-folded, so the structure is fused first.
+    """
+    with torch.device("meta"):
+        model = YOLOv11s(num_classes=num_classes)
+    if fused:
+        _fused_skeleton(model)
+    model.load_state_dict(state_dict, assign=True)
+    return model.eval(fused=True)
+
+
+# ------------------------------
+# Cached artifacts
+# ------------------------------
+def artifact_key(digest, num_classes, kind, imgsz=None, device="cpu"):
+    """weights hash + architecture + torch version (+ input shape and device for traced graphs)"""
+    parts = [digest[:16], f"yolov11s-nc{num_classes}", f"torch{torch.__version__}", kind]
+    if kind == "trace":
+        parts += [f"{imgsz}px", torch.device(device).type]
+    return "_".join(parts).replace("+", "-")
+
+
+def _save_atomic(save, obj, path):
+    tmp = path + ".tmp"
+    save(obj, tmp)
+    os.replace(tmp, path)
+
+
+def load_detector(weights=None, num_classes=1, kind="fused", imgsz=640, device="cpu", cache_dir=CACHE_DIR):
+    """
+    returns: (model, info). kind="fused": eager BN-folded YOLOv11s, any input size; the folded
+    state_dict is cached and mmap-loaded. kind="trace": frozen TorchScript for [1, 3, imgsz,
+    imgsz], cached with torch.jit.save (no model code or tracing on a hit). Without weights the
+    model is randomly initialised and nothing is cached.
+    """
+    assert kind in KINDS
+    t0 = time.perf_counter()
+    info = {"kind": kind, "cache": None, "path": None}
+    if weights is None:
+        model = YOLOv11s(num_classes=num_classes).eval(fused=True).to(device)
+        if kind == "trace":
+            with torch.no_grad():
+                model = torch.jit.freeze(torch.jit.trace(model, torch.zeros(1, 3, imgsz, imgsz, device=device)))
+        info["load_s"] = time.perf_counter() - t0
+        return model, info
+
+    key = artifact_key(file_digest(weights, cache_dir), num_classes, kind, imgsz, device)
+    path = os.path.join(cache_dir, key + (".pt" if kind == "fused" else ".ts"))
+    info["path"] = path
+    if os.path.exists(path):
+        info["cache"] = "hit"
+        if kind == "fused":
+            model = build_model(load_state_dict(path), num_classes, fused=True).to(device)
+        else:
+            model = torch.jit.load(path, map_location=device)
+    else:
+        info["cache"] = "miss"
+        model = build_model(load_state_dict(weights), num_classes).to(device)
+        os.makedirs(cache_dir, exist_ok=True)
+        if kind == "fused":
+            _save_atomic(torch.save, model.state_dict(), path)
+        else:
+            with torch.no_grad():
+                model = torch.jit.freeze(torch.jit.trace(model, torch.zeros(1, 3, imgsz, imgsz, device=device)))
+            _save_atomic(torch.jit.save, model, path)
+    info["load_s"] = time.perf_counter() - t0
+    return model, info
+
+
+# ------------------------------
+# Time to first detection
+# ------------------------------
+def _child(args):
+    """one cold detector process: load → first forward → first NMS; startup is the rest since spawn"""
+    import sys
+
+    from yolov11s import postprocess_batched
+
+    t_load = time.perf_counter()
+    if args.child == "baseline":  # what stream_inference.py did, eager torchvision import included
+        import torchvision  # noqa: F401
+
+        model = YOLOv11s(num_classes=1)
+        model.load_state_dict(torch.load(args.weights, map_location="cpu"))
+        model = model.to(args.device).eval(fused=True)
+        info = {"cache": None}
+    else:
+        model, info = load_detector(args.weights, kind=args.kind, imgsz=args.imgsz, device=args.device,
+                                    cache_dir=args.cache_dir)
+    t_forward = time.perf_counter()
+    with torch.no_grad():
+        pred = model(torch.rand(1, 3, args.imgsz, args.imgsz, device=args.device))
+        t_nms = time.perf_counter()
+        postprocess_batched(pred, 0.25)
+    t_done = time.perf_counter()
+    ttfd = time.time() - args.spawned_at
+    print(json.dumps({
+        "ttfd_s": ttfd,
+        "startup_s": ttfd - (t_done - t_load),
+        "load_s": t_forward - t_load,
+        "forward_s": t_nms - t_forward,
+        "nms_s": t_done - t_nms,
+        "cache": info["cache"],
+        "torchvision_imported": "torchvision" in sys.modules,
+    }))
+
+
+if __name__ == "__main__":
+    import argparse
+    import subprocess
+    import sys
+    import tempfile
+
+    parser = argparse.ArgumentParser(description="YOLOv11s cold start: time to first detection")
+    parser.add_argument("--weights", default=None, help="YOLOv11s state_dict (random weights if omitted)")
+    parser.add_argument("--kind", default="fused", choices=KINDS)
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--device", default="cuda" if torch.cuda.is_available() else "cpu")
+    parser.add_argument("--cache-dir", default=None, help="defaults to a fresh temporary directory")
+    parser.add_argument("--runs", type=int, default=3, help="cold processes per mode")
+    parser.add_argument("--child", default=None, choices=("baseline", "loader"), help=argparse.SUPPRESS)
+    parser.add_argument("--spawned-at", type=float, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args)
+        raise SystemExit(0)
+
+    tmp = tempfile.mkdtemp(prefix="yolo_cold_")
+    if args.weights is None:
+        args.weights = os.path.join(tmp, "weights.pt")
+        torch.save(YOLOv11s(num_classes=1).state_dict(), args.weights)
+    cache_dir = args.cache_dir or os.path.join(tmp, "cache")
+
+    def spawn(mode):
+        cmd = [sys.executable, os.path.abspath(__file__), "--child", mode, "--weights", args.weights,
+               "--kind", args.kind, "--imgsz", str(args.imgsz), "--device", args.device, "--cache-dir", cache_dir,
+               "--spawned-at", repr(time.time())]
+        out = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+        return json.loads(out.strip().splitlines()[-1])
+
+    print(f"kind {args.kind}, {args.imgsz}px on {args.device}, cache {cache_dir}")
+    rows = [("baseline", spawn("baseline")) for _ in range(args.runs)]
+    rows.append(("loader (cold cache)", spawn("loader")))
+    rows += [("loader (cached)", spawn("loader")) for _ in range(args.runs)]
+    for name, r in rows:
+        print(f"{name:>20}: first detection {r['ttfd_s']:6.2f} s  (python + imports {r['startup_s']:5.2f}  "
+              f"load {r['load_s']:5.2f}  forward {r['forward_s']:5.2f}  nms {r['nms_s']:5.2f})  "
+              f"torchvision imported: {r['torchvision_imported']}")
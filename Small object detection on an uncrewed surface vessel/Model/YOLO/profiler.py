@@ -0,0 +1,214 @@
+import json
+import os
+import time
+
+import torch
+import torch.nn as nn
+
+from yolov11s import C3k2, SPPF, Detect, YOLOv11s
+
+# modules reported by default; leaf convs/pools are only hooked to count FLOPs
+DEFAULT_TYPES = (C3k2, SPPF, Detect)
+DEFAULT_NAMES = ("layer1", "layer2", "layer3", "layer4")
+
+
+# ------------------------------
+# Analytic FLOPs of leaf modules (multiply-add = 2 FLOPs)
+# ------------------------------
+def leaf_flops(module, out):
+    if isinstance(module, nn.Conv2d):
+        k = module.kernel_size[0] * module.kernel_size[1]
+        flops = 2 * out.numel() * (module.in_channels // module.groups) * k
+        return flops + (out.numel() if module.bias is not None else 0)
+    if isinstance(module, nn.MaxPool2d):
+        k = module.kernel_size if isinstance(module.kernel_size, int) else module.kernel_size[0]
+        return out.numel() * k * k
+    if isinstance(module, nn.BatchNorm2d):
+        return 2 * out.numel()
+    if isinstance(module, nn.SiLU):
+        return 4 * out.numel()  # exp, add, div, mul
+    return 0
+
+
+def _tensors(obj):
+    if torch.is_tensor(obj):
+        return [obj]
+    if isinstance(obj, (list, tuple)):
+        return [t for o in obj for t in _tensors(o)]
+    return []
+
+
+# ------------------------------
+# Layer Profiler
+# ------------------------------
+class LayerProfiler:
+    """
+    Opt-in per-submodule instrumentation for YOLOv11s: wall time, output shape/bytes,
+    parameter count and analytic FLOPs, aggregated over frames.
+    Hooks only exist between enable() and disable(), so a disabled profiler costs nothing.
+    """
+
+    def __init__(self, model, names=DEFAULT_NAMES, types=DEFAULT_TYPES, sync_cuda=True, max_events=100000):
+        self.model = model
+        self.sync_cuda = sync_cuda
+        self.max_events = max_events
+        self.tracked = {
+            name: m for name, m in model.named_modules()
+            if name and (name in names or isinstance(m, types))
+        }
+        self.params = {name: sum(p.numel() for p in m.parameters()) for name, m in self.tracked.items()}
+        self._handles = []
+        self.reset()
+
+    @property
+    def enabled(self):
+        return bool(self._handles)
+
+    def reset(self):
+        self.stats = {}
+        self.events = []
+        self.frames = 0
+        self._flops = 0
+        self._stack = {}
+        self._t0 = time.perf_counter()
+
+    def _sync(self, x):
+        if self.sync_cuda and x is not None and x.is_cuda:
+            torch.cuda.synchronize(x.device)
+
+    def _pre(self, name):
+        def hook(module, inputs):
+            ts = _tensors(inputs)
+            self._sync(ts[0] if ts else None)
+            self._stack[name] = (time.perf_counter(), self._flops)
+        return hook
+
+    def _post(self, name):
+        def hook(module, inputs, output):
+            outs = _tensors(output)
+            self._sync(outs[0] if outs else None)
+            end = time.perf_counter()
+            start, flops0 = self._stack.pop(name)
+
+            s = self.stats.get(name)
+            if s is None:
+                s = self.stats[name] = {
+                    "type": type(module).__name__, "calls": 0, "total_ms": 0.0,
+                    "min_ms": float("inf"), "max_ms": 0.0, "params": self.params[name],
+                }
+            ms = (end - start) * 1000
+            s["calls"] += 1
+            s["total_ms"] += ms
+            s["min_ms"] = min(s["min_ms"], ms)
+            s["max_ms"] = max(s["max_ms"], ms)
+            s["out_shape"] = [list(t.shape) for t in outs]
+            s["out_bytes"] = sum(t.numel() * t.element_size() for t in outs)
+            s["flops"] = self._flops - flops0
+
+            if len(self.events) < self.max_events:
+                self.events.append({
+                    "name": name, "cat": s["type"], "ph": "X", "pid": 0, "tid": 0,
+                    "ts": (start - self._t0) * 1e6, "dur": (end - start) * 1e6,
+                    "args": {"out_shape": s["out_shape"], "flops": s["flops"]},
+                })
+        return hook
+
+    def _count(self, module, inputs, output):
+        self._flops += leaf_flops(module, output)
+
+    def _frame(self, module, inputs, output):
+        self.frames += _tensors(inputs)[0].shape[0]
+
+    def enable(self):
+        if self.enabled:
+            return self
+        for name, m in self.tracked.items():
+            self._handles.append(m.register_forward_pre_hook(self._pre(name)))
+            self._handles.append(m.register_forward_hook(self._post(name)))
+        for m in self.model.modules():
+            if isinstance(m, (nn.Conv2d, nn.MaxPool2d, nn.BatchNorm2d, nn.SiLU)):
+                self._handles.append(m.register_forward_hook(self._count))
+        self._handles.append(self.model.register_forward_hook(self._frame))
+        return self
+
+    def disable(self):
+        for h in self._handles:
+            h.remove()
+        self._handles = []
+        return self
+
+    def __enter__(self):
+        return self.enable()
+
+    def __exit__(self, *exc):
+        self.disable()
+
+    # ------------------------------
+    # Reporting
+    # ------------------------------
+    def summary(self):
+        rows = {}
+        for name, s in self.stats.items():
+            calls = max(s["calls"], 1)
+            rows[name] = dict(s, mean_ms=s["total_ms"] / calls, flops_per_call=s["flops"])
+        return {"frames": self.frames, "modules": rows}
+
+    def export_json(self, path):
+        with open(path, "w") as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def export_chrome_trace(self, path):
+        # open in chrome://tracing or https://ui.perfetto.dev
+        with open(path, "w") as f:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f)
+
+    def print_table(self):
+        total = sum(s["total_ms"] for n, s in self.stats.items() if n in DEFAULT_NAMES or n == "detect")
+        print(f"{'module':<24}{'type':<12}{'mean ms':>10}{'share':>8}{'GFLOPs':>10}{'params':>12}{'out MB':>10}  shape")
+        for name, s in self.summary()["modules"].items():
+            share = s["total_ms"] / total if total else 0.0
+            print(f"{name:<24}{s['type']:<12}{s['mean_ms']:10.2f}{share:8.1%}{s['flops'] / 1e9:10.2f}"
+                  f"{s['params']:12,d}{s['out_bytes'] / 2 ** 20:10.1f}  {s['out_shape']}")
+
+
+def profiler_from_env(model, var="YOLO_PROFILE"):
+    """
+    Field switch: YOLO_PROFILE=<prefix> enables profiling and names the output files
+    (<prefix>.json, <prefix>.trace.json). Returns None when the variable is unset.
+    """
+    prefix = os.environ.get(var)
+    if not prefix:
+        return None
+    return LayerProfiler(model).enable()
+
+
+def dump_profile(profiler, var="YOLO_PROFILE"):
+    if profiler is None:
+        return
+    prefix = os.environ.get(var, "yolo_profile")
+    profiler.export_json(prefix + ".json")
+    profiler.export_chrome_trace(prefix + ".trace.json")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Per-layer profile of YOLOv11s")
+    parser.add_argument("--imgsz", type=int, nargs="+", default=[640, 1024, 2048])
+    parser.add_argument("--frames", type=int, default=5)
+    parser.add_argument("--fused", action="store_true")
+    parser.add_argument("--out", default="yolov11s_profile")
+    args = parser.parse_args()
+
+    model = YOLOv11s(num_classes=1).eval(fused=args.fused)
+    for imgsz in args.imgsz:
+        x = torch.rand(1, 3, imgsz, imgsz)
+        with torch.no_grad():
+            model(x)  # warm-up outside the profile
+            with LayerProfiler(model) as prof:
+                for _ in range(args.frames):
+                    model(x)
+        print(f"\n== {imgsz}x{imgsz}, {prof.frames} frames")
+        prof.print_table()
+        prof.export_json(f"{args.out}_{imgsz}.json")
+        prof.export_chrome_trace(f"{args.out}_{imgsz}.trace.json")
@@ -0,0 +1,251 @@
+import argparse
+import copy
+import json
+import time
+
+import torch
+import torch.nn as nn
+from torch.ao.nn.quantized import FloatFunctional
+from torch.ao.quantization import DeQuantStub, QuantStub, convert, get_default_qconfig, prepare
+
+from stream_inference import decode_png, list_frames
+from yolov11s import C3k, C3k2, SPPF, Bottleneck, Conv, YOLOv11s, box_iou, postprocess_batched
+
+
+# ------------------------------
+# Quantizable building blocks
+# ------------------------------
+# Eager-mode static quantization needs every add / cat / mul to go through a
+# FloatFunctional so it gets its own observer and a real quantized kernel.
+# The subclasses below only change forward(); parameters and names are untouched.
+class QSiLU(nn.Module):
+    # no quantized SiLU kernel: x * sigmoid(x), both of which have one
+    def __init__(self):
+        super().__init__()
+        self.mul = FloatFunctional()
+
+    def forward(self, x):
+        return self.mul.mul(x, torch.sigmoid(x))
+
+
+class QuantizableBottleneck(Bottleneck):
+    def forward(self, x):
+        return self.skip_add.add(self.cv2(self.cv1(x)), x)
+
+
+class QuantizableC3k(C3k):
+    def forward(self, x):
+        return self.cv3(self.cat.cat([self.m(self.cv1(x)), self.cv2(x)], dim=1))
+
+
+class QuantizableC3k2(C3k2):
+    def forward(self, x):
+        x1 = self.cv1(x)
+        for m in self.m:
+            x1 = m(x1)
+        return self.cv2(self.cat.cat([x1, x], dim=1))
+
+
+class QuantizableSPPF(SPPF):
+    def forward(self, x):
+        x = self.cv1(x)
+        y1 = self.m(x)
+        y2 = self.m(y1)
+        y3 = self.m(y2)
+        return self.cv2(self.cat.cat([x, y1, y2, y3], dim=1))
+
+
+class QuantizableYOLOv11s(YOLOv11s):
+    def forward(self, x):
+        return super().forward(self.quant(x))
+
+
+_QUANTIZABLE = {
+    Bottleneck: (QuantizableBottleneck, "skip_add"),
+    C3k: (QuantizableC3k, "cat"),
+    C3k2: (QuantizableC3k2, "cat"),
+    SPPF: (QuantizableSPPF, "cat"),
+    YOLOv11s: (QuantizableYOLOv11s, "quant"),
+}
+
+
+def make_quantizable(model):
+    """
+    Copy of a float YOLOv11s with BN folded, FloatFunctional adds/cats, a QuantStub at the
+    input and a DeQuantStub after each Detect 1x1 conv (the grid decode stays in float).
+    """
+    model = copy.deepcopy(model).eval(fused=True)
+    for m in list(model.modules()):
+        if type(m) in _QUANTIZABLE:
+            cls, attr = _QUANTIZABLE[type(m)]
+            m.__class__ = cls
+            m.add_module(attr, QuantStub() if attr == "quant" else FloatFunctional())
+        if isinstance(m, Conv) and isinstance(m.act, nn.SiLU):
+            m.act = QSiLU()
+    detect = model.detect
+    detect.m = nn.ModuleList([nn.Sequential(conv, DeQuantStub()) for conv in detect.m])
+    return model
+
+
+# ------------------------------
+# Post-training static quantization
+# ------------------------------
+def spread(paths, n_frames):
+    """n_frames of paths evenly spread over the recording, not just the first minutes"""
+    step = max(1, len(paths) // n_frames)
+    return paths[::step][:n_frames]
+
+
+def calibration_paths(image_dir, n_frames):
+    return spread([path for _, path in list_frames(image_dir)], n_frames)
+
+
+def held_out_paths(image_dir, n_frames, exclude=()):
+    """evaluation frames of image_dir that are not in exclude (the calibration set)"""
+    exclude = set(exclude)
+    return spread([path for _, path in list_frames(image_dir) if path not in exclude], n_frames)
+
+
+def load_frames(paths, imgsz):
+    for path in paths:
+        arr = decode_png(path, imgsz)
+        yield torch.from_numpy(arr).permute(2, 0, 1).float().div_(255).unsqueeze(0)
+
+
+def load_calibration_frames(image_dir, imgsz, n_frames):
+    return load_frames(calibration_paths(image_dir, n_frames), imgsz)
+
+
+@torch.no_grad()
+def quantize_static(model, calib_frames, backend="x86"):
+    """
+    model: float YOLOv11s (weights loaded)
+    calib_frames: iterable of [1, 3, H, W] float tensors
+    returns: int8 model (eager quantized modules)
+    """
+    torch.backends.quantized.engine = backend
+    qmodel = make_quantizable(model)
+    qmodel.qconfig = get_default_qconfig(backend)
+    prepare(qmodel, inplace=True)
+
+    n = 0
+    for x in calib_frames:
+        qmodel(x)
+        n += 1
+    if n == 0:
+        raise ValueError("no calibration frames")
+
+    convert(qmodel, inplace=True)
+    return qmodel
+
+
+def save_quantized(qmodel, path, imgsz):
+    # traced TorchScript: loads with torch.jit.load, no model code or re-quantization needed
+    example = torch.zeros(1, 3, imgsz, imgsz)
+    with torch.no_grad():
+        traced = torch.jit.freeze(torch.jit.trace(qmodel, example))
+    torch.jit.save(traced, path)
+    return traced
+
+
+def load_quantized(path, backend="x86"):
+    torch.backends.quantized.engine = backend
+    return torch.jit.load(path, map_location="cpu")
+
+
+# ------------------------------
+# FP32 vs INT8 report
+# ------------------------------
+def detection_agreement(ref, test, iou_thres=0.5):
+    """
+    ref, test: [n, 6] detections of the same frame
+    returns: (matched, n_ref, n_test, mean |score diff| over matches)
+    """
+    if len(ref) == 0 or len(test) == 0:
+        return 0, len(ref), len(test), 0.0
+    iou = box_iou(ref[:, :4], test[:, :4])
+    iou[ref[:, 5].view(-1, 1) != test[:, 5].view(1, -1)] = 0
+    matched, score_diff = 0, 0.0
+    for i in range(len(ref)):  # greedy in ref score order
+        j = int(iou[i].argmax())
+        if iou[i, j] >= iou_thres:
+            matched += 1
+            score_diff += abs(float(ref[i, 4] - test[j, 4]))
+            iou[:, j] = 0
+    return matched, len(ref), len(test), score_diff / max(matched, 1)
+
+
+@torch.no_grad()
+def compare_models(fp32, int8, frames, conf_thres=0.25, iou_thres=0.45, threads=None):
+    if threads:
+        torch.set_num_threads(threads)
+    t_fp, t_q = [], []
+    matched = n_ref = n_test = 0
+    score_diff = 0.0
+    for x in frames:
+        t0 = time.perf_counter()
+        d_fp = postprocess_batched(fp32(x), conf_thres, iou_thres)[0]
+        t1 = time.perf_counter()
+        d_q = postprocess_batched(int8(x), conf_thres, iou_thres)[0]
+        t2 = time.perf_counter()
+        t_fp.append(t1 - t0)
+        t_q.append(t2 - t1)
+
+        m, r, t, s = detection_agreement(d_fp, d_q)
+        matched, n_ref, n_test, score_diff = matched + m, n_ref + r, n_test + t, score_diff + s * m
+
+    frames_n = max(len(t_fp), 1)
+    fp_ms = 1000 * sum(t_fp) / frames_n
+    q_ms = 1000 * sum(t_q) / frames_n
+    return {
+        "frames": len(t_fp),
+        "fp32_ms": fp_ms,
+        "int8_ms": q_ms,
+        "speedup": fp_ms / q_ms if q_ms else float("nan"),
+        "fp32_detections": n_ref,
+        "int8_detections": n_test,
+        "matched": matched,
+        "recall_vs_fp32": matched / n_ref if n_ref else 1.0,
+        "precision_vs_fp32": matched / n_test if n_test else 1.0,
+        "mean_score_diff": score_diff / matched if matched else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Post-training static INT8 quantization of YOLOv11s")
+    parser.add_argument("calib_dir", help="directory of name_<ts>.png radar frames")
+    parser.add_argument("--weights", default=None)
+    parser.add_argument("--imgsz", type=int, default=1024)
+    parser.add_argument("--calib-frames", type=int, default=64)
+    parser.add_argument("--eval-frames", type=int, default=16)
+    parser.add_argument("--eval-dir", default=None,
+                        help="frames for the FP32/INT8 agreement report (default: calib_dir frames not calibrated on)")
+    parser.add_argument("--backend", default="x86", choices=torch.backends.quantized.supported_engines)
+    parser.add_argument("--out", default="yolov11s_int8.pt")
+    parser.add_argument("--report", default="quantization_report.json")
+    args = parser.parse_args()
+
+    model = YOLOv11s(num_classes=1)
+    if args.weights:
+        model.load_state_dict(torch.load(args.weights, map_location="cpu"))
+    model = model.eval(fused=True)
+
+    calib = calibration_paths(args.calib_dir, args.calib_frames)
+    qmodel = quantize_static(model, load_frames(calib, args.imgsz), args.backend)
+    save_quantized(qmodel, args.out, args.imgsz)
+    print(f"saved {args.out}")
+
+    # agreement is measured on frames the observers never saw, or recall is biased upward
+    held_out = held_out_paths(args.eval_dir or args.calib_dir, args.eval_frames, exclude=calib)
+    if not held_out:
+        parser.error("no frames left for evaluation: pass --eval-dir or lower --calib-frames")
+    report = compare_models(model, load_quantized(args.out, args.backend), list(load_frames(held_out, args.imgsz)))
+    report.update(imgsz=args.imgsz, backend=args.backend, calib_frames=len(calib), eval_frames=len(held_out),
+                  eval_dir=args.eval_dir or args.calib_dir)
+    with open(args.report, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"latency  fp32 {report['fp32_ms']:8.2f} ms   int8 {report['int8_ms']:8.2f} ms   "
+          f"speedup {report['speedup']:.2f}x")
+    print(f"agreement  recall {report['recall_vs_fp32']:.3f}   precision {report['precision_vs_fp32']:.3f}   "
+          f"mean |score diff| {report['mean_score_diff']:.4f}")
@@ -0,0 +1,202 @@
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+METRICS = {
+    "mAP50-95": "metrics/mAP50-95(B)",
+    "mAP50": "metrics/mAP50(B)",
+    "precision": "metrics/precision(B)",
+    "recall": "metrics/recall(B)",
+}
+VAL_LOSSES = ("val/box_loss", "val/cls_loss", "val/dfl_loss")
+
+# hyper-parameters kept as typed columns
+PARAMS = {
+    "lr0": float, "momentum": float, "weight_decay": float, "hsv_h": float, "scale": float,
+    "batch": int, "imgsz": int, "epochs": int, "optimizer": str, "model": str,
+}
+# folder-name tokens from the kfold sweep: fold1_adam_lr0.001_wd0.0005_sz2048_bs3
+NAME_TOKENS = {"fold": "fold", "lr": "lr0", "wd": "weight_decay", "sz": "imgsz", "bs": "batch"}
+OPTIMIZERS = {"adam", "adamw", "sgd", "rmsprop", "nadam", "radam", "auto"}
+TOKEN_RE = re.compile(r"^([a-z]+?)(-?[\d.]+(?:e-?\d+)?)$")
+# config of a kfold trial: what its folder name encodes, so folds group whether or not args.yaml exists
+FOLD_KEYS = ["optimizer", *(v for v in NAME_TOKENS.values() if v != "fold")]
+
+
+# ------------------------------
+# Per-trial parsing
+# ------------------------------
+def parse_name(name):
+    """trial folder name → {param: value} (typed), empty for names like trial_19"""
+    out = {}
+    for token in name.split("_"):
+        if token in OPTIMIZERS:
+            out["optimizer"] = token
+            continue
+        m = TOKEN_RE.match(token)
+        if m and m.group(1) in NAME_TOKENS:
+            key = NAME_TOKENS[m.group(1)]
+            kind = PARAMS.get(key, int)
+            out[key] = kind(float(m.group(2))) if kind is int else kind(m.group(2))
+    return out
+
+
+def read_args_yaml(path):
+    """the flat key: value args.yaml ultralytics writes into every run folder (PARAMS + data only)"""
+    out = {}
+    if not os.path.exists(path):
+        return out
+    with open(path) as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            key, value = key.strip(), value.strip().strip("'\"")
+            if key in PARAMS and value not in ("", "null"):
+                try:
+                    out[key] = PARAMS[key](float(value)) if PARAMS[key] is int else PARAMS[key](value)
+                    if key == "optimizer":
+                        out[key] = out[key].lower()  # Adam in args.yaml, adam in folder names
+                except ValueError:
+                    pass
+            elif key == "data":
+                m = re.search(r"fold_(\d+)\.ya?ml$", value)
+                if m:
+                    out["fold"] = int(m.group(1))
+    return out
+
+
+def parse_trial(run_dir):
+    """best-epoch row of run_dir/results.csv + its config, or None without the metric column"""
+    df = pd.read_csv(os.path.join(run_dir, "results.csv"), skipinitialspace=True)
+    df.columns = df.columns.str.strip()
+    if METRICS["mAP50-95"] not in df.columns or df.empty:
+        return None
+    best = df.loc[df[METRICS["mAP50-95"]].idxmax()]
+    rec = {"best_epoch": int(best["epoch"]), "epochs_run": len(df)}
+    for short, col in METRICS.items():
+        rec[short] = float(best[col]) if col in df.columns else np.nan
+    rec["val_loss"] = float(sum(best[c] for c in VAL_LOSSES)) if all(c in df.columns for c in VAL_LOSSES) \
+        else np.nan
+    # folder name first, args.yaml (authoritative when present) on top
+    name = os.path.basename(os.path.normpath(run_dir))
+    rec.update(parse_name(name))
+    rec.update(read_args_yaml(os.path.join(run_dir, "args.yaml")))
+    return rec
+
+
+# ------------------------------
+# Cached store
+# ------------------------------
+class ResultsStore:
+    """
+    One row per trial (best epoch by mAP50-95 + typed config columns) over any number of sweep
+    folders. Parsed rows are cached in a pickle keyed by results.csv (mtime_ns, size), so a rerun
+    only stats the files and re-reads trials that are new or still training.
+    """
+
+    def __init__(self, cache_path=None):
+        self.cache_path = cache_path
+        self.df = None
+        if cache_path and os.path.exists(cache_path):
+            self.df = pd.read_pickle(cache_path)
+
+    def scan(self, sweep_dirs, verbose=True):
+        cached = {} if self.df is None else dict(zip(self.df["path"], zip(self.df["mtime_ns"], self.df["size"])))
+        keep, new, parsed = [], [], 0
+        for sweep_dir in sweep_dirs:
+            if not os.path.isdir(sweep_dir):
+                continue
+            sweep = os.path.basename(os.path.normpath(sweep_dir))
+            for e in os.scandir(sweep_dir):
+                csv_path = os.path.join(e.path, "results.csv")
+                try:
+                    st = os.stat(csv_path)
+                except (FileNotFoundError, NotADirectoryError):
+                    continue
+                if cached.get(csv_path) == (st.st_mtime_ns, st.st_size):
+                    keep.append(csv_path)
+                    continue
+                rec = parse_trial(e.path)
+                parsed += 1
+                if rec is not None:
+                    new.append(dict(rec, path=csv_path, mtime_ns=st.st_mtime_ns, size=st.st_size,
+                                    sweep=sweep, experiment=e.name))
+
+        old = self.df[self.df["path"].isin(keep)] if self.df is not None else None
+        frames = [f for f in (old, pd.DataFrame.from_records(new) if new else None) if f is not None]
+        df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=["path", "mtime_ns", "size"])
+        self.df = _typed(df)
+        if self.cache_path:
+            self.df.to_pickle(self.cache_path)
+        if verbose:
+            print(f"{len(self.df)} trials, {parsed} (re)parsed, {len(keep)} from cache")
+        return self.df
+
+    # ------------------------------
+    # Queries
+    # ------------------------------
+    def top(self, n=10, metric="mAP50-95", sweep=None):
+        df = self.df if sweep is None else self.df[self.df["sweep"] == sweep]
+        return df.sort_values(metric, ascending=False).head(n)
+
+    def by_config(self, keys=None, metrics=("mAP50-95", "mAP50", "precision", "recall"), sweep=None,
+                  min_count=1):
+        """
+        mean / std / count of metrics per config (by default every param column known for all
+        trials, so a column only some args.yaml files fill doesn't split a config), so k-fold
+        trials of one config collapse into one row. Sorted by mean of the first metric.
+        """
+        df = self.df if sweep is None else self.df[self.df["sweep"] == sweep]
+        keys = list(keys or [k for k in ["sweep", *PARAMS] if k in df.columns and df[k].notna().all()])
+        stats = df.groupby(keys, dropna=False)[list(metrics)].agg(["mean", "std", "count"])
+        stats.columns = [f"{m}_{s}" for m, s in stats.columns]
+        stats = stats[stats[f"{metrics[0]}_count"] >= min_count]
+        return stats.sort_values(f"{metrics[0]}_mean", ascending=False).reset_index()
+
+    def across_folds(self, n_folds=5, metric="mAP50-95", sweep=None, keys=None):
+        """
+        configs × folds table of metric, complete configs only, plus mean / std columns.
+        Configs are sweep + FOLD_KEYS by default (the folder-name fields), not every param column.
+        """
+        df = self.df if sweep is None else self.df[self.df["sweep"] == sweep]
+        if "fold" not in df.columns:
+            return pd.DataFrame()
+        df = df[df["fold"].notna()]
+        keys = list(keys or [k for k in ["sweep", *FOLD_KEYS] if k in df.columns])
+        # groupby/unstack rather than pivot_table: keeps configs with NaN params (e.g. no momentum)
+        table = df.groupby([*keys, "fold"], dropna=False)[metric].max().unstack("fold")
+        table = table[table.notna().sum(axis=1) == n_folds]
+        values = table.to_numpy(dtype=float)
+        table["mean"] = values.mean(axis=1) if len(table) else []
+        table["std"] = values.std(axis=1, ddof=1) if len(table) else []
+        return table.sort_values("mean", ascending=False)
+
+
+def _typed(df):
+    for key, kind in PARAMS.items():
+        if key in df.columns:
+            df[key] = df[key].astype("Int64" if kind is int else "float64" if kind is float else "string")
+    if "fold" in df.columns:
+        df["fold"] = df["fold"].astype("Int64")
+    return df
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Cached aggregation of ultralytics sweep results")
+    parser.add_argument("sweep_dirs", nargs="+", help="project folders holding one run folder per trial")
+    parser.add_argument("--cache", default="results_cache.pkl")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--folds", type=int, default=5)
+    args = parser.parse_args()
+
+    store = ResultsStore(args.cache)
+    store.scan(args.sweep_dirs)
+    pd.set_option("display.width", 200)
+    print(f"\nTop {args.top} trials by mAP50-95(B):")
+    print(store.top(args.top)[["sweep", "experiment", "best_epoch", "mAP50", "mAP50-95", "precision", "recall"]])
+    if "fold" in store.df.columns and store.df["fold"].notna().any():
+        print(f"\nTop {args.top} configs across {args.folds} folds:")
+        print(store.across_folds(args.folds).head(args.top))
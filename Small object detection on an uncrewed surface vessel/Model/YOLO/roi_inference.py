@@ -0,0 +1,253 @@
+import time
+
+import numpy as np
+import torch
+
+from cfar import CFARDetector
+from tiled_inference import tile_starts
+from yolov11s import YOLOv11s, batched_nms, postprocess_batched
+
+# stage 1 as tuned in CFAR/CA-CFAR.ipynb: cfar_detect(img, T=10, G=2, Pfa=1e-2)
+NOTEBOOK_CFAR = {"train": 10, "guard": 2, "pfa": 1e-2, "notebook_compat": True}
+
+
+# ------------------------------
+# Proposal clustering
+# ------------------------------
+def cluster_proposals(boxes, height, width, crop=640, margin=16):
+    """
+    boxes: [k, 4] (x, y, w, h) CFAR proposals → [C, 2] int64 (y0, x0) crop origins so that every
+    proposal lies inside some crop with `margin` pixels of context. Greedy: the top-most
+    uncovered proposal anchors a crop, centred horizontally on it; everything that then fits
+    is covered. Proposals too large for one crop (coastline, land) are tiled instead.
+    """
+    boxes = np.asarray(boxes, dtype=np.int64).reshape(-1, 4)
+    max_y0, max_x0 = max(0, height - crop), max(0, width - crop)
+    origins = []
+
+    big = (boxes[:, 2] > crop - 2 * margin) | (boxes[:, 3] > crop - 2 * margin)
+    for x, y, w, h in boxes[big]:
+        y_lo, x_lo = max(0, y - margin), max(0, x - margin)
+        y_hi, x_hi = min(height, y + h + margin), min(width, x + w + margin)
+        for ty in tile_starts(y_hi - y_lo, crop, 2 * margin):
+            for tx in tile_starts(x_hi - x_lo, crop, 2 * margin):
+                origins.append((min(y_lo + ty, max_y0), min(x_lo + tx, max_x0)))
+
+    small = boxes[~big]
+    small = small[np.argsort(small[:, 1], kind="stable")]
+    # context clipped to the frame, or proposals near the top/left edge never fit a crop at 0
+    x1, y1 = np.maximum(small[:, 0] - margin, 0), np.maximum(small[:, 1] - margin, 0)
+    x2 = np.minimum(small[:, 0] + small[:, 2] + margin, width)
+    y2 = np.minimum(small[:, 1] + small[:, 3] + margin, height)
+    uncovered = np.ones(len(small), dtype=bool)
+    while uncovered.any():
+        i = int(np.argmax(uncovered))
+        y0 = int(np.clip(y1[i], 0, max_y0))
+        x0 = int(np.clip((x1[i] + x2[i]) // 2 - crop // 2, 0, max_x0))
+        origins.append((y0, x0))
+        inside = (x1 >= x0) & (y1 >= y0) & (x2 <= x0 + crop) & (y2 <= y0 + crop)
+        inside[i] = True  # clipped at the frame edge: covered as well as it can be
+        uncovered &= ~inside
+    return torch.tensor(origins, dtype=torch.long).reshape(-1, 2)
+
+
+# ------------------------------
+# Two-stage detector
+# ------------------------------
+class ROIDetector:
+    """
+    CFAR-gated YOLOv11s: CA-CFAR proposes regions, the proposals are clustered into a few
+    crop x crop windows, only those are batched through the model and the detections are
+    shifted back to frame coordinates (overlapping crops merged by NMS). Falls back to the
+    full frame when CFAR reports more than max_proposals blobs or the crops would cover more
+    than max_area_ratio of the frame. Per-frame bookkeeping is left in last_stats.
+    """
+
+    def __init__(self, model, cfar=None, crop=640, margin=16, max_proposals=64, max_area_ratio=0.5,
+                 batch_size=8, conf_thres=0.25, iou_thres=0.45, merge_iou=0.5, max_det=300, full_detector=None):
+        assert crop % 32 == 0, "crop must be a multiple of the max stride (32)"
+        self.model = model
+        self.cfar = cfar or CFARDetector(**NOTEBOOK_CFAR)
+        self.crop = crop
+        self.margin = margin
+        self.max_proposals = max_proposals
+        self.max_area_ratio = max_area_ratio
+        self.batch_size = batch_size
+        self.conf_thres = conf_thres
+        self.iou_thres = iou_thres
+        self.merge_iou = merge_iou
+        self.max_det = max_det
+        self.full_detector = full_detector  # e.g. a TiledDetector for frames too big to run whole
+        self.last_stats = {}
+        self.totals = {"frames": 0, "fallbacks": 0, "pixels": 0, "full_pixels": 0}
+        self._buffer = None
+
+    def _crop_buffer(self, n, frame):
+        shape = (n, frame.shape[0], self.crop, self.crop)
+        buf = self._buffer
+        if buf is None or buf.shape[1:] != shape[1:] or buf.shape[0] < n \
+                or buf.device != frame.device or buf.dtype != frame.dtype:
+            buf = self._buffer = frame.new_empty(shape)
+        return buf[:n]
+
+    @torch.no_grad()
+    def full_frame(self, frame):
+        if self.full_detector is not None:
+            return self.full_detector(frame)
+        dets, _ = postprocess_batched(self.model(frame.unsqueeze(0)), self.conf_thres, self.iou_thres,
+                                      max_det=self.max_det)
+        return dets[:, :6]
+
+    @torch.no_grad()
+    def __call__(self, frame, image=None):
+        """
+        frame: Tensor [3, H, W] model input; image: the uint8 frame for CFAR ([H, W] or [H, W, 3]),
+        derived from frame (x 255) when omitted
+        returns: [n, 6] → (x1, y1, x2, y2, conf, class) in frame coordinates
+        """
+        if frame.dim() == 4:
+            frame = frame[0]
+        _, h, w = frame.shape
+        if image is None:
+            image = (frame.mean(0) * 255).clamp(0, 255).byte().cpu().numpy()
+
+        t0 = time.perf_counter()
+        proposals = self.cfar.detect(image)
+        origins = cluster_proposals(proposals, h, w, self.crop, self.margin) \
+            if len(proposals) <= self.max_proposals else None
+        t1 = time.perf_counter()
+
+        pixels = None if origins is None else len(origins) * min(self.crop, h) * min(self.crop, w)
+        fallback = pixels is None or pixels > self.max_area_ratio * h * w or h < self.crop or w < self.crop
+        if fallback:
+            dets = self.full_frame(frame)
+            pixels = h * w
+        else:
+            dets = self._run_crops(frame, origins)
+        self.last_stats = {
+            "proposals": len(proposals),
+            "crops": 0 if fallback else len(origins),
+            "fallback": fallback,
+            "pixel_ratio": pixels / (h * w),  # conv FLOPs scale with input pixels
+            "cfar_ms": (t1 - t0) * 1000,
+            "model_ms": (time.perf_counter() - t1) * 1000,
+        }
+        self.totals["frames"] += 1
+        self.totals["fallbacks"] += fallback
+        self.totals["pixels"] += pixels
+        self.totals["full_pixels"] += h * w
+        return dets
+
+    def _run_crops(self, frame, origins):
+        c = self.crop
+        all_dets = []
+        for i in range(0, len(origins), self.batch_size):
+            chunk = origins[i:i + self.batch_size]
+            batch = self._crop_buffer(len(chunk), frame)
+            for j, (y0, x0) in enumerate(chunk.tolist()):
+                batch[j].copy_(frame[:, y0:y0 + c, x0:x0 + c])
+            dets, _ = postprocess_batched(self.model(batch), self.conf_thres, self.iou_thres, max_det=None)
+            if dets.shape[0] == 0:
+                continue
+            origin = chunk.to(dets.device)[dets[:, 6].long()]
+            dets[:, 0:4] += origin.flip(1).repeat(1, 2).to(dets.dtype)  # shift to frame coords
+            all_dets.append(dets[:, :6])
+
+        if not all_dets:
+            return frame.new_zeros((0, 6))
+        dets = torch.cat(all_dets)
+        keep = batched_nms(dets[:, :4], dets[:, 4], dets[:, 5].long(), self.merge_iou)
+        return dets[keep][:self.max_det]
+
+    def compute_saved(self):
+        """fraction of full-frame model compute skipped so far"""
+        return 1 - self.totals["pixels"] / max(self.totals["full_pixels"], 1)
+
+
+# ------------------------------
+# ROI vs full-frame comparison
+# ------------------------------
+def compare_to_full(detector, frames, images=None, iou=0.5):
+    """
+    Runs every frame both ways. Full-frame detections are the reference: recall_vs_full is the
+    share of them the ROI path also finds (IoU >= iou), saved is the model compute skipped.
+    """
+    from evaluation import DetectionEvaluator
+
+    ev = DetectionEvaluator(iou_thresholds=[iou])
+    roi_s = full_s = 0.0
+    per_frame = []
+    for k, frame in enumerate(frames):
+        t0 = time.perf_counter()
+        full = detector.full_frame(frame)
+        t1 = time.perf_counter()
+        roi = detector(frame, None if images is None else images[k])
+        t2 = time.perf_counter()
+        full_s += t1 - t0
+        roi_s += t2 - t1
+        ev.update(roi[:, :4], full[:, :4], roi[:, 4], roi[:, 5], full[:, 5])
+        per_frame.append(dict(detector.last_stats, full_dets=len(full), roi_dets=len(roi)))
+    r = ev.compute()
+    return {
+        "frames": len(per_frame),
+        "recall_vs_full": r["recall"],
+        "recall_lost": 1 - r["recall"] if r["TP"] + r["FN"] else 0.0,
+        "compute_saved": detector.compute_saved(),
+        "fallbacks": detector.totals["fallbacks"],
+        "full_fps": len(per_frame) / max(full_s, 1e-9),
+        "roi_fps": len(per_frame) / max(roi_s, 1e-9),
+        "per_frame": per_frame,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+
+    from stream_inference import decode_png
+
+    parser = argparse.ArgumentParser(description="CFAR-gated ROI inference vs full-frame YOLOv11s")
+    parser.add_argument("image_dir", nargs="?", default=None, help="PNG frames (synthetic frames if omitted)")
+    parser.add_argument("--weights", default=None, help="YOLOv11s state_dict")
+    parser.add_argument("--frames", type=int, default=4)
+    parser.add_argument("--size", type=int, default=2048, help="synthetic frame size")
+    parser.add_argument("--crop", type=int, default=640)
+    parser.add_argument("--method", default="ca", choices=("ca", "os"))
+    parser.add_argument("--train", type=int, default=NOTEBOOK_CFAR["train"])
+    parser.add_argument("--guard", type=int, default=NOTEBOOK_CFAR["guard"],
+                        help="CFAR guard cells (> half the target size)")
+    parser.add_argument("--pfa", type=float, default=NOTEBOOK_CFAR["pfa"])
+    parser.add_argument("--conf", type=float, default=0.25)
+    parser.add_argument("--max-proposals", type=int, default=64)
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    model = YOLOv11s(num_classes=1)
+    if args.weights:
+        model.load_state_dict(torch.load(args.weights, map_location="cpu"))
+    model = model.eval(fused=True)
+
+    if args.image_dir:
+        names = sorted(f for f in os.listdir(args.image_dir) if f.endswith(".png"))[:args.frames]
+        images = [decode_png(os.path.join(args.image_dir, n)) for n in names]
+    else:  # echo-extracted frames are mostly black: a few sea-clutter patches + bright targets
+        rng = np.random.default_rng(0)
+        images = []
+        for _ in range(args.frames):
+            img = np.zeros((args.size, args.size, 3), dtype=np.uint8)
+            for y, x in rng.integers(0, args.size - 60, (3, 2)):
+                img[y:y + 60, x:x + 60] = rng.exponential(30, (60, 60, 1)).clip(0, 255).astype(np.uint8)
+            for y, x in rng.integers(50, args.size - 50, (6, 2)):
+                img[y:y + 5, x:x + 7] = 255
+            images.append(img)
+    frames = [torch.from_numpy(im).permute(2, 0, 1).float().div(255) for im in images]
+
+    cfar = CFARDetector(args.train, args.guard, args.pfa, args.method, notebook_compat=args.method == "ca")
+    detector = ROIDetector(model, cfar, crop=args.crop, conf_thres=args.conf, max_proposals=args.max_proposals)
+    result = compare_to_full(detector, frames, images)
+    for f in result.pop("per_frame"):
+        print(f"proposals {f['proposals']:4d}  crops {f['crops']:3d}  fallback {f['fallback']!s:5}  "
+              f"pixels {f['pixel_ratio']:6.1%}  dets roi/full {f['roi_dets']}/{f['full_dets']}")
+    print(f"compute saved {result['compute_saved']:.1%}, recall lost vs full frame {result['recall_lost']:.1%}, "
+          f"{result['fallbacks']} fallbacks")
+    print(f"full frame {result['full_fps']:.2f} frames/s, ROI {result['roi_fps']:.2f} frames/s")
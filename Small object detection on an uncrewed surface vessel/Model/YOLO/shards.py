@@ -0,0 +1,219 @@
+import json
+import os
+import time
+import zlib
+
+import numpy as np
+import torch
+from PIL import Image
+from torch.utils.data import Dataset
+
+from dataset_index import open_index
+
+# shard layout (one directory per shard):
+#   frames.npy      [N, H, W, 3] uint8 (raw, memory-mapped)  or  frames.bin + frame_offsets.npy (zlib)
+#   boxes.npy       [M, 5] float32 → (cls, xc, yc, w, h), YOLO-normalised, all frames back to back
+#   offsets.npy     [N + 1] int64 → boxes of frame i are boxes[offsets[i]:offsets[i + 1]]
+#   timestamps.npy  [N] int64
+#   meta.json
+
+
+def read_yolo_labels(label_path):
+    if not label_path or not os.path.exists(label_path):
+        return np.zeros((0, 5), dtype=np.float32)
+    with open(label_path) as f:
+        values = f.read().split()
+    return np.array(values, dtype=np.float32).reshape(-1, 5)
+
+
+# ------------------------------
+# Packer
+# ------------------------------
+def _write_shard(shard_dir, frames, imgsz, compress):
+    os.makedirs(shard_dir, exist_ok=True)
+    n = len(frames)
+    first = np.array(Image.open(frames[0][1]).convert("RGB"))
+    h, w = (imgsz, imgsz) if imgsz else first.shape[:2]
+
+    boxes, offsets, timestamps = [], [0], []
+    if compress:
+        blob = open(os.path.join(shard_dir, "frames.bin"), "wb")
+        frame_offsets = [0]
+    else:
+        # written through a memmap, so a shard never has to fit in RAM
+        out = np.lib.format.open_memmap(os.path.join(shard_dir, "frames.npy"), mode="w+",
+                                        dtype=np.uint8, shape=(n, h, w, 3))
+
+    for i, (ts, image_path, label_path) in enumerate(frames):
+        img = Image.open(image_path).convert("RGB")
+        if img.size != (w, h):
+            if not imgsz:
+                raise ValueError(f"{image_path}: size {img.size} != {(w, h)}, pass imgsz to resize")
+            img = img.resize((w, h), Image.BILINEAR)
+        arr = np.asarray(img)
+        if compress:
+            data = zlib.compress(arr.tobytes(), compress)
+            blob.write(data)
+            frame_offsets.append(frame_offsets[-1] + len(data))
+        else:
+            out[i] = arr
+
+        b = read_yolo_labels(label_path)
+        boxes.append(b)
+        offsets.append(offsets[-1] + len(b))
+        timestamps.append(ts)
+
+    if compress:
+        blob.close()
+        np.save(os.path.join(shard_dir, "frame_offsets.npy"), np.array(frame_offsets, dtype=np.int64))
+    else:
+        out.flush()
+        del out
+    np.save(os.path.join(shard_dir, "boxes.npy"), np.concatenate(boxes).astype(np.float32))
+    np.save(os.path.join(shard_dir, "offsets.npy"), np.array(offsets, dtype=np.int64))
+    np.save(os.path.join(shard_dir, "timestamps.npy"), np.array(timestamps, dtype=np.int64))
+    with open(os.path.join(shard_dir, "meta.json"), "w") as f:
+        json.dump({"frames": n, "height": h, "width": w, "compress": compress}, f)
+
+
+def pack_shards(frames, out_dir, shard_frames=128, imgsz=None, compress=0):
+    """
+    frames: [(ts, image_path, label_path)] in timestamp order (DatasetIndex.frames())
+    compress: 0 = raw uint8 (zero-copy reads), 1-9 = per-frame zlib level
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    shards = []
+    for k in range(0, len(frames), shard_frames):
+        name = f"shard_{k // shard_frames:05d}"
+        _write_shard(os.path.join(out_dir, name), frames[k:k + shard_frames], imgsz, compress)
+        shards.append(name)
+    with open(os.path.join(out_dir, "shards.json"), "w") as f:
+        json.dump({"shards": shards, "frames": len(frames)}, f)
+    return shards
+
+
+# ------------------------------
+# Dataset
+# ------------------------------
+class _Shard:
+    def __init__(self, shard_dir):
+        self.dir = shard_dir
+        with open(os.path.join(shard_dir, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.offsets = np.load(os.path.join(shard_dir, "offsets.npy"))
+        self.timestamps = np.load(os.path.join(shard_dir, "timestamps.npy"))
+        self._frames = self._boxes = self._blob = None
+
+    def open(self):
+        # opened lazily so every DataLoader worker maps the files itself
+        if self._boxes is None:
+            # copy-on-write maps: writable views for torch.from_numpy, file never modified
+            self._boxes = np.load(os.path.join(self.dir, "boxes.npy"), mmap_mode="c")
+            if self.meta["compress"]:
+                self._blob = np.load(os.path.join(self.dir, "frame_offsets.npy"))
+                self._frames = np.memmap(os.path.join(self.dir, "frames.bin"), dtype=np.uint8, mode="r")
+            else:
+                self._frames = np.load(os.path.join(self.dir, "frames.npy"), mmap_mode="c")
+        return self
+
+    def frame(self, i):
+        if not self.meta["compress"]:
+            return self._frames[i]  # view into the page cache, no copy
+        a, b = self._blob[i], self._blob[i + 1]
+        raw = zlib.decompress(self._frames[a:b].tobytes())
+        return np.frombuffer(raw, dtype=np.uint8).reshape(self.meta["height"], self.meta["width"], 3).copy()
+
+    def boxes(self, i):
+        return self._boxes[self.offsets[i]:self.offsets[i + 1]]
+
+
+class ShardDataset(Dataset):
+    """
+    Serves (frame [H, W, 3] uint8, boxes [n, 5] float32, timestamp) straight out of the packed
+    shards; with raw shards the tensors are views of the memory map (no decode, no copy).
+    """
+
+    def __init__(self, root):
+        with open(os.path.join(root, "shards.json")) as f:
+            names = json.load(f)["shards"]
+        self.shards = [_Shard(os.path.join(root, n)) for n in names]
+        self.cum = np.cumsum([0] + [s.meta["frames"] for s in self.shards])
+
+    def __len__(self):
+        return int(self.cum[-1])
+
+    def __getitem__(self, idx):
+        if idx < 0:
+            idx += len(self)
+        k = int(np.searchsorted(self.cum, idx, side="right") - 1)
+        shard = self.shards[k].open()
+        i = idx - int(self.cum[k])
+        frame = torch.from_numpy(shard.frame(i))
+        boxes = torch.from_numpy(shard.boxes(i))
+        return frame, boxes, int(shard.timestamps[i])
+
+
+def shard_collate(batch):
+    """→ images [B, 3, H, W] float 0-1, targets [n, 6] (image_idx, cls, xc, yc, w, h), timestamps [B]"""
+    frames, boxes, ts = zip(*batch)
+    images = torch.stack(frames).permute(0, 3, 1, 2).float().div_(255)
+    targets = torch.cat([torch.cat([torch.full((len(b), 1), i, dtype=b.dtype), b], 1) for i, b in enumerate(boxes)])
+    return images, targets, torch.tensor(ts)
+
+
+class PNGDataset(Dataset):
+    """the per-file PNG + txt path, for comparison"""
+
+    def __init__(self, frames):
+        self.frames = frames
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __getitem__(self, idx):
+        ts, image_path, label_path = self.frames[idx]
+        frame = torch.from_numpy(np.array(Image.open(image_path).convert("RGB")))
+        return frame, torch.from_numpy(read_yolo_labels(label_path)), ts
+
+
+def benchmark(dataset, batch_size=4, workers=0, max_batches=None):
+    from torch.utils.data import DataLoader
+
+    loader = DataLoader(dataset, batch_size=batch_size, num_workers=workers, collate_fn=shard_collate)
+    n, t0 = 0, time.perf_counter()
+    for b, (images, targets, ts) in enumerate(loader):
+        n += images.shape[0]
+        if max_batches and b + 1 >= max_batches:
+            break
+    return n / (time.perf_counter() - t0)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Pack radar frames into memory-mapped shards")
+    parser.add_argument("base_dir", help="dataset root with images/<split> and labels/<split>")
+    parser.add_argument("--split", default="train")
+    parser.add_argument("--out", default=None, help="defaults to base_dir/shards/<split>")
+    parser.add_argument("--shard-frames", type=int, default=128)
+    parser.add_argument("--imgsz", type=int, default=None)
+    parser.add_argument("--compress", type=int, default=0, help="0 = raw, 1-9 = zlib level")
+    parser.add_argument("--bench", action="store_true", help="compare loader throughput with the PNG path")
+    parser.add_argument("--workers", type=int, default=0)
+    args = parser.parse_args()
+
+    out = args.out or os.path.join(args.base_dir, "shards", args.split)
+    with open_index(args.base_dir, splits=(args.split,)) as index:
+        frames = index.frames(image_dir=os.path.join(args.base_dir, "images", args.split))
+
+    t0 = time.perf_counter()
+    shards = pack_shards(frames, out, args.shard_frames, args.imgsz, args.compress)
+    print(f"packed {len(frames)} frames into {len(shards)} shards in {time.perf_counter() - t0:.1f} s")
+
+    if args.bench:
+        png_fps = benchmark(PNGDataset(frames), workers=args.workers)
+        shard_fps = benchmark(ShardDataset(out), workers=args.workers)  # first pass: cold page cache
+        shard_warm = benchmark(ShardDataset(out), workers=args.workers)
+        print(f"PNG   {png_fps:8.1f} frames/s")
+        print(f"shard {shard_fps:8.1f} frames/s cold, {shard_warm:8.1f} frames/s warm "
+              f"({shard_warm / png_fps:.1f}x)")
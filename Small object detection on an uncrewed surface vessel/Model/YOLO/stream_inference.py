@@ -0,0 +1,231 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import torch
+from PIL import Image
+
+from frame_files import parse_timestamp
+from yolov11s import postprocess_batched
+
+
+# ------------------------------
+# Frame discovery
+# ------------------------------
+def list_frames(image_dir):
+    """returns: [(ts, path)] sorted by timestamp"""
+    frames = []
+    for f in os.listdir(image_dir):
+        ts = parse_timestamp(f)
+        if ts is not None:
+            frames.append((ts, os.path.join(image_dir, f)))
+    frames.sort(key=lambda x: x[0])
+    return frames
+
+
+def decode_png(path, image_size=None):
+    img = Image.open(path).convert("RGB")
+    if image_size is not None and img.size != (image_size, image_size):
+        img = img.resize((image_size, image_size), Image.BILINEAR)
+    return np.array(img)  # [H, W, 3] uint8
+
+
+# ------------------------------
+# Per-stage throughput bookkeeping
+# ------------------------------
+class StageStats:
+    def __init__(self, *stages):
+        self._lock = threading.Lock()
+        self.frames = {s: 0 for s in stages}
+        self.busy = {s: 0.0 for s in stages}
+        self.wall_start = None
+        self.wall_end = None
+
+    def add(self, stage, frames, seconds):
+        with self._lock:
+            self.frames[stage] += frames
+            self.busy[stage] += seconds
+
+    def report(self):
+        wall = (self.wall_end or time.perf_counter()) - (self.wall_start or time.perf_counter())
+        out = {}
+        for s in self.frames:
+            n, t = self.frames[s], self.busy[s]
+            out[s] = {"frames": n, "busy_s": t, "fps": n / t if t > 0 else float("nan")}
+        total = max(self.frames.values()) if self.frames else 0
+        out["end_to_end"] = {"frames": total, "wall_s": wall, "fps": total / wall if wall > 0 else float("nan")}
+        return out
+
+
+# ------------------------------
+# Streaming Detector
+# ------------------------------
+class StreamingDetector:
+    """
+    PNG decode (thread pool) → reused batch buffers → YOLOv11s + postprocess, results in timestamp order.
+    Memory is bounded by `prefetch` decoded frames plus `n_buffers` input batches.
+    """
+
+    def __init__(self, model, batch_size=4, image_size=None, decode_workers=4, prefetch=16, n_buffers=2,
+                 conf_thres=0.25, iou_thres=0.45, device="cpu"):
+        self.model = model
+        self.batch_size = batch_size
+        self.image_size = image_size
+        self.decode_workers = decode_workers
+        self.prefetch = max(prefetch, batch_size)
+        self.n_buffers = n_buffers
+        self.conf_thres = conf_thres
+        self.iou_thres = iou_thres
+        self.device = torch.device(device)
+        self.pin_memory = self.device.type == "cuda"
+        self.stats = StageStats("decode", "batch", "model", "postprocess")
+
+    def _decode(self, path):
+        t0 = time.perf_counter()
+        arr = decode_png(path, self.image_size)
+        self.stats.add("decode", 1, time.perf_counter() - t0)
+        return arr
+
+    def _fill(self, frames, free_q, ready_q, stop):
+        try:
+            with ThreadPoolExecutor(self.decode_workers) as pool:
+                pending = deque()
+                it = iter(frames)
+                buf, metas = None, []
+                frame_hw = None
+
+                def submit_next():
+                    item = next(it, None)
+                    if item is not None:
+                        pending.append((item, pool.submit(self._decode, item[1])))
+
+                for _ in range(self.prefetch):
+                    submit_next()
+
+                while pending and not stop.is_set():
+                    (ts, path), fut = pending.popleft()
+                    arr = fut.result()
+                    submit_next()  # keep at most `prefetch` frames in flight
+
+                    t0 = time.perf_counter()
+                    if frame_hw is None:  # buffer pool is sized by the first frame
+                        frame_hw = arr.shape[:2]
+                        for _ in range(self.n_buffers):
+                            free_q.put(torch.empty((self.batch_size, 3, *frame_hw), dtype=torch.uint8,
+                                                   pin_memory=self.pin_memory))
+                    if buf is None:
+                        buf = self._take(free_q, stop)
+                        if buf is None:
+                            break
+                    if arr.shape[:2] != frame_hw:
+                        raise ValueError(f"{path}: frame size {arr.shape[:2]} != {frame_hw}, "
+                                         f"set image_size to resize")
+                    buf[len(metas)].copy_(torch.from_numpy(arr).permute(2, 0, 1))
+                    metas.append((ts, path))
+                    self.stats.add("batch", 1, time.perf_counter() - t0)
+
+                    if len(metas) == self.batch_size:
+                        ready_q.put((buf, metas))
+                        buf, metas = None, []
+
+                if metas and not stop.is_set():
+                    ready_q.put((buf, metas))
+                for _, fut in pending:
+                    fut.cancel()
+        except Exception as e:  # surfaced in the consumer
+            ready_q.put(e)
+            return
+        ready_q.put(None)
+
+    @staticmethod
+    def _take(free_q, stop):
+        # back-pressure: wait for the model to hand a buffer back
+        while not stop.is_set():
+            try:
+                return free_q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return None
+
+    @torch.no_grad()
+    def run(self, frames):
+        """
+        frames: [(ts, path)] in timestamp order (see list_frames)
+        yields: (ts, path, dets [n, 6] → (x1, y1, x2, y2, conf, class))
+        """
+        free_q = queue.Queue()
+        ready_q = queue.Queue(maxsize=self.n_buffers)
+        stop = threading.Event()
+        self.stats = StageStats("decode", "batch", "model", "postprocess")
+        filler = threading.Thread(target=self._fill, args=(frames, free_q, ready_q, stop), daemon=True)
+
+        self.stats.wall_start = time.perf_counter()
+        filler.start()
+        try:
+            while True:
+                item = ready_q.get()
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                buf, metas = item
+                n = len(metas)
+
+                t0 = time.perf_counter()
+                x = buf[:n].to(self.device, non_blocking=self.pin_memory).float().div_(255)
+                pred = self.model(x)
+                t1 = time.perf_counter()
+                dets, offsets = postprocess_batched(pred, self.conf_thres, self.iou_thres)
+                dets, offsets = dets[:, :6].cpu(), offsets.tolist()  # syncs, so the copy out of buf is done
+                t2 = time.perf_counter()
+                free_q.put(buf)  # let the filler reuse it
+                self.stats.add("model", n, t1 - t0)
+                self.stats.add("postprocess", n, t2 - t1)
+
+                for i, (ts, path) in enumerate(metas):
+                    yield ts, path, dets[offsets[i]:offsets[i + 1]]
+        finally:
+            stop.set()
+            while not ready_q.empty():  # unblock a filler waiting on a full queue
+                ready_q.get_nowait()
+            filler.join(timeout=5)
+            self.stats.wall_end = time.perf_counter()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from model_loader import load_detector
+    from profiler import dump_profile, profiler_from_env
+
+    parser = argparse.ArgumentParser(description="Stream YOLOv11s detection over a radar PNG directory")
+    parser.add_argument("image_dir")
+    parser.add_argument("--weights", default=None)
+    parser.add_argument("--batch", type=int, default=4)
+    parser.add_argument("--imgsz", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--prefetch", type=int, default=16)
+    parser.add_argument("--conf", type=float, default=0.25)
+    parser.add_argument("--device", default="cuda" if torch.cuda.is_available() else "cpu")
+    args = parser.parse_args()
+
+    # BN-folded weights are cached by checkpoint hash under YOLO_CACHE_DIR and mmap-loaded
+    model, _ = load_detector(args.weights, device=args.device)
+    profiler = profiler_from_env(model)  # YOLO_PROFILE=<prefix> to switch on per-layer profiling
+
+    detector = StreamingDetector(model, batch_size=args.batch, image_size=args.imgsz, decode_workers=args.workers,
+                                 prefetch=args.prefetch, conf_thres=args.conf, device=args.device)
+    n_det = 0
+    for ts, path, dets in detector.run(list_frames(args.image_dir)):
+        n_det += len(dets)
+        print(f"{ts} {os.path.basename(path)}: {len(dets)} detections")
+
+    print(f"\n{n_det} detections")
+    for stage, r in detector.stats.report().items():
+        busy = r.get("busy_s", r.get("wall_s"))
+        print(f"{stage:>12}: {r['frames']:6d} frames  {busy:8.2f} s  {r['fps']:8.2f} frames/s")
+    dump_profile(profiler)
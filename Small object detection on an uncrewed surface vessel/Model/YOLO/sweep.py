@@ -0,0 +1,289 @@
+import csv
+import itertools
+import json
+import os
+import shlex
+import signal
+import subprocess
+import time
+
+METRIC = "metrics/mAP50-95(B)"
+
+DATASET = r"C:/Users/PC1/Desktop/2D/X-band/dataset.yaml"
+YAML_DIR = r"C:/Users/PC1/Desktop/2D/X-band/kfold_split_yaml"
+
+
+# ------------------------------
+# Sweep definitions (the grids hyper.py used to write into .bat files)
+# ------------------------------
+def grid(**options):
+    """{key: [values]} → [{key: value}] over the full product, in itertools.product order"""
+    keys = list(options)
+    return [dict(zip(keys, values)) for values in itertools.product(*options.values())]
+
+
+def sweep_autotune():
+    base = dict(model="yolov8n.pt", data=DATASET, imgsz=1024, epochs=30)
+    configs = grid(lr0=[0.001, 0.003, 0.005], momentum=[0.85, 0.9, 0.937], weight_decay=[0.0001, 0.0005],
+                   hsv_h=[0.01, 0.015], scale=[0.4, 0.5], batch=[16])
+    return "autotune", [(f"trial_{i}", dict(base, **c), None) for i, c in enumerate(configs)]
+
+
+def sweep_imagesize_adam():
+    base = dict(model="yolo11n.pt", data=DATASET, epochs=200, optimizer="adam")
+    configs = grid(lr0=[0.001, 0.005, 0.01, 0.1], weight_decay=[0.0005, 0.001], imgsz=[2048, 1024], batch=[3])
+    return "imagesize_100_adam", [(f"trial_{i}", dict(base, **c), None) for i, c in enumerate(configs)]
+
+
+def sweep_kfold_adam(folds=5):
+    trials = []
+    for fold in range(folds):
+        for c in grid(lr0=[0.0001, 0.001, 0.01, 0.1], weight_decay=[0.0005, 0.01], imgsz=[2048, 1024], batch=[3]):
+            name = f"fold{fold}_adam_lr{c['lr0']}_wd{c['weight_decay']}_sz{c['imgsz']}_bs{c['batch']}"
+            args = dict(model="yolo11n.pt", data=f"{YAML_DIR}/fold_{fold}.yaml", epochs=30, optimizer="adam", **c)
+            # trials only compete with trials on the same fold
+            trials.append((name, args, f"fold{fold}"))
+    return "kfold_hyper_adam", trials
+
+
+SWEEPS = {
+    "autotune": sweep_autotune,
+    "imagesize_100_adam": sweep_imagesize_adam,
+    "kfold_hyper_adam": sweep_kfold_adam,
+}
+
+
+# ------------------------------
+# results.csv
+# ------------------------------
+def read_metric(csv_path, metric=METRIC):
+    """[(epoch, value)] from a (possibly still growing) ultralytics results.csv"""
+    if not os.path.exists(csv_path):
+        return []
+    rows = []
+    with open(csv_path, newline="") as f:
+        reader = csv.reader(f)
+        header = [h.strip() for h in next(reader, [])]
+        if "epoch" not in header or metric not in header:
+            return []
+        e_col, m_col = header.index("epoch"), header.index(metric)
+        for row in reader:
+            try:  # the last line may be half written
+                rows.append((int(float(row[e_col])), float(row[m_col])))
+            except (IndexError, ValueError):
+                break
+    return rows
+
+
+# ------------------------------
+# Asynchronous successive halving
+# ------------------------------
+def asha_rungs(min_epochs, max_epochs, eta):
+    """checkpoint epochs min_epochs * eta^k below max_epochs"""
+    rungs, r = [], min_epochs
+    while r < max_epochs:
+        rungs.append(int(r))
+        r *= eta
+    return rungs
+
+
+def asha_keep(value, recorded, eta):
+    """
+    ASHA stopping rule: a trial reaching a rung continues only if it is in the top 1/eta of
+    everything recorded at that rung so far. With fewer than eta results the rung is open.
+    """
+    if len(recorded) < eta:
+        return True
+    ranked = sorted(recorded, reverse=True)
+    return value >= ranked[max(1, len(ranked) // eta) - 1]
+
+
+class Sweep:
+    """
+    Runs `yolo detect train` trials as local subprocesses on a fixed number of slots, stopping
+    weak trials early (ASHA on METRIC read from each trial's results.csv). State lives in
+    <project>/sweep_state.json, so a rerun resumes: finished and stopped trials are skipped,
+    interrupted ones continue from weights/last.pt.
+    """
+
+    def __init__(self, project, trials, slots=1, devices=None, eta=3, min_epochs=5, poll=30,
+                 yolo=("yolo", "detect", "train"), state_path=None):
+        self.project = project
+        self.slots = slots
+        self.devices = devices or []
+        self.eta = eta
+        self.min_epochs = min_epochs
+        self.poll = poll
+        self.yolo = list(yolo)
+        self.state_path = state_path or os.path.join(project, "sweep_state.json")
+        os.makedirs(project, exist_ok=True)
+
+        self.state = {"trials": {}}
+        if os.path.exists(self.state_path):
+            with open(self.state_path) as f:
+                self.state = json.load(f)
+        for name, args, group in trials:
+            t = self.state["trials"].setdefault(name, {"status": "pending", "rungs": {}})
+            if t.get("args") not in (None, args) and t["status"] != "running":
+                t.update(status="pending", rungs={})  # config changed under the same name
+            t.update(args=args, group=group or "all")
+        self.procs = {}
+
+    def save(self):
+        tmp = self.state_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.state, f, indent=1)
+        os.replace(tmp, self.state_path)
+
+    def trial_dir(self, name):
+        return os.path.join(self.project, name)
+
+    # ------------------------------
+    # Process control
+    # ------------------------------
+    def command(self, name, slot):
+        t = self.state["trials"][name]
+        last = os.path.join(self.trial_dir(name), "weights", "last.pt")
+        if t["status"] == "running" and os.path.exists(last):  # interrupted by a crash
+            return self.yolo + ["resume", f"model={last}"]
+        args = dict(t["args"], project=os.path.abspath(self.project), name=name, exist_ok=True)
+        if self.devices:
+            args["device"] = self.devices[slot % len(self.devices)]
+        return self.yolo + [f"{k}={v}" for k, v in args.items()]
+
+    def start(self, name, slot):
+        cmd = self.command(name, slot)
+        print(f"[slot {slot}] {name}: {' '.join(shlex.quote(str(c)) for c in cmd)}")
+        log = open(os.path.join(self.project, f"{name}.log"), "ab")
+        kwargs = {"start_new_session": True} if os.name == "posix" else \
+            {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+        proc = subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT, **kwargs)
+        self.procs[name] = (proc, slot, log)
+        self.state["trials"][name]["status"] = "running"
+        self.save()
+
+    def kill(self, name):
+        proc, _, _ = self.procs[name]
+        if proc.poll() is not None:
+            return
+        # the trainer has dataloader workers of its own: take the whole group down
+        if os.name == "posix":
+            os.killpg(proc.pid, signal.SIGTERM)
+        else:
+            subprocess.run(["taskkill", "/F", "/T", "/PID", str(proc.pid)], capture_output=True)
+        try:
+            proc.wait(timeout=60)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+
+    # ------------------------------
+    # Scheduling
+    # ------------------------------
+    def recorded(self, group, rung):
+        return [t["rungs"][str(rung)] for t in self.state["trials"].values()
+                if t["group"] == group and str(rung) in t["rungs"]]
+
+    def check(self, name):
+        """record newly reached rungs; returns False when the trial should be stopped"""
+        t = self.state["trials"][name]
+        rows = read_metric(os.path.join(self.trial_dir(name), "results.csv"))
+        if not rows:
+            return True
+        t["epochs"] = rows[-1][0]
+        t["best"] = max(v for _, v in rows)
+        for rung in asha_rungs(self.min_epochs, int(t["args"]["epochs"]), self.eta):
+            if str(rung) in t["rungs"] or t["epochs"] < rung:
+                continue
+            value = max(v for e, v in rows if e <= rung)
+            keep = asha_keep(value, self.recorded(t["group"], rung), self.eta)
+            t["rungs"][str(rung)] = value
+            if not keep:
+                t["stopped_at"] = rung
+                return False
+        return True
+
+    def finished_before(self, name):
+        """results.csv already covers every epoch (e.g. a trial run from an old .bat)"""
+        t = self.state["trials"][name]
+        rows = read_metric(os.path.join(self.trial_dir(name), "results.csv"))
+        return bool(rows) and rows[-1][0] >= int(t["args"]["epochs"])
+
+    def run(self):
+        trials = self.state["trials"]
+        queue = [n for n, t in trials.items() if t["status"] in ("pending", "running")]
+        for name in [n for n in queue if trials[n]["status"] == "pending" and self.finished_before(n)]:
+            self.check(name)  # contributes its rung values to the stopping rule
+            trials[name]["status"] = "done"
+            queue.remove(name)
+        self.save()
+        print(f"{len(trials)} trials, {len(queue)} to run, {len(trials) - len(queue)} already finished/stopped")
+
+        try:
+            while queue or self.procs:
+                busy = {slot for _, slot, _ in self.procs.values()}
+                for slot in range(self.slots):
+                    if queue and slot not in busy:
+                        self.start(queue.pop(0), slot)
+
+                time.sleep(self.poll)
+                for name in list(self.procs):
+                    proc, slot, log = self.procs[name]
+                    keep = self.check(name)
+                    if not keep:
+                        self.kill(name)
+                        trials[name]["status"] = "stopped"
+                        print(f"[slot {slot}] {name}: stopped at epoch {trials[name]['stopped_at']} "
+                              f"({METRIC} {trials[name]['rungs'][str(trials[name]['stopped_at'])]:.4f})")
+                    elif proc.poll() is not None:
+                        self.check(name)
+                        trials[name]["status"] = "done" if proc.returncode == 0 else "failed"
+                        print(f"[slot {slot}] {name}: {trials[name]['status']} (best {trials[name].get('best')})")
+                    else:
+                        continue
+                    log.close()
+                    del self.procs[name]
+                self.save()
+        except KeyboardInterrupt:
+            # leave the trials "running": the next run resumes them from last.pt
+            for name in list(self.procs):
+                self.kill(name)
+            self.save()
+            raise
+        return self.report()
+
+    def report(self, top=10):
+        trials = self.state["trials"]
+        ranked = sorted((t.get("best", -1.0), n) for n, t in trials.items())[::-1]
+        used = sum(t.get("epochs", 0) for t in trials.values())
+        full = sum(int(t["args"]["epochs"]) for t in trials.values())
+        print(f"\nTop {top} by {METRIC}:")
+        for best, name in ranked[:top]:
+            t = trials[name]
+            print(f"  {name:50s} {best:.4f}  {t['status']:8s} epochs {t.get('epochs', 0)}")
+        print(f"epochs trained {used} / {full} for the full grid ({used / max(full, 1):.0%})")
+        return ranked
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Local hyper-parameter sweep with ASHA early stopping")
+    parser.add_argument("sweep", choices=sorted(SWEEPS))
+    parser.add_argument("--project", default=None, help="defaults to the sweep's own project name")
+    parser.add_argument("--slots", type=int, default=1, help="trials trained concurrently")
+    parser.add_argument("--devices", default="", help="comma separated, assigned to slots round-robin")
+    parser.add_argument("--eta", type=int, default=3, help="keep the top 1/eta at every rung")
+    parser.add_argument("--min-epochs", type=int, default=5, help="first rung")
+    parser.add_argument("--poll", type=float, default=30, help="seconds between results.csv checks")
+    parser.add_argument("--yolo", default="yolo detect train", help="trainer command prefix")
+    parser.add_argument("--report", action="store_true", help="only print the current ranking")
+    args = parser.parse_args()
+
+    project, trials = SWEEPS[args.sweep]()
+    sweep = Sweep(args.project or project, trials, args.slots, [d for d in args.devices.split(",") if d],
+                  args.eta, args.min_epochs, args.poll, shlex.split(args.yolo))
+    if args.report:
+        sweep.report()
+    else:
+        sweep.run()
@@ -0,0 +1,187 @@
+import math
+import time
+
+import torch
+
+from yolov11s import YOLOv11s, batched_nms, postprocess_batched, weighted_box_fusion
+
+# rough no-grad activation footprint of YOLOv11s per input pixel (measured ~95-125 B/px on CPU)
+ACT_BYTES_PER_PIXEL = 128
+
+
+# ------------------------------
+# Tile layout
+# ------------------------------
+def tile_starts(size, tile, overlap):
+    """
+    Start offsets of tiles along one axis; the last tile is aligned to the far edge
+    so every pixel is covered and no tile needs padding (unless size < tile).
+    """
+    if size <= tile:
+        return [0]
+    step = tile - overlap
+    n = math.ceil((size - tile) / step) + 1
+    starts = [i * step for i in range(n - 1)]
+    starts.append(size - tile)
+    return starts
+
+
+def tile_grid(height, width, tile, overlap):
+    """returns: Tensor [T, 2] of (y0, x0) tile origins"""
+    ys = tile_starts(height, tile, overlap)
+    xs = tile_starts(width, tile, overlap)
+    return torch.tensor([(y, x) for y in ys for x in xs], dtype=torch.long)
+
+
+# ------------------------------
+# Tiled Detector
+# ------------------------------
+class TiledDetector:
+    def __init__(self, model, tile_size=640, overlap=128, memory_budget_mb=256, conf_thres=0.25,
+                 iou_thres=0.45, merge="nms", merge_iou=0.5, edge_margin=2, max_det=1000):
+        assert tile_size % 32 == 0, "tile_size must be a multiple of the max stride (32)"
+        assert 0 <= overlap < tile_size
+        assert merge in ("nms", "wbf")
+        self.model = model
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.conf_thres = conf_thres
+        self.iou_thres = iou_thres
+        self.merge = merge
+        self.merge_iou = merge_iou
+        self.edge_margin = edge_margin
+        self.max_det = max_det
+
+        # how many tiles fit into the activation budget at once
+        per_tile = tile_size * tile_size * ACT_BYTES_PER_PIXEL
+        self.batch_size = max(1, int(memory_budget_mb * 2 ** 20 // per_tile))
+        self._buffer = None
+
+    def _tile_buffer(self, n, frame):
+        # reused input batch, only reallocated when shape/device/dtype changes
+        shape = (n, frame.shape[0], self.tile_size, self.tile_size)
+        buf = self._buffer
+        if buf is None or buf.shape[1:] != shape[1:] or buf.shape[0] < n \
+                or buf.device != frame.device or buf.dtype != frame.dtype:
+            buf = self._buffer = frame.new_empty(shape)
+        return buf[:n]
+
+    def _seam_keep(self, boxes, origin, height, width):
+        """
+        Drop boxes cut by an internal tile edge when they start inside the overlap band:
+        the neighbouring tile contains them whole. Boxes larger than the overlap are kept
+        and left to the merge step, so nothing at a seam is lost.
+        """
+        t, m, ov = self.tile_size, self.edge_margin, self.overlap
+        x1, y1, x2, y2 = boxes.unbind(1)  # tile coords
+
+        inner_l = origin[:, 1] > 0
+        inner_t = origin[:, 0] > 0
+        inner_r = origin[:, 1] + t < width
+        inner_b = origin[:, 0] + t < height
+
+        cut_l = inner_l & (x1 <= m) & (x2 < ov - m)
+        cut_t = inner_t & (y1 <= m) & (y2 < ov - m)
+        cut_r = inner_r & (x2 >= t - m) & (x1 > t - ov + m)
+        cut_b = inner_b & (y2 >= t - m) & (y1 > t - ov + m)
+        return ~(cut_l | cut_t | cut_r | cut_b)
+
+    def _merge(self, dets):
+        if dets.shape[0] == 0:
+            return dets
+        boxes, scores, labels = dets[:, :4], dets[:, 4], dets[:, 5]
+        if self.merge == "wbf":
+            out = weighted_box_fusion(boxes, scores, labels, self.merge_iou)
+            out = out[out[:, 4].argsort(descending=True)]
+        else:
+            keep = batched_nms(boxes, scores, labels.long(), self.merge_iou)
+            out = dets[keep]
+        return out[:self.max_det]
+
+    @torch.no_grad()
+    def __call__(self, frame):
+        """
+        frame: Tensor [3, H, W] (or [1, 3, H, W]), same normalisation the model was trained on
+        returns: [n, 6] → (x1, y1, x2, y2, conf, class) in frame coordinates
+        """
+        if frame.dim() == 4:
+            frame = frame[0]
+        _, h, w = frame.shape
+        t = self.tile_size
+
+        # frames smaller than a tile are padded on the bottom/right
+        pad_h, pad_w = max(0, t - h), max(0, t - w)
+        if pad_h or pad_w:
+            frame = torch.nn.functional.pad(frame, (0, pad_w, 0, pad_h))
+        height, width = frame.shape[1:]
+
+        origins = tile_grid(height, width, t, self.overlap)
+        all_dets = []
+        for i in range(0, len(origins), self.batch_size):
+            chunk = origins[i:i + self.batch_size]
+            batch = self._tile_buffer(len(chunk), frame)
+            for j, (y0, x0) in enumerate(chunk.tolist()):
+                batch[j].copy_(frame[:, y0:y0 + t, x0:x0 + t])
+
+            dets, _ = postprocess_batched(self.model(batch), self.conf_thres, self.iou_thres, max_det=None)
+            if dets.shape[0] == 0:
+                continue
+
+            origin = chunk.to(dets.device)[dets[:, 6].long()]  # [n, 2] (y0, x0)
+            keep = self._seam_keep(dets[:, :4], origin, height, width)
+            dets, origin = dets[keep], origin[keep]
+            dets[:, 0:4] += origin.flip(1).repeat(1, 2).to(dets.dtype)  # shift to frame coords
+            all_dets.append(dets[:, :6])
+
+        if not all_dets:
+            return frame.new_zeros((0, 6))
+        dets = self._merge(torch.cat(all_dets))
+        dets[:, 0:4:2] = dets[:, 0:4:2].clamp(0, w)
+        dets[:, 1:4:2] = dets[:, 1:4:2].clamp(0, h)
+        return dets
+
+
+# ------------------------------
+# Benchmark: tiled vs full-frame
+# ------------------------------
+def _bench_worker(mode, frame_size, tile_size, overlap, n_frames, queue):
+    import resource
+
+    torch.manual_seed(0)
+    model = YOLOv11s(num_classes=1).eval(fused=True)
+    frame = torch.rand(3, frame_size, frame_size)
+
+    if mode == "full":
+        def run(f):
+            return postprocess_batched(model(f.unsqueeze(0)), 0.25, 0.45)[0]
+    else:
+        detector = TiledDetector(model, tile_size=tile_size, overlap=overlap)
+        run = detector
+
+    with torch.no_grad():
+        run(frame)  # warm-up
+        t0 = time.perf_counter()
+        for _ in range(n_frames):
+            run(frame)
+        dt = time.perf_counter() - t0
+
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+    queue.put((mode, n_frames / dt, peak_mb))
+
+
+if __name__ == "__main__":
+    import multiprocessing as mp
+
+    frame_size, tile_size, overlap, n_frames = 2048, 640, 128, 3
+    print(f"frame {frame_size}x{frame_size}, tile {tile_size}, overlap {overlap}, {n_frames} frames")
+    print(f"tiles per frame: {len(tile_grid(frame_size, frame_size, tile_size, overlap))}")
+
+    # each mode in a fresh process so peak RSS is not shared between them
+    ctx = mp.get_context("spawn")
+    for mode in ("full", "tiled"):
+        q = ctx.Queue()
+        p = ctx.Process(target=_bench_worker, args=(mode, frame_size, tile_size, overlap, n_frames, q))
+        p.start()
+        mode, fps, peak_mb = q.get()
+        p.join()
+        print(f"{mode:>6}: {fps:6.2f} frames/s, peak RSS {peak_mb:8.1f} MB")
@@ -0,0 +1,301 @@
+import argparse
+import ast
+import json
+import os
+import platform
+import time
+import tracemalloc
+
+import numpy as np
+
+from evaluation import MOTAccumulator
+from mht import MHTEngine
+from tracker import SoATracker, xywh_to_xyxy
+
+NOTEBOOK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "MHT&MOT")
+
+
+# ------------------------------
+# Synthetic scenarios
+# ------------------------------
+def make_scenario(targets=50, frames=200, size=2000, pd=0.9, clutter=5.0, crossings=0.2, speed=2.0, box=12.0,
+                  noise=0.5, seed=0):
+    """
+    Constant-velocity targets that bounce off the frame edges, seen with probability pd (centre
+    jittered by noise px) plus Poisson(clutter) false alarms per frame. A `crossings` fraction
+    of the targets is paired up and aimed at a common point mid-run.
+    returns: list of {"dets": [m, 4], "gt": [n, 4] (x, y, w, h), "gt_ids": [n]}
+    """
+    rng = np.random.default_rng(seed)
+    heading = rng.uniform(0, 2 * np.pi, targets)
+    vel = np.c_[np.cos(heading), np.sin(heading)] * rng.uniform(0.5, 1.5, (targets, 1)) * speed
+    pos = rng.uniform(box, size - box, (targets, 2))
+    n_pairs = int(targets * crossings) // 2
+    for a, b in rng.permutation(targets)[:2 * n_pairs].reshape(-1, 2):
+        meet = rng.uniform(size / 4, 3 * size / 4, 2)
+        t = rng.integers(frames // 4, max(frames // 4 + 1, 3 * frames // 4))
+        pos[a], pos[b] = meet - vel[a] * t, meet - vel[b] * t
+    pos = np.clip(pos, 0, size - box)
+    sizes = box * rng.uniform(0.8, 1.25, (targets, 2))
+
+    out = []
+    for _ in range(frames):
+        pos += vel
+        for d in range(2):  # bounce
+            hit = (pos[:, d] < 0) | (pos[:, d] > size - sizes[:, d])
+            vel[hit, d] *= -1
+            pos[:, d] = np.clip(pos[:, d], 0, size - sizes[:, d])
+        gt = np.c_[pos, sizes]
+        seen = rng.random(targets) < pd
+        dets = gt[seen] + np.c_[rng.normal(0, noise, (seen.sum(), 2)), np.zeros((seen.sum(), 2))]
+        n_fa = rng.poisson(clutter)
+        fa = np.c_[rng.uniform(0, size - box, (n_fa, 2)), box * rng.uniform(0.5, 1.5, (n_fa, 2))]
+        dets = np.concatenate([dets, fa])[rng.permutation(seen.sum() + n_fa)]
+        out.append({"dets": dets, "gt": gt.copy(), "gt_ids": np.arange(targets)})
+    return out
+
+
+# ------------------------------
+# Detection logs
+# ------------------------------
+def save_log(path, frames):
+    """frames → one .npz (concatenated boxes + per-frame offsets)"""
+    def pack(key):
+        arrays = [np.asarray(f[key], dtype=np.float64).reshape(-1, 4) for f in frames]
+        return np.concatenate(arrays), np.cumsum([0] + [len(a) for a in arrays])
+
+    dets, det_off = pack("dets")
+    gt, gt_off = pack("gt")
+    gt_ids = np.concatenate([np.asarray(f["gt_ids"], dtype=np.int64) for f in frames]) \
+        if all(f.get("gt_ids") is not None for f in frames) else np.zeros(0, dtype=np.int64)
+    np.savez_compressed(path, dets=dets, det_off=det_off, gt=gt, gt_off=gt_off, gt_ids=gt_ids)
+
+
+def load_log(path):
+    """a save_log .npz or a folder of MOANA .json frames (annotations as detections and ground truth)"""
+    if os.path.isdir(path):
+        frames = []
+        for name in sorted(f for f in os.listdir(path) if f.endswith(".json")):
+            with open(os.path.join(path, name)) as f:
+                anns = json.load(f).get("annotations", [])
+            boxes = np.array([[a["xmin"], a["ymin"], a["width"], a["height"]] for a in anns],
+                             dtype=np.float64).reshape(-1, 4)
+            frames.append({"dets": boxes, "gt": boxes, "gt_ids": None})
+        return frames
+    z = np.load(path)
+    dets, det_off, gt, gt_off, gt_ids = z["dets"], z["det_off"], z["gt"], z["gt_off"], z["gt_ids"]
+    return [{"dets": dets[det_off[k]:det_off[k + 1]], "gt": gt[gt_off[k]:gt_off[k + 1]],
+             "gt_ids": gt_ids[gt_off[k]:gt_off[k + 1]] if len(gt_ids) else None} for k in range(len(det_off) - 1)]
+
+
+# ------------------------------
+# Trackers under test
+# ------------------------------
+def load_notebook(path):
+    """imports, functions and classes from every code cell of a notebook (no top-level runs)"""
+    with open(path, encoding="utf-8") as f:
+        cells = json.load(f)["cells"]
+    ns = {}
+    keep = (ast.Import, ast.ImportFrom, ast.FunctionDef, ast.ClassDef)
+    for cell in cells:
+        if cell["cell_type"] != "code":
+            continue
+        try:
+            tree = ast.parse("".join(cell["source"]))
+        except SyntaxError:  # notebook magics
+            continue
+        tree.body = [node for node in tree.body if isinstance(node, keep)]
+        exec(compile(tree, path, "exec"), ns)
+    return ns
+
+
+class NotebookMOT:
+    """MHTTracker from MOT.ipynb (IoU + Hungarian, no motion model) behind the update(dets) → (boxes, ids) API"""
+
+    def __init__(self, **kwargs):
+        self.tracker = load_notebook(os.path.join(NOTEBOOK_DIR, "MOT.ipynb"))["MHTTracker"](**kwargs)
+
+    def update(self, detections):
+        tracks = self.tracker.update(np.asarray(detections).tolist())
+        return np.array([t.bbox for t in tracks], dtype=np.float64).reshape(-1, 4), np.array([t.track_id for t in tracks])
+
+
+class NotebookRealMHT:
+    """
+    RealMHT from MHT.ipynb. Output is what its get_tracks reports: every track updated this frame
+    in any hypothesis (its hypotheses hold one track each, so the best alone would be one box).
+    """
+
+    def __init__(self, **kwargs):
+        self.tracker = load_notebook(os.path.join(NOTEBOOK_DIR, "MHT.ipynb"))["RealMHT"](**kwargs)
+        self.frame = 0
+
+    def update(self, detections):
+        self.tracker.update(np.asarray(detections).tolist(), self.frame)
+        nodes = {n.track_id: n for hypo in self.tracker.global_hypotheses for n in hypo if n.frame_idx == self.frame}
+        nodes = list(nodes.values())
+        self.frame += 1
+        return np.array([n.bbox for n in nodes], dtype=np.float64).reshape(-1, 4), np.array([n.track_id for n in nodes])
+
+
+TRACKERS = {
+    "soa": lambda: SoATracker(iou_threshold=0.1, max_age=5, min_hits=2),
+    "mht": lambda: MHTEngine(iou_threshold=0.1, max_age=5, min_hits=2),
+    "mot_notebook": lambda: NotebookMOT(iou_threshold=0.1, max_age=5, min_hits=2),
+    "realmht_notebook": lambda: NotebookRealMHT(iou_threshold=0.1, prune_k=50, max_hypotheses=3),
+}
+
+
+# ------------------------------
+# Replay
+# ------------------------------
+def replay(make_tracker, frames, iou=0.5, max_seconds=None, warmup=3):
+    """
+    Feeds frames through a fresh tracker, timing every update, then replays the same frames
+    through another one under tracemalloc for the peak heap. A run past max_seconds of tracker
+    time stops early (partial=True), so one slow tracker cannot stall a sweep.
+    """
+    tracker = make_tracker()
+    acc = MOTAccumulator(iou)
+    times = []
+    for f in frames:
+        t0 = time.perf_counter()
+        boxes, ids = tracker.update(f["dets"])
+        times.append(time.perf_counter() - t0)
+        acc.update(xywh_to_xyxy(f["gt"]), xywh_to_xyxy(np.asarray(boxes, dtype=np.float64).reshape(-1, 4)),
+                   np.asarray(ids).tolist(), f["gt_ids"])
+        if max_seconds is not None and sum(times) > max_seconds:
+            break
+    n = len(times)
+
+    tracker = make_tracker()
+    tracemalloc.start()
+    for f in frames[:n]:
+        tracker.update(f["dets"])
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    ms = np.array(times[min(warmup, n - 1):]) * 1000
+    return dict(acc.compute(), frames=n, partial=n < len(frames), p50_ms=float(np.percentile(ms, 50)),
+                p95_ms=float(np.percentile(ms, 95)), p99_ms=float(np.percentile(ms, 99)), max_ms=float(ms.max()),
+                fps=n / max(sum(times), 1e-9), peak_mb=peak / 2 ** 20)
+
+
+def scaling(trackers, target_counts, period=1.0, max_seconds=60.0, iou=0.5, **scenario):
+    """
+    every tracker over scenarios of increasing size. keeps_up: p95 latency within the radar scan
+    period; once a tracker falls 10x behind it is not run on larger scenarios.
+    """
+    rows, dropped = [], set()
+    for targets in target_counts:
+        frames = make_scenario(targets, **scenario)
+        for name in trackers:
+            if name in dropped:
+                continue
+            r = dict(replay(TRACKERS[name], frames, iou, max_seconds), tracker=name, targets=targets)
+            r["keeps_up"] = r["p95_ms"] <= period * 1000 and not r["partial"]
+            rows.append(r)
+            print(_row(r))
+            if r["p50_ms"] > 10 * period * 1000 or r["partial"]:
+                dropped.add(name)
+    return rows
+
+
+def _row(r):
+    return (f"{r['tracker']:>17} {r.get('targets', '-'):>6}  p50 {r['p50_ms']:9.2f}  p95 {r['p95_ms']:9.2f}  "
+            f"max {r['max_ms']:9.2f} ms  {r['fps']:8.1f} fps  peak {r['peak_mb']:8.2f} MB  "
+            f"MOTA {r['MOTA']:6.3f}  IDSW {r['IDSW']:5d}" + ("  (partial)" if r["partial"] else ""))
+
+
+def max_kept_up(rows):
+    """tracker → largest target count it kept up with"""
+    out = {}
+    for r in rows:
+        if r["keeps_up"]:
+            out[r["tracker"]] = max(out.get(r["tracker"], 0), r["targets"])
+    return out
+
+
+def plot(rows, period, path):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 4.5))
+    for name in dict.fromkeys(r["tracker"] for r in rows):
+        rs = [r for r in rows if r["tracker"] == name]
+        ax1.plot([r["targets"] for r in rs], [r["p95_ms"] for r in rs], "o-", label=name)
+        ax2.plot([r["targets"] for r in rs], [r["MOTA"] for r in rs], "o-", label=name)
+    ax1.axhline(period * 1000, color="k", ls="--", label="scan period")
+    ax1.set(xscale="log", yscale="log", xlabel="targets", ylabel="p95 update latency (ms)")
+    ax2.set(xscale="log", xlabel="targets", ylabel="MOTA")
+    ax1.legend()
+    ax1.grid(True, which="both", alpha=0.3)
+    ax2.grid(True, alpha=0.3)
+    fig.tight_layout()
+    fig.savefig(path, dpi=120)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tracker latency / memory / MOTA benchmark")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    def scenario_args(p):
+        p.add_argument("--frames", type=int, default=200)
+        p.add_argument("--size", type=int, default=2000)
+        p.add_argument("--pd", type=float, default=0.9)
+        p.add_argument("--clutter", type=float, default=5.0, help="false alarms per frame")
+        p.add_argument("--crossings", type=float, default=0.2, help="share of targets on crossing courses")
+        p.add_argument("--seed", type=int, default=0)
+
+    scale = sub.add_parser("scale", help="synthetic scenarios of increasing target count")
+    scale.add_argument("--trackers", nargs="+", default=["soa", "mht", "mot_notebook"], choices=list(TRACKERS))
+    scale.add_argument("--targets", nargs="+", type=int, default=[10, 30, 100, 300, 1000])
+    scale.add_argument("--period", type=float, default=1.0, help="radar scan period (s)")
+    scale.add_argument("--max-seconds", type=float, default=60.0, help="tracker time per run before cutting it")
+    scale.add_argument("--out", default="tracker_bench.json")
+    scale.add_argument("--plot", default=None, help="latency / MOTA vs targets figure")
+    scenario_args(scale)
+
+    rep = sub.add_parser("replay", help="replay a recorded log (.npz from `make` or a MOANA json folder)")
+    rep.add_argument("log")
+    rep.add_argument("--trackers", nargs="+", default=["soa", "mht", "mot_notebook"], choices=list(TRACKERS))
+    rep.add_argument("--max-seconds", type=float, default=None)
+
+    make = sub.add_parser("make", help="write a synthetic scenario as a replayable log")
+    make.add_argument("out")
+    make.add_argument("--targets", type=int, default=100)
+    scenario_args(make)
+
+    args = parser.parse_args(argv)
+    scenario = {k: getattr(args, k) for k in ("frames", "size", "pd", "clutter", "crossings", "seed") if hasattr(args, k)}
+
+    if args.cmd == "make":
+        save_log(args.out, make_scenario(args.targets, **scenario))
+        print(f"wrote {args.out}")
+    elif args.cmd == "replay":
+        frames = load_log(args.log)
+        print(f"{len(frames)} frames from {args.log}")
+        for name in args.trackers:
+            print(_row(dict(replay(TRACKERS[name], frames, max_seconds=args.max_seconds), tracker=name)))
+    else:
+        rows = scaling(args.trackers, args.targets, args.period, args.max_seconds, **scenario)
+        print("\nlargest load kept up with (p95 <= scan period):")
+        kept = max_kept_up(rows)
+        for name in args.trackers:
+            print(f"{name:>17}: {kept.get(name, 0)} targets")
+        report = {
+            "meta": dict(scenario, period=args.period, python=platform.python_version(), machine=platform.machine(),
+                         time=time.strftime("%Y-%m-%dT%H:%M:%S")),
+            "results": rows,
+        }
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nwrote {args.out}")
+        if args.plot:
+            plot(rows, args.period, args.plot)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
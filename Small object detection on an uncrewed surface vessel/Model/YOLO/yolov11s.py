@@ -1,6 +1,60 @@
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
+from torch.utils.checkpoint import checkpoint
+
+# ------------------------------
+# Conv + BatchNorm folding
+# ------------------------------
+@torch.no_grad()
+def fuse_conv_and_bn(conv, bn):
+    """
+    Fold an eval-mode BatchNorm2d into the preceding Conv2d.
+    returns: new nn.Conv2d with bias, equivalent to bn(conv(x))
+    """
+    fused = nn.Conv2d(
+        conv.in_channels, conv.out_channels, conv.kernel_size, conv.stride,
+        conv.padding, conv.dilation, conv.groups, bias=True,
+    ).to(conv.weight.device)
+
+    scale = bn.weight / torch.sqrt(bn.running_var + bn.eps)  # [c2]
+    fused.weight.copy_(conv.weight * scale.view(-1, 1, 1, 1))
+
+    bias = conv.bias if conv.bias is not None else torch.zeros_like(bn.running_mean)
+    fused.bias.copy_(bn.bias + (bias - bn.running_mean) * scale)
+    return fused
+
+# ------------------------------
+# Activation checkpointing
+# ------------------------------
+def checkpoint_forward(module, fn, *args):
+    """
+    Run fn(*args) without keeping its activations; they are recomputed in backward.
+    BatchNorm buffers are frozen during the recompute (momentum 0, num_batches_tracked restored)
+    so running mean/var and the batch count are updated once per step, also with momentum=None.
+    """
+    recompute = [False]
+
+    def run(*inputs):
+        if not recompute[0]:
+            recompute[0] = True
+            return fn(*inputs)
+        bns = [m for m in module.modules() if isinstance(m, nn.BatchNorm2d) and m.track_running_stats]
+        saved = [(m.momentum, m.num_batches_tracked.clone()) for m in bns]
+        for m in bns:
+            m.momentum = 0.0
+        try:
+            return fn(*inputs)
+        finally:
+            for m, (mo, n) in zip(bns, saved):
+                m.momentum = mo
+                m.num_batches_tracked.copy_(n)
+
+    return checkpoint(run, *args, use_reentrant=False)
+
+
+def _use_checkpoint(module):
+    return module.checkpoint and module.training and torch.is_grad_enabled()
 
 # ------------------------------
 # Basic Conv Block
@@ -15,6 +69,30 @@ class Conv(nn.Module):
     def forward(self, x):
         return self.act(self.bn(self.conv(x)))
 
+    def forward_cat(self, xs):
+        """
+        Same as forward(torch.cat(xs, 1)) without materialising the concat:
+        the conv is split along its input channels and the partial outputs summed.
+        """
+        conv = self.conv
+        assert conv.groups == 1
+        y, c0 = None, 0
+        for t in xs:
+            c1 = c0 + t.shape[1]
+            part = F.conv2d(t, conv.weight[:, c0:c1], None, conv.stride, conv.padding, conv.dilation)
+            y = part if y is None else y.add_(part)
+            c0 = c1
+        if conv.bias is not None:
+            y = y + conv.bias.view(1, -1, 1, 1)
+        return self.act(self.bn(y))
+
+    def fuse(self):
+        # conv -> bn becomes a single biased conv, bn is kept as a no-op
+        if isinstance(self.bn, nn.BatchNorm2d):
+            self.conv = fuse_conv_and_bn(self.conv, self.bn)
+            self.bn = nn.Identity()
+        return self
+
 # ------------------------------
 # Bottleneck Block
 # ------------------------------
@@ -38,8 +116,11 @@ class C3k(nn.Module):
         self.cv2 = Conv(c1, hidden, 1, 1)
         self.cv3 = Conv(hidden * 2, c2, 1)
         self.m = nn.Sequential(*[Bottleneck(hidden, hidden) for _ in range(n)])
+        self.split_cat = False
 
     def forward(self, x):
+        if self.split_cat:
+            return self.cv3.forward_cat((self.m(self.cv1(x)), self.cv2(x)))
         return self.cv3(torch.cat((self.m(self.cv1(x)), self.cv2(x)), dim=1))
 
 # ------------------------------
@@ -51,11 +132,20 @@ class C3k2(nn.Module):
         self.cv1 = Conv(c1, c1, 1, 1)
         self.cv2 = Conv(c1 + c1 // 2, c2, 1, 1)
         self.m = nn.ModuleList([C3k(c1, c1 // 2)])
+        self.checkpoint = False
+        self.split_cat = False
 
     def forward(self, x):
+        if _use_checkpoint(self):
+            return checkpoint_forward(self, self._forward, x)
+        return self._forward(x)
+
+    def _forward(self, x):
         x1 = self.cv1(x)
         for m in self.m:
             x1 = m(x1)
+        if self.split_cat:
+            return self.cv2.forward_cat((x1, x))
         return self.cv2(torch.cat([x1, x], dim=1))
 
 # ------------------------------
@@ -67,32 +157,57 @@ class SPPF(nn.Module):
         self.cv1 = Conv(c1, c1 // 2, 1, 1)
         self.cv2 = Conv(c1 * 2, c2, 1, 1)
         self.m = nn.MaxPool2d(kernel_size=5, stride=1, padding=2)
+        self.checkpoint = False
+        self.split_cat = False
 
     def forward(self, x):
+        if _use_checkpoint(self):
+            return checkpoint_forward(self, self._forward, x)
+        return self._forward(x)
+
+    def _forward(self, x):
         x = self.cv1(x)
         y1 = self.m(x)
         y2 = self.m(y1)
         y3 = self.m(y2)
+        if self.split_cat:
+            return self.cv2.forward_cat((x, y1, y2, y3))
         return self.cv2(torch.cat([x, y1, y2, y3], 1))
 
 # ------------------------------
 # Detect Head (Multi-scale and Full)
 # ------------------------------
 class Detect(nn.Module):
-    def __init__(self, num_classes=80, anchors=((10,13), (16,30), (33,23), (30,61), (62,45), (59,119), (116,90), (156,198), (373,326)), ch=(128, 256, 512)):
+    def __init__(self, num_classes=80, anchors=((10,13), (16,30), (33,23), (30,61), (62,45), (59,119), (116,90), (156,198), (373,326)), ch=(128, 256, 512), stride=(8, 16, 32)):
         super().__init__()
         self.nc = num_classes
         self.no = num_classes + 5  # number of outputs per anchor
         self.nl = len(ch)  # number of layers
         self.na = len(anchors) // self.nl  # number of anchors per layer
-        self.stride = [8, 16, 32]  # strides per layer
-        self.grid = [torch.zeros(1)] * self.nl
+        self.stride = list(stride)  # strides per layer
+        self.grid = {}  # (layer, ny, nx, device, dtype) -> (grid offsets, anchor scale)
 
         a = torch.tensor(anchors).float().view(self.nl, -1, 2)
         self.register_buffer("anchors", a)
 
         self.m = nn.ModuleList([nn.Conv2d(c, self.no * self.na, 1) for c in ch])
 
+    def _make_grid(self, i, ny, nx, device, dtype):
+        key = (i, ny, nx, device, dtype)
+        if key not in self.grid:
+            s = self.stride[i]
+            yv, xv = torch.meshgrid(
+                torch.arange(ny, device=device, dtype=dtype),
+                torch.arange(nx, device=device, dtype=dtype),
+                indexing="ij",
+            )
+            # xy = (2 * sig - 0.5 + grid) * s  ->  sig * 2s + (grid - 0.5) * s
+            grid = (torch.stack((xv, yv), 2) - 0.5).mul_(s).view(1, 1, ny, nx, 2)
+            # wh = (2 * sig) ** 2 * anchor  ->  sig ** 2 * 4 * anchor
+            anchor = (self.anchors[i].to(device, dtype) * 4).view(1, self.na, 1, 1, 2)
+            self.grid[key] = (grid, anchor)
+        return self.grid[key]
+
     def forward(self, x):
         z = []
         for i in range(self.nl):
@@ -100,7 +215,15 @@ class Detect(nn.Module):
             x[i] = self.m[i](x[i])
             x[i] = x[i].view(bs, self.na, self.no, ny, nx)
             x[i] = x[i].permute(0, 1, 3, 4, 2).contiguous()
-            z.append(x[i].view(bs, -1, self.no))
+
+            if not self.training:  # decode to image-space (cx, cy, w, h, obj, cls...)
+                grid, anchor = self._make_grid(i, ny, nx, x[i].device, x[i].dtype)
+                y = x[i].sigmoid()
+                xy, wh, conf = y.split((2, 2, self.no - 4), 4)
+                y = torch.cat((xy * (2 * self.stride[i]) + grid, wh.pow(2) * anchor, conf), 4)
+                z.append(y.view(bs, -1, self.no))
+            else:  # raw logits for the loss
+                z.append(x[i].view(bs, -1, self.no))
         return torch.cat(z, 1)
 
 # ------------------------------
@@ -128,72 +251,271 @@ class YOLOv11s(nn.Module):
             SPPF(512, 512)
         )
 
-        self.detect = Detect(num_classes=num_classes, ch=(128, 256, 512))
+        # detect sees layer1 (/4), layer2 (/8) and layer4 (/32)
+        self.detect = Detect(num_classes=num_classes, ch=(128, 256, 512), stride=(4, 8, 32))
+
+        self.fused = False
+        self.channels_last = False
+        self.checkpoint_layers = set()
+
+    def set_memory_lean(self, checkpoint="c3k2", split_cat=True):
+        """
+        Memory-lean training mode.
+        checkpoint: None, "c3k2" (every C3k2/SPPF block), "layer" (layer1..layer4),
+                    or an iterable of layer names / C3k2 / SPPF module names
+        split_cat: feed concats straight into the following 1x1 conv instead of materialising them
+        """
+        names = set()
+        if checkpoint == "layer":
+            names = {"layer1", "layer2", "layer3", "layer4"}
+        elif checkpoint == "c3k2":
+            names = {n for n, m in self.named_modules() if isinstance(m, (C3k2, SPPF))}
+        elif checkpoint:
+            names = set(checkpoint)
+
+        self.checkpoint_layers = {n for n in names if n.startswith("layer") and "." not in n}
+        for n, m in self.named_modules():
+            if isinstance(m, (C3k2, SPPF)):
+                m.checkpoint = n in names
+            if isinstance(m, (C3k, C3k2, SPPF)):
+                m.split_cat = split_cat
+        return self
+
+    def _layer(self, name, x):
+        layer = getattr(self, name)
+        if name in self.checkpoint_layers and self.training and torch.is_grad_enabled():
+            return checkpoint_forward(layer, layer, x)
+        return layer(x)
+
+    def fuse(self, channels_last=False):
+        """
+        Fold every BatchNorm into its conv (inference only).
+        channels_last: also switch weights/activations to NHWC memory layout
+        """
+        self.eval()
+        for m in self.modules():
+            if isinstance(m, Conv):
+                m.fuse()
+        self.fused = True
+
+        if channels_last:
+            self.to(memory_format=torch.channels_last)
+            self.channels_last = True
+        return self
+
+    def eval(self, fused=False, channels_last=False):
+        super().eval()
+        if fused and not self.fused:
+            self.fuse(channels_last=channels_last)
+        elif channels_last and not self.channels_last:
+            self.to(memory_format=torch.channels_last)
+            self.channels_last = True
+        return self
 
     def forward(self, x):
-        x1 = self.layer1(x)  # small
-        x2 = self.layer2(x1)  # medium
-        x3 = self.layer3(x2)  # large
-        x4 = self.layer4(x3)  # SPPF output
+        if self.channels_last:
+            x = x.contiguous(memory_format=torch.channels_last)
+        x1 = self._layer("layer1", x)  # small
+        x2 = self._layer("layer2", x1)  # medium
+        x3 = self._layer("layer3", x2)  # large
+        x4 = self._layer("layer4", x3)  # SPPF output
         return self.detect([x1, x2, x4])
 
+import glob
+import importlib.util
+import os
+
+import numpy as np
 import torch
-import torchvision
 
-def postprocess(pred, conf_thres=0.25, iou_thres=0.45, num_classes=1, image_size=640):
+# ------------------------------
+# NMS without importing torchvision
+# ------------------------------
+_nms_op = None
+
+
+def _load_nms():
     """
-    pred: Tensor of shape [B, N, 6] → (x, y, w, h, obj_conf, class_conf)
-    returns: List of [n, 6] → (x1, y1, x2, y2, conf, class)
+    torchvision's compiled nms kernel. Loading its extension library directly costs a few ms;
+    `import torchvision` (models, datasets, transforms, PIL...) costs seconds of cold start.
+    Falls back to the package import when the library can't be found.
+    """
+    global _nms_op
+    if _nms_op is None:
+        try:
+            _nms_op = torch.ops.torchvision.nms
+        except (AttributeError, RuntimeError):
+            spec = importlib.util.find_spec("torchvision")
+            libs = glob.glob(os.path.join(spec.submodule_search_locations[0], "_C*")) if spec else []
+            try:
+                torch.ops.load_library(libs[0])
+                _nms_op = torch.ops.torchvision.nms
+            except (IndexError, OSError, AttributeError, RuntimeError):
+                import torchvision
+
+                _nms_op = torchvision.ops.nms
+    return _nms_op
+
+
+def batched_nms(boxes, scores, idxs, iou_thres):
+    """
+    Same result as torchvision.ops.batched_nms: boxes of different idxs never suppress each
+    other (each group is shifted past the others), indices sorted by decreasing score.
     """
-    pred = torch.sigmoid(pred)  # sigmoid: normalize to 0~1
-    xywh = pred[..., 0:4]
-    conf = pred[..., 4:5]
-    cls = pred[..., 5:]
+    if boxes.numel() == 0:
+        return torch.empty((0,), dtype=torch.int64, device=boxes.device)
+    offsets = idxs.to(boxes) * (boxes.max() + 1)
+    return _load_nms()(boxes + offsets[:, None], scores, iou_thres)
+
+
+def box_iou(a, b):
+    """a: [n, 4], b: [m, 4] xyxy → [n, m] IoU"""
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    wh = (torch.min(a[:, None, 2:], b[:, 2:]) - torch.max(a[:, None, :2], b[:, :2])).clamp(min=0)
+    inter = wh[..., 0] * wh[..., 1]
+    return inter / (area_a[:, None] + area_b - inter)
+
+
+def postprocess_batched(pred, conf_thres=0.25, iou_thres=0.45, max_nms=3000, max_det=300, decoded=True, image_size=640):
+    """
+    pred: Tensor of shape [B, N, 5 + nc] → (x, y, w, h, obj_conf, class_conf...)
+    returns: (dets, offsets)
+        dets: [n, 7] → (x1, y1, x2, y2, conf, class, image_idx), grouped by image
+        offsets: [B + 1] → detections of image i are dets[offsets[i]:offsets[i + 1]]
+    """
+    bs, n, _ = pred.shape
+
+    # objectness bounds the final score, so threshold on it first
+    # (for raw logits compare against logit(conf_thres) instead of applying sigmoid)
+    obj = pred[..., 4]
+    thres = conf_thres if decoded else torch.logit(torch.tensor(conf_thres)).item()
+    obj = obj.masked_fill(obj <= thres, float("-inf"))
+
+    # per-image top-k cap before any box math
+    k = min(max_nms, n)
+    top_obj, top_idx = obj.topk(k, dim=1)  # [B, k]
+    valid = torch.isfinite(top_obj)
+    img_idx = torch.arange(bs, device=pred.device).view(-1, 1).expand(bs, k)[valid]
+    cand = pred[img_idx, top_idx[valid]]  # [m, 5 + nc]
 
-    # final confidence = objectness × class_conf
-    score = conf * cls  # shape: [B, N, num_classes]
+    if not decoded:
+        cand = torch.sigmoid(cand)
+    score, cls = (cand[:, 4:5] * cand[:, 5:]).max(1)
+    keep = score > conf_thres
+    cand, score, cls, img_idx = cand[keep], score[keep], cls[keep], img_idx[keep]
 
-    # xywh to xyxy
-    box = xywh.clone()
-    box[..., 0] = xywh[..., 0] - xywh[..., 2] / 2  # x1
-    box[..., 1] = xywh[..., 1] - xywh[..., 3] / 2  # y1
-    box[..., 2] = xywh[..., 0] + xywh[..., 2] / 2  # x2
-    box[..., 3] = xywh[..., 1] + xywh[..., 3] / 2  # y2
+    # xywh to xyxy on survivors only
+    half = cand[:, 2:4] / 2
+    box = torch.cat((cand[:, 0:2] - half, cand[:, 0:2] + half), 1)
+    if not decoded:
+        box = box * image_size
 
-    # scale back to image size (optional, if training is normalized)
-    box = box * image_size
+    # one NMS over the whole batch, image index keeps images apart
+    keep = batched_nms(box, score, img_idx, iou_thres)  # sorted by score
+    keep = keep[torch.sort(img_idx[keep], stable=True)[1]]  # group by image, score order kept
 
-    results = []
-    for i in range(pred.shape[0]):  # for each image
-        boxes_i = box[i]
-        scores_i, class_ids = torch.max(score[i], dim=1)
+    counts = torch.bincount(img_idx[keep], minlength=bs)
+    offsets = torch.zeros(bs + 1, dtype=torch.long, device=pred.device)
+    offsets[1:] = counts.cumsum(0)
 
-        # confidence threshold
-        mask = scores_i > conf_thres
-        boxes_i = boxes_i[mask]
-        scores_i = scores_i[mask]
-        class_ids = class_ids[mask]
+    if max_det is not None and counts.numel() and counts.max() > max_det:
+        rank = torch.arange(keep.numel(), device=pred.device) - offsets[img_idx[keep]]
+        keep = keep[rank < max_det]
+        counts = counts.clamp(max=max_det)
+        offsets[1:] = counts.cumsum(0)
 
-        # NMS
-        keep = torchvision.ops.nms(boxes_i, scores_i, iou_thres)
-        final_boxes = torch.cat([
-            boxes_i[keep],
-            scores_i[keep].unsqueeze(1),
-            class_ids[keep].unsqueeze(1).float()
-        ], dim=1)  # [n, 6]
+    dets = torch.cat([
+        box[keep],
+        score[keep].unsqueeze(1),
+        cls[keep].unsqueeze(1).float(),
+        img_idx[keep].unsqueeze(1).float(),
+    ], dim=1)  # [n, 7]
+    return dets, offsets
 
-        results.append(final_boxes)
 
-    return results  # list of [n, 6] per image
+def weighted_box_fusion(boxes, scores, labels, iou_thres=0.55, n_models=None):
+    """
+    Merge overlapping boxes of the same class into score-weighted averages.
+    boxes: [n, 4] xyxy, scores: [n], labels: [n]
+    n_models: number of sources (ensemble members), down-weights boxes few of them agree on
+    returns: [m, 6] → (x1, y1, x2, y2, conf, class)
+    """
+    if boxes.numel() == 0:
+        return boxes.new_zeros((0, 6))
+
+    order = scores.argsort(descending=True)
+    boxes, scores, labels = boxes[order], scores[order], labels[order]
+
+    # greedy clustering around the highest-scoring unassigned box
+    iou = box_iou(boxes, boxes)
+    iou.masked_fill_(labels.view(-1, 1) != labels.view(1, -1), 0)
+    linked = (iou > iou_thres).cpu().numpy()
+    cluster = np.full(len(linked), -1, dtype=np.int64)
+    n_clusters = 0
+    for i in range(len(linked)):  # one vector op per cluster instead of a scan per pair
+        if cluster[i] >= 0:
+            continue
+        members = linked[i, i:] & (cluster[i:] < 0)
+        members[0] = True
+        cluster[i:][members] = n_clusters
+        n_clusters += 1
+    cluster = torch.from_numpy(cluster).to(boxes.device)
+
+    w = scores.unsqueeze(1)
+    box_sum = boxes.new_zeros((n_clusters, 4)).index_add_(0, cluster, boxes * w)
+    score_sum = scores.new_zeros(n_clusters).index_add_(0, cluster, scores)
+    count = torch.bincount(cluster, minlength=n_clusters).to(scores.dtype)
+
+    fused_boxes = box_sum / score_sum.unsqueeze(1)
+    conf = score_sum / count
+    if n_models:
+        conf = conf * count.clamp(max=n_models) / n_models
+
+    first = torch.full((n_clusters,), len(cluster), dtype=torch.long, device=boxes.device)
+    first.scatter_reduce_(0, cluster, torch.arange(len(cluster), device=boxes.device), reduce="amin")
+    return torch.cat([fused_boxes, conf.unsqueeze(1), labels[first].unsqueeze(1).float()], dim=1)
+
+
+def postprocess(pred, conf_thres=0.25, iou_thres=0.45, num_classes=1, image_size=640, decoded=True, max_nms=30000):
+    """
+    pred: Tensor of shape [B, N, 6] → (x, y, w, h, obj_conf, class_conf)
+          decoded=True: eval-mode Detect output (pixels, sigmoid already applied)
+          decoded=False: raw training-mode logits, normalised xywh scaled by image_size
+    returns: List of [n, 6] → (x1, y1, x2, y2, conf, class)
+    """
+    dets, offsets = postprocess_batched(
+        pred, conf_thres, iou_thres, max_nms=max_nms, max_det=None, decoded=decoded, image_size=image_size
+    )
+    offsets = offsets.tolist()
+    return [dets[offsets[i]:offsets[i + 1], :6] for i in range(pred.shape[0])]  # list of [n, 6] per image
 
 
 
 if __name__ == "__main__":
-    model = YOLOv11s(num_classes=1)
+    import copy
+
+    model = YOLOv11s(num_classes=1).eval()
     x = torch.randn(1, 3, 640, 640)
     with torch.no_grad():
-        y = model(x)  # [1, 97200, 6]
+        y = model(x)  # [1, 97200, 6], decoded to pixels
         results = postprocess(y, conf_thres=0.3, iou_thres=0.5, num_classes=1)
 
     for det in results:
         print(det)  # [x1, y1, x2, y2, score, class_id]
+
+    # fused vs unfused: randomise BN statistics so the folding is non-trivial
+    for m in model.modules():
+        if isinstance(m, nn.BatchNorm2d):
+            m.running_mean.uniform_(-0.5, 0.5)
+            m.running_var.uniform_(0.5, 2.0)
+            nn.init.uniform_(m.weight, 0.5, 1.5)
+            nn.init.uniform_(m.bias, -0.5, 0.5)
+    model.eval()
+    fused = copy.deepcopy(model).eval(fused=True, channels_last=True)
+    with torch.no_grad():
+        y_ref = model(x)
+        y_fused = fused(x)
+    max_err = (y_ref - y_fused).abs().max().item()
+    assert torch.allclose(y_ref, y_fused, rtol=1e-3, atol=1e-3), max_err
+    print(f"fused model matches unfused (max abs err {max_err:.2e})")
@@ -0,0 +1,292 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+CSV_PATH = os.path.join("Electricity_Dataset_Clean", "LD2012_2014_clean.txt")
+
+
+# ------------------------------
+# Columnar float32 cache
+# ------------------------------
+class LoadCache:
+    """
+    LD2012_2014 parsed once into <csv>.cache/: values.f32, a [n_meters, n_rows] float32 memmap
+    (each meter's series contiguous), times.npy (datetime64[ns]) and meta.json (column names,
+    shape, and the CSV's size/mtime_ns that the cache was built from).
+    """
+
+    def __init__(self, cache_dir):
+        with open(os.path.join(cache_dir, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.columns = self.meta["columns"]
+        self.index = {c: i for i, c in enumerate(self.columns)}
+        self.values = np.memmap(os.path.join(cache_dir, "values.f32"), dtype=np.float32, mode="r",
+                                shape=(len(self.columns), self.meta["n_rows"]))
+        self.times = np.load(os.path.join(cache_dir, "times.npy"), mmap_mode="r")
+
+    def __len__(self):
+        return self.values.shape[1]
+
+    def series(self, meter):
+        """one meter's [n_rows] series, a view into the memmap"""
+        return self.values[self.index[meter]]
+
+    def stats(self, rows=slice(None), meters=slice(None), chunk=4096):
+        """
+        (mean, std) of meters (slice or index array) over rows (slice or range): what
+        StandardScaler.fit learns on a train fold, accumulated in float64 over row chunks
+        instead of on a copy of the fold
+        """
+        rows = range(len(self))[rows if isinstance(rows, slice) else slice(rows.start, rows.stop)]
+        n_meters = len(np.arange(len(self.columns))[meters])
+        s = np.zeros(n_meters)
+        ss = np.zeros(n_meters)
+        for r0 in range(rows.start, rows.stop, chunk):
+            block = self.values[:, r0:min(r0 + chunk, rows.stop)][meters].astype(np.float64)
+            s += block.sum(1)
+            ss += np.square(block).sum(1)
+        n = max(len(rows), 1)
+        mean = s / n
+        std = np.sqrt(np.maximum(ss / n - mean ** 2, 0.0))
+        std[std == 0] = 1.0  # constant meters are left unscaled, like StandardScaler
+        return mean.astype(np.float32), std.astype(np.float32)
+
+
+def _count_rows(path):
+    with open(path, "rb") as f:
+        lines = sum(buf.count(b"\n") for buf in iter(lambda: f.read(1 << 20), b""))
+        f.seek(-1, os.SEEK_END)
+        lines += f.read(1) != b"\n"  # last line without a newline
+    return lines - 1  # header
+
+
+def build_cache(csv_path=CSV_PATH, cache_dir=None, chunksize=4096):
+    """
+    csv → LoadCache. Rebuilt only when the CSV's (size, mtime_ns) changed; the CSV is streamed
+    in row chunks straight into the memmap, so the full DataFrame never exists.
+    """
+    cache_dir = cache_dir or os.path.splitext(csv_path)[0] + ".cache"
+    st = os.stat(csv_path)
+    source = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+    try:
+        cache = LoadCache(cache_dir)
+        if cache.meta["source"] == source:
+            return cache
+    except (FileNotFoundError, KeyError, ValueError):
+        pass
+
+    os.makedirs(cache_dir, exist_ok=True)
+    n_rows = _count_rows(csv_path)
+    columns = [c for c in pd.read_csv(csv_path, nrows=0).columns if c != "time"]
+    tmp = os.path.join(cache_dir, "values.f32.tmp")
+    values = np.memmap(tmp, dtype=np.float32, mode="w+", shape=(len(columns), n_rows))
+    times = np.empty(n_rows, dtype="datetime64[ns]")
+    r0 = 0
+    reader = pd.read_csv(csv_path, chunksize=chunksize, dtype={c: np.float32 for c in columns})
+    for chunk in reader:
+        r1 = r0 + len(chunk)
+        values[:, r0:r1] = chunk[columns].to_numpy().T
+        times[r0:r1] = pd.to_datetime(chunk["time"]).to_numpy()
+        r0 = r1
+    assert r0 == n_rows, f"counted {n_rows} rows, parsed {r0}"
+    values.flush()
+    del values
+    os.replace(tmp, os.path.join(cache_dir, "values.f32"))
+    np.save(os.path.join(cache_dir, "times.tmp.npy"), times)
+    os.replace(os.path.join(cache_dir, "times.tmp.npy"), os.path.join(cache_dir, "times.npy"))
+    meta = {"columns": columns, "n_rows": n_rows, "source": source}
+    with open(os.path.join(cache_dir, "meta.json.tmp"), "w") as f:
+        json.dump(meta, f, indent=1)
+    os.replace(os.path.join(cache_dir, "meta.json.tmp"), os.path.join(cache_dir, "meta.json"))  # written last
+    return LoadCache(cache_dir)
+
+
+# ------------------------------
+# Windows and splits
+# ------------------------------
+def lag_windows(series, lags, horizon=1):
+    """
+    series [T] → (X [n, lags], y [n]) with X[i] = series[i:i + lags], y[i] = series[i + lags +
+    horizon - 1]. Both are strided views of series: nothing is copied.
+    """
+    n = len(series) - lags - horizon + 1
+    X = np.lib.stride_tricks.sliding_window_view(series, lags)[:n]
+    return X, series[lags + horizon - 1:]
+
+
+def split_ranges(n, n_splits=3):
+    """TimeSeriesSplit(n_splits) on n samples as (train, test) range pairs instead of index arrays"""
+    test_size = n // (n_splits + 1)
+    for k in range(n_splits):
+        start = n - (n_splits - k) * test_size
+        yield range(0, start), range(start, start + test_size)
+
+
+# ------------------------------
+# Batches
+# ------------------------------
+class WindowSource:
+    """
+    Training samples for one meter, read from a LoadCache batch by batch.
+    features="meters": X[t] = every other meter at row t, y[t] = meter at row t + horizon - 1
+      (horizon=1 is train_and_evaluate in the notebook).
+    features="lags": X[i] = the meter's own last `lags` readings, y[i] = its reading `horizon`
+      steps later.
+    Inputs are standardised with the fit_scaler statistics, targets stay in kW so the MSE matches
+    the notebook's. sequence=True adds the trailing feature axis LSTM/GRU expect.
+    """
+
+    def __init__(self, cache, meter, features="meters", lags=24, horizon=1, sequence=False):
+        assert features in ("meters", "lags")
+        self.cache = cache
+        self.meter = meter
+        self.features = features
+        self.horizon = horizon
+        self.sequence = sequence
+        col = cache.index[meter]
+        if features == "meters":
+            self.others = np.array([i for i in range(len(cache.columns)) if i != col])
+            self.lags = 1
+            self.X = cache.values  # gathered per batch, columns → rows
+            self.y = cache.values[col, horizon - 1:]
+        else:
+            self.lags = lags
+            self.X, self.y = lag_windows(cache.values[col], lags, horizon)
+        self.mean, self.std = np.zeros(self.n_features, np.float32), np.ones(self.n_features, np.float32)
+
+    def __len__(self):
+        return len(self.y) if self.features == "meters" else len(self.X)
+
+    @property
+    def n_features(self):
+        return len(self.others) if self.features == "meters" else self.lags
+
+    def fit_scaler(self, rows):
+        """standardise inputs with statistics of the training samples rows only"""
+        if self.features == "meters":
+            self.mean, self.std = self.cache.stats(rows, self.others)
+        else:
+            col = self.cache.index[self.meter]
+            mean, std = self.cache.stats(slice(rows.start, rows.stop + self.lags - 1), [col])
+            self.mean, self.std = np.repeat(mean, self.lags), np.repeat(std, self.lags)
+        return self
+
+    def take(self, idx):
+        """samples idx (slice or sorted index array) → (X [b, f] or [b, f, 1], y [b]) float32 copies"""
+        if self.features == "meters":
+            X = self.X[:, idx][self.others].T  # a slice is one contiguous read per meter
+        else:
+            X = self.X[idx]
+        X = (X - self.mean) / self.std
+        y = np.asarray(self.y[idx], dtype=np.float32)
+        if self.sequence:
+            X = X[:, :, None]
+        return X.astype(np.float32, copy=False), y
+
+    def batches(self, rows, batch_size=256, shuffle=False, seed=None):
+        """
+        yields (X, y) batches over samples rows, only the current batch materialised.
+        shuffle: a fresh permutation of rows, each batch read in sorted order (Keras' shuffle=True).
+        """
+        order = np.random.default_rng(seed).permutation(np.arange(rows.start, rows.stop)) if shuffle else None
+        for s in range(0, len(rows), batch_size):
+            if shuffle:
+                yield self.take(np.sort(order[s:s + batch_size]))
+            else:
+                yield self.take(slice(rows.start + s, min(rows.start + s + batch_size, rows.stop)))
+
+    def dataset(self, rows, batch_size=256, shuffle=False, seed=None):
+        """
+        tf.data.Dataset of (X, y) batches over samples rows, prefetched so the next batch is
+        read from the memmap while Keras trains on this one. Pass straight to model.fit/predict.
+        """
+        import tensorflow as tf
+
+        x_shape = (None, self.n_features, 1) if self.sequence else (None, self.n_features)
+        epoch = [0]
+
+        def gen():
+            epoch[0] += 1  # a new shuffle every epoch
+            yield from self.batches(rows, batch_size, shuffle, None if seed is None else seed + epoch[0])
+
+        ds = tf.data.Dataset.from_generator(gen, output_signature=(
+            tf.TensorSpec(x_shape, tf.float32), tf.TensorSpec((None,), tf.float32)))
+        return ds.prefetch(tf.data.AUTOTUNE)
+
+
+if __name__ == "__main__":
+    import argparse
+    import shutil
+    import tempfile
+    import time
+    import tracemalloc
+
+    parser = argparse.ArgumentParser(description="Memmapped window pipeline vs the notebook's DataFrame copies")
+    parser.add_argument("--csv", default=None, help="LD2012_2014_clean.txt (synthetic if omitted)")
+    parser.add_argument("--meters", type=int, default=370, help="synthetic meters")
+    parser.add_argument("--rows", type=int, default=26304, help="synthetic hourly rows")
+    parser.add_argument("--meter", default="MT_001")
+    parser.add_argument("--batch", type=int, default=256)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="ld_cache_")
+    if args.csv is None:
+        rng = np.random.default_rng(5318)
+        hours = np.arange(args.rows)
+        daily = 1 + 0.5 * np.sin(2 * np.pi * hours / 24)[:, None]
+        df = pd.DataFrame((rng.gamma(2.0, 50.0, args.meters) * daily * rng.uniform(0.8, 1.2, (args.rows, args.meters)))
+                          .astype(np.float32), columns=[f"MT_{i:03d}" for i in range(1, args.meters + 1)])
+        df.insert(0, "time", pd.date_range("2012-01-01 01:00:00", periods=args.rows, freq="h"))
+        args.csv = os.path.join(tmp, "LD2012_2014_clean.txt")
+        df.to_csv(args.csv, index=False)
+        del df
+
+    def measured(fn):
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        out = fn()
+        dt = time.perf_counter() - t0
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return out, dt, peak / 2 ** 20
+
+    def notebook():
+        """train_and_evaluate's data handling for one meter: full DataFrame, drop, scaled fold copies"""
+        from sklearn.model_selection import TimeSeriesSplit
+        from sklearn.preprocessing import StandardScaler
+
+        data = pd.read_csv(args.csv, sep=",", parse_dates=["time"])
+        features, target = data.drop(columns=["time", args.meter]), data[args.meter]
+        for train_index, test_index in TimeSeriesSplit(n_splits=3).split(features):
+            scaler = StandardScaler()
+            X_train = scaler.fit_transform(features.iloc[train_index])
+            X_test = scaler.transform(features.iloc[test_index])
+            y_train, y_test = target.iloc[train_index], target.iloc[test_index]
+        return X_train.shape
+
+    def pipeline(cache_dir):
+        cache = build_cache(args.csv, cache_dir)
+        src = WindowSource(cache, args.meter)
+        n = 0
+        for train, test in split_ranges(len(src), 3):
+            src.fit_scaler(train)
+            for X, y in src.batches(train, args.batch, shuffle=True, seed=0):
+                n += len(X)
+            for X, y in src.batches(test, args.batch):
+                n += len(X)
+        return n
+
+    cache_dir = os.path.join(tmp, "cache")
+    shape, t_nb, mb_nb = measured(notebook)
+    n, t_cold, mb_cold = measured(lambda: pipeline(cache_dir))
+    n, t_warm, mb_warm = measured(lambda: pipeline(cache_dir))
+    print(f"{len(LoadCache(cache_dir).columns)} meters x {len(LoadCache(cache_dir))} rows, meter {args.meter}")
+    print(f"{'notebook (DataFrame)':>24}: {t_nb:6.2f} s, peak {mb_nb:7.1f} MiB (last train fold {shape})")
+    print(f"{'memmap (cache build)':>24}: {t_cold:6.2f} s, peak {mb_cold:7.1f} MiB ({n} samples streamed)")
+    print(f"{'memmap (cached)':>24}: {t_warm:6.2f} s, peak {mb_warm:7.1f} MiB")
+
+    X, y = lag_windows(LoadCache(cache_dir).series(args.meter), 168, 24)
+    print(f"lag windows [{X.shape[0]}, {X.shape[1]}] share memory with the cache: {np.shares_memory(X, y)}")
+    shutil.rmtree(tmp)